@@ -190,24 +190,18 @@ def question_6() -> None:
         "de l'an 2002."
     )
     query = (
-        "SELECT id_crew, time, disqualification, number FROM result re "
-        "JOIN stage s ON re.id_stage = s.id "
-        "JOIN rally ra ON s.id_rally = ra.id "
-        "WHERE ra.name = 'Paris Dakar' AND ra.year = 2002;"
+        "SELECT s.number, sr.stage_rank, sr.time FROM stage_ranking sr "
+        "JOIN stage s ON sr.id_stage = s.id "
+        "JOIN rally ra ON sr.id_rally = ra.id "
+        "WHERE ra.name = 'Paris Dakar' AND ra.year = 2002 "
+        "AND sr.stage_rank IS NOT NULL;"
     )
     list_question6 = DATABASE.execute(query)
     df_question6 = pd.DataFrame(
-        list_question6,
-        columns=["Crew number", "Chrono", "Disqualification", "Stage number"],
+        list_question6, columns=["Stage number", "Rank", "Chrono"]
     )
-    df_question6 = df_question6[~df_question6["Disqualification"]]
     df_question6["Chrono"] = pd.to_timedelta(df_question6["Chrono"], unit="s")
 
-    df_question6["Rank"] = (
-        df_question6.groupby("Stage number")["Chrono"]
-        .rank(method="first")
-        .astype(int)
-    )
     df_question6 = df_question6.pivot_table(
         index="Stage number", columns="Rank", values="Chrono"
     )
@@ -1,133 +1,83 @@
 """Home page of the streamlit app."""
 
-from typing import Literal, TypedDict
+import contextvars
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Generator, Iterable
+from contextlib import closing
+from typing import Any
 
 import pandas as pd
 import streamlit as st
 from psycopg.errors import Error as SQLException
-from psycopg.errors import InsufficientPrivilege
+from psycopg.errors import InsufficientPrivilege, QueryCanceled
+from streamlit.delta_generator import DeltaGenerator
 from streamlit_searchbox import st_searchbox
 
-from app.utils import APP_SRC, DATABASE, TRAD_VEHICLE
-
-
-class SearchDict(TypedDict):
-    """Type for `elements` variable."""
-
-    type: Literal["rally", "team", "stage"]
-    id: int
-    label: str
-
-
-def create_elements() -> list[SearchDict]:
-    """
-    Create a list with search options.
-
-    Returns
-    -------
-    list[SearchDict]
-        List with search options: rallys, stages and teams.
-    """
-    elements: list[SearchDict] = []
-
-    rallys = DATABASE.read("rally", ["id", "name", "year"])
-
-    elements.extend(
-        [
-            {
-                "type": "rally",
-                "id": rally["id"],
-                "label": f"{rally['name']} {rally['year']}",
-            }
-            for rally in rallys
-        ]
-    )
-
-    stages = DATABASE.execute(
-        "SELECT stage.id, stage.number, rally.name, rally.year FROM stage "
-        "JOIN rally ON stage.id_rally = rally.id;"
-    )
-
-    elements.extend(
-        [
-            {
-                "type": "stage",
-                "id": stage[0],
-                "label": (
-                    f"{f'{stage[1]}e étape' if stage[1] else 'Prologue'} du "
-                    f"{stage[2]} {stage[-1]}"
-                ),
-            }
-            for stage in stages
-        ]
-    )
-
-    teams = DATABASE.read("team")
-
-    elements.extend(
-        [
-            {
-                "type": "team",
-                "id": team["id"],
-                "label": f"{team['name']} ({TRAD_VEHICLE[team['type']]})",
-            }
-            for team in teams
-        ]
-    )
-
-    return elements
-
-
-def search_fn(search_term: str, elements: list[SearchDict]) -> list[str]:
+from app.utils import (
+    APP_SRC,
+    DATABASE,
+    SearchType,
+    search_labels,
+    show_plan,
+)
+from data.db_communication import GuardedQuery
+
+# Guard rails of the free-form requests, so that one request cannot stall
+# the connections shared by all sessions.
+REQUEST_TIMEOUT = 10.0
+REQUEST_MAX_ROWS = 10000
+# Time in seconds between two checks of a running request, so that the page
+# can be stopped, e.g. by a click on the cancel button.
+REQUEST_POLL_INTERVAL = 0.2
+
+
+def search_fn(search_term: str) -> list[tuple[str, tuple[SearchType, int]]]:
     """
-    Search function. For a search tearm, find corresponding labels.
+    Search function. For a search term, find the best matching labels.
 
     Parameters
     ----------
     search_term : str
         User search term.
-    elements : list[SearchDict]
-        List with search options: rallys, stages and teams.
 
     Returns
     -------
-    list[str]
-        List of labels matching the search term.
+    list[tuple[str, tuple[SearchType, int]]]
+        Labels of the rallies, stages and teams matching the search term,
+        with their type and ID.
     """
     return [
-        x["label"]
-        for x in elements
-        if search_term.lower() in x["label"].lower()
+        (label, (element_type, element_id))
+        for element_type, element_id, label in search_labels(search_term)
     ]
 
 
-def change_page(select_label: str, elements: list[SearchDict]) -> None:
+def change_page(selected: tuple[SearchType, int]) -> None:
     """
     Change page after a search.
 
     Parameters
     ----------
-    select_label : str
-        Label selected by the user.
-    elements : list[SearchDict]
-        List with search options: rallys, stages and teams.
+    selected : tuple[SearchType, int]
+        Type and ID of the rally, stage or team selected by the user.
     """
-    element = next(
-        element for element in elements if element["label"] == select_label
-    )
+    element_type, element_id = selected
 
-    if element["type"] == "rally":
-        st.session_state["id_rally"] = element["id"]
+    if element_type == "rally":
+        st.session_state["id_rally"] = element_id
 
         st.switch_page(APP_SRC / "rally.py")
 
-    elif element["type"] == "stage":
-        st.session_state["id_stage"] = element["id"]
+    elif element_type == "stage":
+        st.session_state["id_stage"] = element_id
 
         st.switch_page(APP_SRC / "stage.py")
 
-    elif element["type"] == "team":
-        st.session_state["id_team"] = element["id"]
+    elif element_type == "team":
+        st.session_state["id_team"] = element_id
 
         st.switch_page(APP_SRC / "team.py")
 
@@ -147,6 +97,118 @@ def create_section_exercises() -> None:
         st.switch_page(APP_SRC / "exercise.py")
 
 
+def cancel_request() -> None:
+    """Cancel the free-form request of the session, if it is running."""
+    guarded: GuardedQuery | None = st.session_state.get("guarded_query")
+    if guarded is not None:
+        guarded.cancel()
+
+
+def fetch_rows(
+    guarded: GuardedQuery,
+    results: queue.Queue[list[Any] | SQLException | sqlite3.Error | None],
+) -> None:
+    """
+    Fetch the rows of a free-form request, in a worker thread.
+
+    Parameters
+    ----------
+    guarded : GuardedQuery
+        Request to run.
+    results : queue.Queue[list[Any] | SQLException | sqlite3.Error | None]
+        Queue receiving the chunks of rows, then the error of the request,
+        if any, and None once the request is over.
+    """
+    try:
+        for rows in guarded:
+            results.put(rows)
+    except (SQLException, sqlite3.Error) as exc:
+        results.put(exc)
+    finally:
+        results.put(None)
+
+
+def poll_rows(
+    guarded: GuardedQuery, status: DeltaGenerator
+) -> Generator[list[Any]]:
+    """
+    Run a free-form request and yield its rows by chunks.
+
+    Rows are fetched by a worker thread, so that this run keeps calling
+    Streamlit while the query runs, which stops the run as soon as the page
+    reruns, e.g. on a click on the cancel button. The query is then
+    cancelled on the server.
+
+    Parameters
+    ----------
+    guarded : GuardedQuery
+        Request to run.
+    status : DeltaGenerator
+        Placeholder showing that the request is running.
+
+    Yields
+    ------
+    list[Any]
+        Chunk of rows.
+    """
+    results: queue.Queue[list[Any] | SQLException | sqlite3.Error | None] = (
+        queue.Queue()
+    )
+    # With the context of the page, whose queries may be captured.
+    worker = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(fetch_rows, guarded, results),
+        daemon=True,
+    )
+    worker.start()
+    try:
+        while True:
+            try:
+                rows = results.get(timeout=REQUEST_POLL_INTERVAL)
+            except queue.Empty:
+                status.caption("Requête en cours…")
+                continue
+            if rows is None or isinstance(rows, Exception):
+                status.empty()
+                if rows is None:
+                    return
+                raise rows
+            yield rows
+    finally:
+        if worker.is_alive():
+            guarded.cancel()
+
+
+def accumulate_rows(chunks: Iterable[list[Any]]) -> Generator[list[Any]]:
+    """
+    Gather chunks of rows, to redraw a table at most once per poll interval.
+
+    Each redraw builds the table from all the rows, so that redrawing it for
+    each chunk would take a time quadratic in the number of rows.
+
+    Parameters
+    ----------
+    chunks : Iterable[list[Any]]
+        Chunks of rows, e.g. given by `poll_rows`.
+
+    Yields
+    ------
+    list[Any]
+        All the rows gathered so far, the last time once all are gathered.
+    """
+    rows: list[Any] = []
+    yielded = 0
+    yielded_at = 0.0
+    for chunk in chunks:
+        rows.extend(chunk)
+        if time.monotonic() - yielded_at >= REQUEST_POLL_INTERVAL:
+            yielded = len(rows)
+            yielded_at = time.monotonic()
+            yield rows
+    if yielded != len(rows):
+        yield rows
+
+
 def create_section_request() -> None:
     """Create a section for SQL requests."""
     st.subheader("Requêtes libres")
@@ -155,35 +217,63 @@ def create_section_request() -> None:
         "Entrez votre requête SQL", value="SELECT * FROM rally;", height=150
     )
 
+    explain = st.toggle("Afficher le plan d'exécution", key="explain")
+
     if st.button("Exécuter la requête"):
+        guarded = DATABASE.execute_guarded(
+            query, timeout=REQUEST_TIMEOUT, max_rows=REQUEST_MAX_ROWS
+        )
+        # Kept for the rerun of the click on the cancel button, whose
+        # callback cancels the query on the server.
+        st.session_state["guarded_query"] = guarded
+        st.button("Annuler la requête", on_click=cancel_request)
+        table = st.empty()
+        status = st.empty()
+
+        rows: list[Any] = []
         try:
-            results = DATABASE.execute(query)
-            description = DATABASE.cursor.description
-            if description is None:
-                st.error("La requête ne retourne aucune colonne !")
-                return
-
-            columns = [desc[0] for desc in description]
-            st.dataframe(
-                pd.DataFrame(data=results, columns=columns), hide_index=True
-            )
+            with closing(poll_rows(guarded, status)) as polled:
+                for rows in accumulate_rows(polled):
+                    table.dataframe(
+                        pd.DataFrame(rows, columns=guarded.columns),
+                        hide_index=True,
+                    )
         except InsufficientPrivilege:
             st.error("Vous n'avez pas les droits suffisants !")
-        except SQLException as exc:
+            return
+        except QueryCanceled:
+            st.error(
+                "La requête dépasse la durée maximale de "
+                f"{REQUEST_TIMEOUT:g} s !"
+            )
+            return
+        except (SQLException, sqlite3.Error) as exc:
             st.error(f"Erreur SQL : {exc}")
+            return
+
+        if not guarded.columns:
+            st.error("La requête ne retourne aucune colonne !")
+        elif not rows:
+            table.dataframe(
+                pd.DataFrame(columns=guarded.columns), hide_index=True
+            )
+        if guarded.truncated:
+            st.warning(
+                f"Seules les {REQUEST_MAX_ROWS} premières lignes sont "
+                "affichées."
+            )
+        if explain:
+            show_plan(query, title="Plan de la requête")
 
 
 def create_page() -> None:
     """Create the home page."""
     st.title("Page d'accueil")
 
-    elements = create_elements()
-
     st_searchbox(
         search_fn,
         placeholder="Rechercher un rally, une étape ou une équipe",
-        elements=elements,
-        submit_function=lambda s: change_page(s, elements),
+        submit_function=change_page,
     )
 
     create_section_exercises()
@@ -8,6 +8,7 @@ from dataframe_with_button import static_dataframe
 
 from app.utils import (
     APP_SRC,
+    ASYNC_DATABASE,
     DATABASE,
     Vehicle,
     convert_s_to_h,
@@ -15,30 +16,31 @@ from app.utils import (
 )
 
 
-def get_city(id_city: int) -> tuple[str, str]:
+def get_cities(id_cities: list[int]) -> dict[int, tuple[str, str]]:
     """
-    Get city and country from an ID.
+    Get cities and countries from their IDs, in one query.
 
     Parameters
     ----------
-    id_city : int
-        ID of the city in the database.
+    id_cities : list[int]
+        IDs of cities in the database.
 
     Returns
     -------
-    str
-        French name of the city.
-    str
-        French name of the country.
+    dict[int, tuple[str, str]]
+        French name of the city and of the country for each ID.
     """
-    city, country = DATABASE.read(
-        "city", ["name", "country"], {"id": id_city}, return_type="list"
-    )[0]
+    cities = DATABASE.read(
+        "city",
+        ["id", "name", "country"],
+        {"id": list(set(id_cities))},
+        return_type="list",
+    )
 
-    return city, country
+    return {id_city: (city, country) for id_city, city, country in cities}
 
 
-def get_team_numbers(id_rally: int, vehicle: Vehicle) -> int:
+async def get_team_numbers(id_rally: int, vehicle: Vehicle) -> int:
     """
     Find number of participating teams in a rally for a type of vehicle.
 
@@ -54,11 +56,13 @@ def get_team_numbers(id_rally: int, vehicle: Vehicle) -> int:
     int
         Number of participating type in a rally for a category.
     """
-    team_numbers: int = DATABASE.execute(
-        "SELECT COUNT(*) "
-        "FROM team JOIN participation ON team.id = id_team "
-        "WHERE id_rally = %s AND team.type = %s;",
-        [id_rally, vehicle],
+    team_numbers: int = (
+        await ASYNC_DATABASE.execute(
+            "SELECT COUNT(*) "
+            "FROM team JOIN participation ON team.id = id_team "
+            "WHERE id_rally = %s AND team.type = %s;",
+            [id_rally, vehicle],
+        )
     )[0][0]
 
     return team_numbers
@@ -117,7 +121,9 @@ def create_table_leaderboard(
         st.switch_page(APP_SRC / "team.py")
 
 
-def create_table_stages(list_stages: list[dict[str, Any]]) -> None:
+def create_table_stages(
+    list_stages: list[dict[str, Any]], cities: dict[int, tuple[str, str]]
+) -> None:
     """
     Create a streamlit table for stages of a rally.
 
@@ -125,6 +131,9 @@ def create_table_stages(list_stages: list[dict[str, Any]]) -> None:
     ----------
     list_stages : list[dict[str, Any]]
         List of stages of a given rally.
+    cities : dict[int, tuple[str, str]]
+        Name of the city and of the country for the ID of each city of the
+        stages, as given by `get_cities`.
     """
     st.subheader("Étapes")
     df_stages = pd.DataFrame(list_stages).rename(
@@ -139,15 +148,12 @@ def create_table_stages(list_stages: list[dict[str, Any]]) -> None:
     )
     df_stages["Étape"] = df_stages["Étape"].replace(0, "Prologue")
 
-    df_stages["Départ"] = df_stages["Départ"].apply(get_city)
-    df_stages["Départ"] = (
-        df_stages["Départ"].str[0] + " (" + df_stages["Départ"].str[1] + ")"
-    )
-
-    df_stages["Arrivée"] = df_stages["Arrivée"].apply(get_city)
-    df_stages["Arrivée"] = (
-        df_stages["Arrivée"].str[0] + " (" + df_stages["Arrivée"].str[1] + ")"
-    )
+    city_names = {
+        id_city: f"{city} ({country})"
+        for id_city, (city, country) in cities.items()
+    }
+    df_stages["Départ"] = df_stages["Départ"].map(city_names)
+    df_stages["Arrivée"] = df_stages["Arrivée"].map(city_names)
 
     df_stages["Type"] = (
         df_stages["Type"]
@@ -166,22 +172,17 @@ def create_table_stages(list_stages: list[dict[str, Any]]) -> None:
         st.switch_page(APP_SRC / "stage.py")
 
 
-def create_section_partners(id_rally: int) -> None:
+def create_section_partners(sponsors: list[str], suppliers: list[str]) -> None:
     """
     Create the section with the partner of a given rally.
 
     Parameters
     ----------
-    id_rally : int
-        ID of the rally in the database.
+    sponsors : list[str]
+        Names of the sponsors of the rally.
+    suppliers : list[str]
+        Names of the suppliers of the rally.
     """
-    sponsors = DATABASE.read(
-        "rally_sponsor", "name", {"id_rally": id_rally}, return_type="list"
-    )
-    suppliers = DATABASE.read(
-        "supplier", "name", {"id_rally": id_rally}, return_type="list"
-    )
-
     if sponsors or suppliers:
         st.subheader("Partenaires")
 
@@ -192,40 +193,75 @@ def create_section_partners(id_rally: int) -> None:
             st.markdown("**Fournisseurs :**\n- " + "\n- ".join(suppliers))
 
 
+async def get_rally_data(id_rally: int) -> list[Any]:
+    """
+    Run concurrently the independent queries of the page of a rally.
+
+    Parameters
+    ----------
+    id_rally : int
+        ID of the rally in the database.
+
+    Returns
+    -------
+    list[Any]
+        Name and year of the rally, its stages, its number of teams by car,
+        truck and motorbike, the names of its sponsors and the names of its
+        suppliers.
+    """
+    return await ASYNC_DATABASE.gather(
+        ASYNC_DATABASE.read(
+            "rally", ["name", "year"], {"id": id_rally}, return_type="list"
+        ),
+        ASYNC_DATABASE.read(
+            "stage",
+            [
+                "id",
+                "number",
+                "id_starting_city",
+                "id_ending_city",
+                "type",
+                "kilometers",
+            ],
+            {"id_rally": id_rally},
+        ),
+        get_team_numbers(id_rally, "car"),
+        get_team_numbers(id_rally, "truck"),
+        get_team_numbers(id_rally, "motorbike"),
+        ASYNC_DATABASE.read(
+            "rally_sponsor", "name", {"id_rally": id_rally}, return_type="list"
+        ),
+        ASYNC_DATABASE.read(
+            "supplier", "name", {"id_rally": id_rally}, return_type="list"
+        ),
+    )
+
+
 def create_page() -> None:
     """Create a page about a rally."""
     id_rally: int = st.session_state["id_rally"]
 
-    rally, year = DATABASE.read(
-        "rally",
-        ["name", "year"],
-        {"id": id_rally},
-        return_type="list",
-    )[0]
+    (
+        rally_data,
+        list_stages,
+        num_cars,
+        num_trucks,
+        num_motorbikes,
+        sponsors,
+        suppliers,
+    ) = ASYNC_DATABASE.run(get_rally_data(id_rally))
+    rally, year = rally_data[0]
 
     st.title(f"{rally} {year}")
 
-    list_stages: list[dict[str, Any]] = DATABASE.read(
-        "stage",
-        [
-            "id",
-            "number",
-            "id_starting_city",
-            "id_ending_city",
-            "type",
-            "kilometers",
-        ],
-        {"id_rally": id_rally},
+    cities = get_cities(
+        [stage["id_starting_city"] for stage in list_stages]
+        + [stage["id_ending_city"] for stage in list_stages]
     )
-
-    starting_city, starting_country = get_city(
+    starting_city, starting_country = cities[
         list_stages[0]["id_starting_city"]
-    )
-    ending_city, ending_country = get_city(list_stages[-1]["id_ending_city"])
-
-    num_cars = get_team_numbers(id_rally, "car")
-    num_trucks = get_team_numbers(id_rally, "truck")
-    num_motorbikes = get_team_numbers(id_rally, "motorbike")
+    ]
+    ending_city, ending_country = cities[list_stages[-1]["id_ending_city"]]
 
     leaderboard_car = get_leaderboard(id_rally, "car")
     leaderboard_truck = get_leaderboard(id_rally, "truck")
@@ -258,9 +294,9 @@ def create_page() -> None:
     create_table_leaderboard(leaderboard_truck, "camion")
     create_table_leaderboard(leaderboard_motorbike, "moto")
 
-    create_table_stages(list_stages)
+    create_table_stages(list_stages, cities)
 
-    create_section_partners(id_rally)
+    create_section_partners(sponsors, suppliers)
 
 
 if __name__ == "__main__":
@@ -2,7 +2,6 @@
 
 from typing import Literal
 
-import numpy as np
 import pandas as pd
 import streamlit as st
 from dataframe_with_button import static_dataframe
@@ -41,75 +40,36 @@ def stage_name(
     return (f"{number}ᵉ étape du {rally_name} {rally_year}", determiner)
 
 
-def get_crew_by_vehicle(vehicle: Vehicle) -> list[tuple[int]]:
+def show_ranking(ranking: pd.DataFrame) -> None:
     """
-    Get all crew IDs for one type of vehicle.
+    Show a ranking of crews, whose teams link to their page.
 
     Parameters
     ----------
-    vehicle : Vehicle
-        Type of vehicle.
-
-    Returns
-    -------
-    list[tuple[int]]
-        Crew IDs of one category.
-    """
-    return DATABASE.execute(
-        "SELECT c.id FROM crew AS c JOIN team AS t ON c.id_team = t.id "
-        "WHERE t.type = %s",
-        [vehicle],
-    )
-
-
-def get_result_stage(id_stage: int, vehicle: Vehicle) -> None:
-    """
-    Create the result table for a vehicle category and the given stage.
-
-    Parameters
-    ----------
-    id_stage : int
-        ID of the stage in the database.
-    vehicle : Vehicle
-        Type of vehicle.
+    ranking : pd.DataFrame
+        Rank, time, team and drivers of each crew, as read from
+        `crew_roster`. A time of 0 is shown as a disqualification.
     """
-    list_number_crew = get_crew_by_vehicle(vehicle)
-    crew_ids = [row[0] for row in list_number_crew]
-
-    traductions = {"car": "voiture", "truck": "camion"}
-    vehicle_fr = traductions.get(vehicle, "moto")
-
-    result = DATABASE.read("result", condition_data={"id_stage": id_stage})
-    df_result = pd.DataFrame(result)
-
-    df_result = df_result[df_result["id_crew"].isin(crew_ids)]
-
-    stage_result = df_result[["time", "id_crew"]].sort_values(
-        by=["time"], ascending=True, key=lambda x: x.replace(0, np.inf)
-    )
-
-    df_teams_info = get_table_team_number_name_member()
-
-    df_merged = stage_result.merge(df_teams_info, on="id_crew", how="left")
-
     df_display = pd.DataFrame()
     df_display["Classement"] = [
-        str(i + 1) if val != 0 else "N/A"
-        for i, val in enumerate(df_merged["time"])
+        "N/A" if pd.isna(rank) else str(int(rank))
+        for rank in ranking["category_rank"]
     ]
 
-    df_display["Équipe"] = df_merged["team_name"].astype(str)
-    df_display["id_team"] = df_merged["id_team"]
+    df_display["Équipe"] = ranking["team_name"].astype(str)
+    df_display["id_team"] = ranking["id_team"]
 
     df_display["Temps"] = [
         convert_s_to_h(line) if line else "Disqualifié"
-        for line in df_merged["time"]
+        for line in ranking["time"]
     ]
 
-    df_display["Pilote 1"] = df_merged["Pilote 1"]
-    df_display["Pilote 2"] = df_merged["Pilote 2"]
-
-    st.subheader(f"Classement {vehicle_fr}")
+    for number in (1, 2):
+        df_display[f"Pilote {number}"] = (
+            ranking[f"first_name_{number}"]
+            + " "
+            + ranking[f"last_name_{number}"]
+        ).fillna("")
 
     st_table = static_dataframe(
         df_display[["Classement", "Équipe", "Temps", "Pilote 1", "Pilote 2"]],
@@ -123,46 +83,62 @@ def get_result_stage(id_stage: int, vehicle: Vehicle) -> None:
         st.switch_page(APP_SRC / "team.py")
 
 
-def get_table_team_number_name_member() -> pd.DataFrame:
+def get_result_stage(id_stage: int, number: int, vehicle: Vehicle) -> None:
     """
-    Get table with crew ID, team ID, team name and driver names.
+    Create the result tables for a vehicle category and the given stage.
 
-    Returns
-    -------
-    pd.DataFrame
-        DataFrame with columns `id_crew`, `id_team`, `team_name`, `Pilote 1`
-        and `Pilote 2`.
+    The first table ranks the crews on the stage, the second one on their
+    total time since the start of the rally.
+
+    Parameters
+    ----------
+    id_stage : int
+        ID of the stage in the database.
+    number : int
+        Number of the stage. For prologue, number is 0.
+    vehicle : Vehicle
+        Type of vehicle.
     """
-    table_team_number_name_member = DATABASE.execute(
-        "SELECT c.id, t.id, t.name, co.first_name, co.last_name "
-        "FROM crew AS c "
-        "JOIN contestant AS co ON co.id_crew = c.id "
-        "JOIN team AS t ON t.id = c.id_team"
-    )
-    df = pd.DataFrame(
-        table_team_number_name_member,
-        columns=["id_crew", "id_team", "team_name", "first_name", "last_name"],
-    )
+    traductions = {"car": "voiture", "truck": "camion"}
+    vehicle_fr = traductions.get(vehicle, "moto")
 
-    df["full_name"] = df["first_name"] + " " + df["last_name"]
-    df["member_idx"] = df.groupby("id_crew").cumcount() + 1
-
-    df_pivot = df.pivot_table(
-        index=["id_crew", "id_team", "team_name"],
-        columns="member_idx",
-        values="full_name",
-        aggfunc="first",
-    ).reset_index()
-
-    df_pivot.columns = [
-        "id_crew",
-        "id_team",
-        "team_name",
-        "Pilote 1",
-        "Pilote 2",
-    ]
+    # Both rankings are computed when the results are written, disqualified
+    # crews last. The drivers of each crew are on one row of `crew_roster`.
+    with DATABASE.batch() as batch:
+        stage_result = batch.execute(
+            "SELECT sr.time, sr.category_rank, cr.id_team, cr.team_name, "
+            "cr.first_name_1, cr.last_name_1, cr.first_name_2, "
+            "cr.last_name_2 FROM stage_ranking AS sr "
+            "LEFT JOIN crew_roster AS cr ON cr.id_crew = sr.id_crew "
+            "WHERE sr.id_stage = %s AND sr.type = %s "
+            "ORDER BY sr.category_rank IS NULL, sr.category_rank, "
+            "sr.time = 0, sr.time;",
+            [id_stage, vehicle],
+            return_type="dataframe",
+        )
+        general_result = batch.execute(
+            "SELECT CASE WHEN gr.disqualification THEN 0 "
+            "ELSE gr.total_time END AS time, gr.category_rank, cr.id_team, "
+            "cr.team_name, cr.first_name_1, cr.last_name_1, "
+            "cr.first_name_2, cr.last_name_2 FROM general_ranking AS gr "
+            "LEFT JOIN crew_roster AS cr ON cr.id_crew = gr.id_crew "
+            "WHERE gr.id_stage = %s AND gr.type = %s "
+            "ORDER BY gr.category_rank IS NULL, gr.category_rank, "
+            "gr.total_time;",
+            [id_stage, vehicle],
+            return_type="dataframe",
+        )
+
+    st.subheader(f"Classement {vehicle_fr}")
 
-    return df_pivot.fillna("")
+    after = "le prologue" if number == 0 else f"l'étape {number}"
+    stage_tab, general_tab = st.tabs(
+        ["Étape", f"Classement général après {after}"]
+    )
+    with stage_tab:
+        show_ranking(stage_result.result())
+    with general_tab:
+        show_ranking(general_result.result())
 
 
 def create_button(stage_number: int, id_rally: int) -> None:
@@ -177,25 +153,29 @@ def create_button(stage_number: int, id_rally: int) -> None:
         ID of the rally in the database.
     """
     col1, _, _, _, col5 = st.columns(5)
-    if stage_number != 0:
-        previous_stage: list[int] = DATABASE.read(
+
+    with DATABASE.batch() as batch:
+        previous_stage_result = batch.read(
             "stage",
             "id",
             condition_data={"number": stage_number - 1, "id_rally": id_rally},
             return_type="list",
         )
-        if previous_stage:
-            with col1:
-                if st.button("Étape précédente"):
-                    st.session_state["id_stage"] = previous_stage[0]
-                    st.rerun()
-
-    next_stage: list[int] = DATABASE.read(
-        "stage",
-        "id",
-        condition_data={"number": stage_number + 1, "id_rally": id_rally},
-        return_type="list",
-    )
+        next_stage_result = batch.read(
+            "stage",
+            "id",
+            condition_data={"number": stage_number + 1, "id_rally": id_rally},
+            return_type="list",
+        )
+
+    previous_stage: list[int] = previous_stage_result.result()
+    if previous_stage:
+        with col1:
+            if st.button("Étape précédente"):
+                st.session_state["id_stage"] = previous_stage[0]
+                st.rerun()
+
+    next_stage: list[int] = next_stage_result.result()
     if next_stage:
         with col5:
             if st.button("Étape suivante"):
@@ -207,24 +187,35 @@ def create_page() -> None:
     """Create a page about a stage."""
     id_stage: int = st.session_state["id_stage"]
 
-    stage = DATABASE.read("stage", condition_data={"id": id_stage})
-    df_stage = pd.DataFrame(stage)
+    df_stage = DATABASE.read(
+        "stage", condition_data={"id": id_stage}, return_type="dataframe"
+    )
     id_rally = df_stage["id_rally"].item()
 
     id_starting_city = df_stage["id_starting_city"][0]
     id_ending_city = df_stage["id_ending_city"][0]
     distance_stage = df_stage["kilometers"][0]
 
-    rally = DATABASE.read("rally", condition_data={"id": id_rally})
-    df_rally = pd.DataFrame(rally)
-    city_depart = DATABASE.read(
-        "city", "name", condition_data={"id": id_starting_city}
-    )
-    df_city_depart = pd.DataFrame(city_depart)
-    city_arrivee = DATABASE.read(
-        "city", "name", condition_data={"id": id_ending_city}
-    )
-    df_city_arrivee = pd.DataFrame(city_arrivee)
+    with DATABASE.batch() as batch:
+        rally_result = batch.read(
+            "rally", condition_data={"id": id_rally}, return_type="dataframe"
+        )
+        city_depart_result = batch.read(
+            "city",
+            "name",
+            condition_data={"id": id_starting_city},
+            return_type="dataframe",
+        )
+        city_arrivee_result = batch.read(
+            "city",
+            "name",
+            condition_data={"id": id_ending_city},
+            return_type="dataframe",
+        )
+
+    df_rally = rally_result.result()
+    df_city_depart = city_depart_result.result()
+    df_city_arrivee = city_arrivee_result.result()
 
     rally_name = df_rally["name"][0]
     rally_year = df_rally["year"][0]
@@ -240,9 +231,9 @@ def create_page() -> None:
         f"{distance_stage} km."
     )
 
-    get_result_stage(id_stage, "car")
-    get_result_stage(id_stage, "truck")
-    get_result_stage(id_stage, "motorbike")
+    get_result_stage(id_stage, number, "car")
+    get_result_stage(id_stage, number, "truck")
+    get_result_stage(id_stage, number, "motorbike")
 
     create_button(df_stage["number"].item(), id_rally)
 
@@ -2,11 +2,16 @@
 
 from typing import Any, TypedDict
 
-import pandas as pd
 import streamlit as st
 from dataframe_with_button import static_dataframe
 
-from app.utils import APP_SRC, DATABASE, TRAD_VEHICLE, Vehicle, get_leaderboard
+from app.utils import (
+    APP_SRC,
+    DATABASE,
+    TRAD_VEHICLE,
+    Vehicle,
+    get_leaderboards,
+)
 
 
 class TeamInfo(TypedDict):
@@ -38,18 +43,20 @@ def create_section_member(member: dict[str, Any]) -> None:
     )
 
 
-def get_rank(id_rally: int, id_team: int, vehicle: Vehicle) -> str:
+def get_rank(
+    leaderboard: list[tuple[str, float, str, str, str, str, int, bool]],
+    id_team: int,
+) -> str:
     """
-    Get the rank of a team for a rally.
+    Get the rank of a team in the leaderboard of a rally.
 
     Parameters
     ----------
-    id_rally : int
-        ID of the rally.
+    leaderboard : list[tuple[str, float, str, str, str, str, int, bool]]
+        Leaderboard of the rally for the vehicle of the team, as given by
+        `get_leaderboard`.
     id_team : int
         ID of the team.
-    vehicle : Vehicle
-        Type of vehicle.
 
     Returns
     -------
@@ -57,7 +64,6 @@ def get_rank(id_rally: int, id_team: int, vehicle: Vehicle) -> str:
         Formatting rank of the team in the rally. If disqualified, return
         "Disqualifiée".
     """
-    leaderboard = get_leaderboard(id_rally, vehicle)
     id_teams = [line[-2] for line in leaderboard if not line[-1]]
 
     if id_team in id_teams:
@@ -79,19 +85,18 @@ def create_section_races(id_team: int, vehicle: Vehicle) -> None:
     """
     st.subheader("Courses")
 
-    rallys = DATABASE.read(
+    df_rallys = DATABASE.read(
         "race_by_team",
         ["id", "name", "year"],
         {"id_team": id_team},
-        return_type="dict",
+        return_type="dataframe",
     )
-
-    df_rallys = pd.DataFrame(rallys)
     df_rallys["Rallye"] = (
         df_rallys["name"] + " " + df_rallys["year"].astype(str)
     )
+    leaderboards = get_leaderboards(df_rallys["id"].tolist(), vehicle)
     df_rallys["Classement"] = df_rallys["id"].apply(
-        lambda id_rally: get_rank(id_rally, id_team, vehicle)
+        lambda id_rally: get_rank(leaderboards[id_rally], id_team)
     )
 
     st_table = static_dataframe(df_rallys[["Rallye", "Classement"]], "Rallye")
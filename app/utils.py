@@ -1,15 +1,25 @@
 """Module with utilitaries."""
 
 import os
+import re
+import sqlite3
+import threading
+from functools import cache
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 import streamlit as st
 from dotenv import load_dotenv
+from psycopg.errors import Error as SQLException
 
+from data.async_db_communication import AsyncPostgreSQL
+from data.cache import READ_STATEMENT, QueryCache
 from data.db_communication import PostgreSQL
+from data.instrumentation import QueryMonitor, QueryRecord, seq_scans
+from data.local_db import AsyncSQLite, SQLite
 
 Vehicle = Literal["car", "truck", "motorbike"]
+SearchType = Literal["rally", "stage", "team"]
 
 
 def getenv_str(name: str) -> str:
@@ -72,6 +82,47 @@ def getenv_int(name: str) -> int:
         raise RuntimeError(exception_text) from exc
 
 
+def get_leaderboards(
+    id_rallies: list[int], vehicle: Vehicle
+) -> dict[int, list[tuple[str, float, str, str, str, str, int, bool]]]:
+    """
+    Get the leaderboards of several rallies for a given category.
+
+    The leaderboards are read from the `rally_leaderboard` materialized
+    view, kept up to date after each write to its tables.
+
+    Parameters
+    ----------
+    id_rallies : list[int]
+        IDs of the rallies in the database.
+    vehicle : Vehicle
+        Type of vehicle.
+
+    Returns
+    -------
+    dict[int, list[tuple[str, float, str, str, str, str, int, bool]]]
+        Leaderboard of each rally (see `get_leaderboard`), by rally ID.
+    """
+    rows: list[tuple[int, str, float, str, str, str, str, int, bool]] = (
+        DATABASE.execute(
+            "SELECT id_rally, team_name, total_time, first_name_1, "
+            "last_name_1, first_name_2, last_name_2, id_team, "
+            "disqualification "
+            "FROM rally_leaderboard "
+            "WHERE id_rally = ANY(%s) AND type = %s "
+            "ORDER BY id_rally, rank, id_crew;",
+            [list(id_rallies), vehicle],
+        )
+    )
+
+    leaderboards: dict[
+        int, list[tuple[str, float, str, str, str, str, int, bool]]
+    ] = {id_rally: [] for id_rally in id_rallies}
+    for row in rows:
+        leaderboards[row[0]].append(row[1:])
+    return leaderboards
+
+
 def get_leaderboard(
     id_rally: int, vehicle: Vehicle
 ) -> list[tuple[str, float, str, str, str, str, int, bool]]:
@@ -92,30 +143,45 @@ def get_leaderboard(
         name, first_name of contestant 2, last name, team ID and
         disqualification status.
     """
-    if f"leaderboard_{id_rally}_{vehicle}" in st.session_state:
-        leaderboard: list[tuple[str, float, str, str, str, str, int, bool]] = (
-            st.session_state[f"leaderboard_{id_rally}_{vehicle}"]
-        )
-        return leaderboard
-
-    leaderboard = DATABASE.execute(
-        "SELECT team.name, SUM(result.time) AS total_time, c1.first_name, "
-        "c1.last_name, c2.first_name, c2.last_name, team.id, "
-        "BOOL_OR(result.disqualification) as disquali "
-        "FROM crew "
-        "JOIN result ON result.id_crew = crew.id "
-        "JOIN stage ON stage.id = result.id_stage "
-        "JOIN team ON team.id = crew.id_team "
-        "JOIN contestant c1 ON c1.id_crew = crew.id "
-        "JOIN contestant c2 ON c2.id_crew = crew.id AND c2.id > c1.id "
-        "WHERE stage.id_rally = %s AND team.type = %s "
-        "GROUP BY team.name, c1.first_name, c1.last_name, c2.first_name, "
-        "c2.last_name, team.id "
-        "ORDER BY disquali ASC, total_time ASC;",
-        [id_rally, vehicle],
+    return get_leaderboards([id_rally], vehicle)[id_rally]
+
+
+def search_labels(
+    term: str, limit: int = 10
+) -> list[tuple[SearchType, int, str]]:
+    """
+    Search rallies, stages and teams by their label.
+
+    Labels containing the term come first, then labels with a word close to
+    it (trigram similarity of `pg_trgm`), e.g. with a typo. Both are found
+    with the trigram index of the `search_label` materialized view.
+
+    Parameters
+    ----------
+    term : str
+        Searched term.
+    limit : int, optional
+        Maximum number of matches, by default 10.
+
+    Returns
+    -------
+    list[tuple[SearchType, int, str]]
+        Type, ID and label of the best matches, best first.
+    """
+    term = term.strip()
+    if not term:
+        return []
+
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+    matches: list[tuple[SearchType, int, str]] = DATABASE.execute(
+        "SELECT type, id, label FROM search_label "
+        "WHERE label ILIKE %s ESCAPE '\\' OR %s <%% label "
+        "ORDER BY label ILIKE %s ESCAPE '\\' DESC, "
+        "word_similarity(%s, label) DESC, length(label), label "
+        "LIMIT %s;",
+        [pattern, term, pattern, term, limit],
     )
-    st.session_state[f"leaderboard_{id_rally}_{vehicle}"] = leaderboard
-    return leaderboard
+    return matches
 
 
 def convert_s_to_h(seconds: float) -> str:
@@ -136,13 +202,49 @@ def convert_s_to_h(seconds: float) -> str:
 
 
 load_dotenv(override=True)
-DATABASE = PostgreSQL(
-    hostname=getenv_str("HOSTNAME"),
-    db_name=getenv_str("DB_NAME"),
-    username=getenv_str("USERNAME"),
-    password=getenv_str("PASSWORD"),
-    port=getenv_int("PORT"),
+# Shared by both interfaces, so that a write through one of them invalidates
+# results cached by the other.
+CACHE = QueryCache(max_entries=1024, ttl=600.0, max_bytes=64 * 1024 * 1024)
+# QUERY_MONITOR=1 measures each query and logs the ones slower than
+# SLOW_QUERY_THRESHOLD seconds.
+MONITOR = QueryMonitor(
+    slow_threshold=float(os.getenv("SLOW_QUERY_THRESHOLD", "0.5"))
 )
+MONITOR.enabled = os.getenv("QUERY_MONITOR") == "1"
+DATABASE: PostgreSQL | SQLite
+ASYNC_DATABASE: AsyncPostgreSQL | AsyncSQLite
+# DB_BACKEND=sqlite runs the application offline, on a local copy of the
+# dump stored in SQLITE_PATH (in memory if not set).
+if os.getenv("DB_BACKEND", "postgresql") == "sqlite":
+    LOCAL_DATABASE = SQLite(
+        os.getenv("SQLITE_PATH", ":memory:"), cache=CACHE, monitor=MONITOR
+    )
+    DATABASE = LOCAL_DATABASE
+    ASYNC_DATABASE = AsyncSQLite(LOCAL_DATABASE)
+else:
+    DATABASE = PostgreSQL(
+        hostname=getenv_str("HOSTNAME"),
+        db_name=getenv_str("DB_NAME"),
+        username=getenv_str("USERNAME"),
+        password=getenv_str("PASSWORD"),
+        port=getenv_int("PORT"),
+        pooled=True,
+        min_size=1,
+        max_size=10,
+        cache=CACHE,
+        monitor=MONITOR,
+    )
+    ASYNC_DATABASE = AsyncPostgreSQL(
+        hostname=getenv_str("HOSTNAME"),
+        db_name=getenv_str("DB_NAME"),
+        username=getenv_str("USERNAME"),
+        password=getenv_str("PASSWORD"),
+        port=getenv_int("PORT"),
+        min_size=1,
+        max_size=10,
+        cache=CACHE,
+        monitor=MONITOR,
+    )
 
 APP_SRC = Path(__file__).parent
 
@@ -151,3 +253,95 @@ TRAD_VEHICLE: dict[str, str] = {
     "motorbike": "moto",
     "truck": "camion",
 }
+
+
+@cache
+def start_warmup() -> threading.Thread:
+    """
+    Open the connections to the database in the background, once.
+
+    Connections are opened on first use, so importing this module does not
+    wait for the database. Warming them up while the navigation is drawn
+    hides this wait from the first query of the page.
+
+    Returns
+    -------
+    threading.Thread
+        Thread opening the connections.
+    """
+
+    def warmup() -> None:
+        DATABASE.warmup()
+        ASYNC_DATABASE.run(ASYNC_DATABASE.warmup())
+
+    thread = threading.Thread(target=warmup, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def show_plan(
+    query: str, params: list[Any] | None = None, title: str = "Plan"
+) -> None:
+    """
+    Explain a query and show its plan in an expander.
+
+    A read is run again to measure its plan, within 10 seconds. Other
+    statements are only planned, since running them again would write
+    again. Sequential scans are highlighted, since they often make a page
+    slow.
+
+    Parameters
+    ----------
+    query : str
+        SQL query.
+    params : list[Any] | None, optional
+        Values substituted into the query, by default None.
+    title : str, optional
+        Title of the expander, by default "Plan".
+    """
+    try:
+        plan = DATABASE.explain(
+            query,
+            params,
+            analyze=READ_STATEMENT.match(query) is not None,
+            timeout=10.0,
+        )
+    except (SQLException, sqlite3.Error) as exc:
+        st.error(f"Plan indisponible : {exc}")
+        return
+
+    scans = seq_scans(plan)
+    with st.expander(f"{title} ({len(scans)} parcours séquentiels)"):
+        if scans:
+            st.warning("Parcours séquentiel de : " + ", ".join(scans))
+        if "Execution Time" in plan:
+            st.write(f"Durée d'exécution : {plan['Execution Time']:.1f} ms")
+        st.code(query, language="sql")
+        st.json(plan, expanded=False)
+
+
+def show_plans(records: list[QueryRecord]) -> None:
+    """
+    Show the plans of the queries run by a page.
+
+    Parameters
+    ----------
+    records : list[QueryRecord]
+        Measures of the queries, captured by `MONITOR.capture`.
+    """
+    st.divider()
+    st.subheader("Plans des requêtes")
+
+    explained = set()
+    for record in records:
+        key = (record.query, repr(record.params))
+        if key in explained:
+            continue
+        explained.add(key)
+
+        show_plan(
+            record.query,
+            record.params,
+            f"{record.duration * 1000:.1f} ms, {record.caller} : "
+            f"{record.shape[:80]}",
+        )
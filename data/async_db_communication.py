@@ -0,0 +1,678 @@
+"""Container for `AsyncPostgreSQL` class to query PostgreSQL with asyncio."""
+
+import asyncio
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Coroutine, Iterable, Sequence
+from typing import Any, Literal, TypeVar
+
+from psycopg_pool import AsyncConnectionPool
+
+from data.cache import MATERIALIZED_VIEWS, QueryCache
+from data.db_communication import CREATED_VIEWS_QUERY, ReturnType, SQLBuilder
+from data.instrumentation import QueryMonitor
+
+T = TypeVar("T")
+
+
+class AsyncSQLInterface(SQLBuilder, ABC):
+    """
+    Interface for asynchronous SQL communication.
+
+    Methods have the same parameters and results as the ones of
+    `SQLInterface`, but are coroutines, so that independent queries can run
+    concurrently.
+    """
+
+    @abstractmethod
+    async def execute_with_columns(
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        """
+        Execute a SQL query and give the names of the returned columns.
+
+        See `SQLInterface.execute_with_columns`.
+
+        Returns
+        -------
+        list[str]
+            Names of the returned columns.
+        list[Any]
+            Fetched rows.
+        """
+        raise NotImplementedError
+
+    async def execute(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        return_type: ReturnType = "list",
+    ) -> Any:  # ruff: ignore[any-type]
+        """
+        Execute a SQL query.
+
+        See `SQLInterface.execute`.
+
+        Returns
+        -------
+        list[Any] | dict[str, Any] | pd.DataFrame | pa.Table
+            Query result in the specified format.
+        """
+        columns, rows = await self.execute_with_columns(query, params)
+        return self._format_rows(columns, rows, return_type)
+
+    async def read(
+        self,
+        table: str,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        number_values: int | None = None,
+        return_type: ReturnType = "list[dict]",
+    ) -> Any:  # ruff: ignore[any-type]
+        """
+        Read data from the database.
+
+        See `SQLInterface.read`.
+
+        Returns
+        -------
+        list[Any] | dict[str, Any] | pd.DataFrame | pa.Table
+            Queried data in the specified format.
+        """
+        query, params = self._select_query(
+            table, columns, condition_data, number_values
+        )
+        columns_list, data = await self.execute_with_columns(query, params)
+
+        if return_type == "list" and self._is_single_column(columns):
+            return [row[0] for row in data]
+
+        return self._format_rows(columns_list, data, return_type)
+
+    async def read_page(
+        self,
+        table: str,
+        order_by: str | Sequence[str] = "id",
+        after: str | None = None,
+        limit: int = 1000,
+        *,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        return_type: ReturnType = "list[dict]",
+    ) -> tuple[Any, str | None]:
+        """
+        Read a page of rows, starting after the previous page.
+
+        See `SQLInterface.read_page`.
+
+        Returns
+        -------
+        Any
+            Rows of the page, formatted as by `read`.
+        str | None
+            Token of the next page, None if this page is the last one.
+        """
+        keys, descending = self._order_columns(order_by)
+        after_keys = (
+            None if after is None else self._decode_page_token(after, keys)
+        )
+        selected = [columns] if isinstance(columns, str) else columns
+
+        query, params = self._page_query(
+            table,
+            keys,
+            descending,
+            after_keys,
+            limit,
+            columns=selected,
+            condition_data=condition_data,
+        )
+        columns_list, rows = await self.execute_with_columns(query, params)
+        return self._page_result(
+            keys,
+            selected,
+            columns_list,
+            rows,
+            limit=limit,
+            return_type=return_type,
+        )
+
+    @abstractmethod
+    async def write(
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        """
+        Write new lines to the specified table.
+
+        See `SQLInterface.write`.
+        """
+        raise NotImplementedError
+
+    async def update(
+        self,
+        table: str,
+        update_data: dict[str, Any],
+        condition_data: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Update rows in a table.
+
+        See `SQLInterface.update`.
+        """
+        await self.execute(
+            *self._update_query(table, update_data, condition_data)
+        )
+
+    @abstractmethod
+    async def update_many(
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        """
+        Update many rows, each with its own values, in one statement.
+
+        See `SQLInterface.update_many`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many(
+        self, table: str, data: Iterable[dict[str, Any]]
+    ) -> int:
+        """
+        Delete many rows, identified by their keys, in one statement.
+
+        See `SQLInterface.delete_many`.
+        """
+        raise NotImplementedError
+
+    async def delete_rows(
+        self, table: str, condition_data: dict[str, Any]
+    ) -> None:
+        """
+        Delete rows of a given table based on specified conditions.
+
+        See `SQLInterface.delete_rows`.
+
+        Raises
+        ------
+        ValueError
+            If there is no condition.
+        """
+        if not condition_data:
+            msg = "Conditions are required, use `delete_all` instead."
+            raise ValueError(msg)
+
+        await self.execute(*self._delete_query(table, condition_data))
+
+    async def delete_all(self, table: str) -> None:
+        """
+        Delete all rows of a given table.
+
+        See `SQLInterface.delete_all`.
+        """
+        await self.execute(*self._delete_query(table))
+
+    @abstractmethod
+    async def refresh_views(self, *views: str) -> None:
+        """
+        Recompute materialized views from their tables.
+
+        See `SQLInterface.refresh_views`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def warmup(self) -> None:
+        """
+        Open the connections to the database before the first query.
+
+        See `SQLInterface.warmup`.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    async def gather(*queries: Awaitable[Any]) -> list[Any]:
+        """
+        Run several queries concurrently.
+
+        Parameters
+        ----------
+        *queries : Awaitable[Any]
+            Queries to run, e.g. `database.read(...)` calls.
+
+        Returns
+        -------
+        list[Any]
+            Results of the queries, in the same order as `queries`.
+        """
+        return list(await asyncio.gather(*queries))
+
+
+class AsyncPostgreSQL(AsyncSQLInterface):
+    """
+    Class to query a PostgreSQL database with asyncio.
+
+    Each query borrows a connection from a pool, so that queries gathered
+    with `gather` run on different connections at the same time. The pool
+    is opened on first use.
+
+    Parameters
+    ----------
+    hostname : str
+        Hostname of the database server.
+    db_name : str
+        Name of the database.
+    username : str
+        Username to connect to the database.
+    password : str
+        Password to connect to the database.
+    port : int
+        Port number of the database server.
+    min_size : int, optional
+        Minimum number of connections kept open by the pool, by default 1.
+    max_size : int, optional
+        Maximum number of connections opened by the pool, by default 10.
+    timeout : float, optional
+        Maximum time in seconds to wait for a connection of the pool, by
+        default 30.
+    copy_threshold : int, optional
+        Minimum number of lines from which `write` uses COPY instead of
+        INSERT when its method is "auto", by default 1000.
+    cache : QueryCache | None, optional
+        Cache of query results, by default None (no cache). It can be shared
+        with a `PostgreSQL` object connected to the same database.
+    monitor : QueryMonitor | None, optional
+        Monitor measuring each query, by default None (no measure).
+
+    Attributes
+    ----------
+    pool : AsyncConnectionPool
+        Pool of connections.
+    copy_threshold : int
+        Minimum number of lines from which `write` uses COPY.
+    cache : QueryCache | None
+        Cache of query results, None if results are not cached.
+    monitor : QueryMonitor | None
+        Monitor measuring each query, None if queries are not measured.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        db_name: str,
+        username: str,
+        password: str,
+        port: int,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        copy_threshold: int = 1000,
+        cache: QueryCache | None = None,
+        monitor: QueryMonitor | None = None,
+    ) -> None:
+        self.copy_threshold = copy_threshold
+        self.cache = cache
+        self.monitor = monitor
+        self.pool = AsyncConnectionPool(
+            kwargs={
+                "host": hostname,
+                "dbname": db_name,
+                "user": username,
+                "password": password,
+                "port": port,
+            },
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    async def execute_with_columns(  # ruff: ignore[undocumented-public-method]
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        if self.monitor is None or not self.monitor.active:
+            return await self._execute_with_columns(query, params)
+
+        start = time.perf_counter()
+        columns, rows = await self._execute_with_columns(query, params)
+        self.monitor.record(query, start, columns, rows, params)
+        return columns, rows
+
+    async def _execute_with_columns(
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        """
+        Execute a SQL query, or give its cached result.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+
+        Returns
+        -------
+        list[str]
+            Names of the returned columns.
+        list[Any]
+            Fetched rows.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(query, params)
+            if cached is not None:
+                return cached
+
+        await self.pool.open()
+        async with self.pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            columns = [desc.name for desc in cursor.description or []]
+            rows = await cursor.fetchall() if columns else []
+
+        self._cache_result(query, params, columns, rows)
+        await self._refresh_stale_views(query)
+        return columns, rows
+
+    def _cache_result(
+        self,
+        query: str,
+        params: list[Any] | None,
+        columns: list[str],
+        rows: list[Any],
+    ) -> None:
+        """
+        Store the result of an executed query in the cache, if any.
+
+        See `PostgreSQL._cache_result`. Queries modifying tables drop the
+        cached results they make stale, including the ones read from views
+        of these tables.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+        params : list[Any] | None
+            Values substituted into the query.
+        columns : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        """
+        if self.cache is not None:
+            self.cache.store(query, params, columns, rows)
+
+    async def write(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        if isinstance(data, dict):
+            data = [data]
+
+        if method == "auto":
+            method = (
+                "insert"
+                if isinstance(data, list) and len(data) < self.copy_threshold
+                else "copy"
+            )
+
+        if method == "insert":
+            await self._write_insert(table, list(data), on_conflict, update)
+            return
+
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return
+
+        columns_str = ", ".join(columns)
+        conflict_clause = self._conflict_clause(
+            table, columns, on_conflict, update
+        )
+        target = f"upsert_{uuid.uuid4().hex}" if conflict_clause else table
+
+        await self.pool.open()
+        async with self.pool.connection() as conn, conn.cursor() as cursor:
+            if conflict_clause:
+                await cursor.execute(
+                    f"CREATE TEMPORARY TABLE {target} (LIKE {table}"
+                    " INCLUDING DEFAULTS) ON COMMIT DROP;"
+                )
+
+            query = f"COPY {target} ({columns_str}) FROM STDIN"
+            async with cursor.copy(query) as copy:
+                for row in rows:
+                    await copy.write_row(row)
+
+            if conflict_clause:
+                query = (
+                    f"INSERT INTO {table} ({columns_str})"
+                    f" SELECT {columns_str} FROM {target}{conflict_clause};"
+                )
+                await cursor.execute(query)
+
+        self._cache_result(query, None, [], [])
+        await self._refresh_stale_views(query)
+
+    async def _write_insert(
+        self,
+        table: str,
+        data: list[dict[str, Any]],
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        """
+        Write new lines with INSERT statements of at most 10 000 lines.
+
+        See `PostgreSQL._write_insert`.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : list[dict[str, Any]]
+            Lines to write.
+        on_conflict : Sequence[str], optional
+            Columns on which lines are upserted, by default None.
+        update : Sequence[str] | Literal["nothing"], optional
+            Columns updated on conflict, by default None.
+        """
+        executed: list[tuple[str, list[Any]]] = []
+
+        await self.pool.open()
+        # One transaction, so that the table is not left half written if a
+        # chunk fails.
+        async with (
+            self.pool.connection() as conn,
+            conn.transaction(),
+            conn.cursor() as cursor,
+        ):
+            for query, items in self._insert_queries(
+                table, data, on_conflict, update
+            ):
+                start = time.perf_counter()
+                await cursor.execute(query, items)
+                if self.monitor is not None and self.monitor.active:
+                    self.monitor.record(query, start, [], [], items)
+                executed.append((query, items))
+
+        # Once committed, as in `PostgreSQL.transaction`.
+        for query, items in executed:
+            self._cache_result(query, items, [], [])
+        await self._refresh_stale_views(*(query for query, _ in executed))
+
+    async def update_many(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+        keys, updated = self._key_columns(key, columns)
+        if not updated:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return await self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._update_from_query(table, source, keys, updated),
+        )
+
+    async def delete_many(  # ruff: ignore[undocumented-public-method]
+        self, table: str, data: Iterable[dict[str, Any]]
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return await self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._delete_in_query(table, source, columns),
+        )
+
+    async def _execute_from_copy(
+        self,
+        table: str,
+        source: str,
+        columns: list[str],
+        rows: Iterable[list[Any]],
+        query: str,
+    ) -> int:
+        """
+        Copy lines into a temporary table, then run a query reading it.
+
+        See `PostgreSQL._execute_from_copy`.
+
+        Returns
+        -------
+        int
+            Number of rows affected by `query`.
+        """
+        columns_str = ", ".join(columns)
+        await self.pool.open()
+        async with self.pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                f"CREATE TEMPORARY TABLE {source} ON COMMIT DROP AS"
+                f" SELECT {columns_str} FROM {table} WITH NO DATA;"
+            )
+            async with cursor.copy(
+                f"COPY {source} ({columns_str}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    await copy.write_row(row)
+
+            await cursor.execute(query)
+            count = cursor.rowcount
+
+        self._cache_result(query, None, [], [])
+        await self._refresh_stale_views(query)
+        return count
+
+    async def _refresh_stale_views(self, *queries: str) -> None:
+        """
+        Refresh the materialized views made stale by executed queries.
+
+        Views not created yet, e.g. by a pending migration, are skipped.
+
+        Parameters
+        ----------
+        *queries : str
+            Executed SQL queries.
+        """
+        views = await self._created_views(self._stale_views(queries))
+        if views:
+            await self.refresh_views(*views)
+
+    async def _created_views(self, views: Sequence[str]) -> list[str]:
+        """
+        Keep the materialized views found in the database.
+
+        Parameters
+        ----------
+        views : Sequence[str]
+            Names of the views.
+
+        Returns
+        -------
+        list[str]
+            Names of the created views, in the same order.
+        """
+        if not views:
+            return []
+        # Read without cache, since creating a view does not invalidate it.
+        await self.pool.open()
+        async with self.pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(CREATED_VIEWS_QUERY, [list(views)])
+            created = {row[0] for row in await cursor.fetchall()}
+        return [view for view in views if view in created]
+
+    async def refresh_views(self, *views: str) -> None:  # ruff: ignore[undocumented-public-method]
+        for view in views or await self._created_views(MATERIALIZED_VIEWS):
+            await self.execute(
+                f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view};"
+            )
+
+    async def warmup(self) -> None:  # ruff: ignore[undocumented-public-method]
+        await self.pool.open(wait=True)
+
+    async def close(self) -> None:
+        """Close all connections of the pool."""
+        await self.pool.close()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine from synchronous code and wait for its result.
+
+        Coroutines run on an event loop owned by this object, in a
+        background thread, so that the connections of the pool are reused
+        from one call to another (e.g. from one Streamlit rerun to another).
+
+        Parameters
+        ----------
+        coroutine : Coroutine[Any, Any, T]
+            Coroutine to run, e.g. `database.gather(...)`.
+
+        Returns
+        -------
+        T
+            Result of the coroutine.
+        """
+        with self._lock:
+            if self._loop is None:
+                # psycopg does not support the default Windows event loop.
+                self._loop = asyncio.SelectorEventLoop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="AsyncPostgreSQL",
+                    daemon=True,
+                ).start()
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
@@ -0,0 +1,330 @@
+"""Container for `QueryCache` class to cache results of SQL queries."""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+# Base tables of the views of `database_creation.ddl` and of the tables
+# maintained by triggers of `data/migrations`.
+VIEW_DEPENDENCIES: dict[str, set[str]] = {
+    "race_by_team": {"rally", "participation"},
+    "team_info": {"team", "crew", "vehicle"},
+    "rally_leaderboard": {"result", "stage", "crew", "team", "contestant"},
+    "stage_ranking": {"result", "crew", "team"},
+    "search_label": {"rally", "stage", "team"},
+    "crew_roster": {"crew", "team", "contestant"},
+    "general_ranking": {"result", "stage", "crew", "team"},
+}
+# Views of `database_creation.ddl` and `data/migrations` stored as tables,
+# refreshed after writes in this order, views before the ones reading them.
+MATERIALIZED_VIEWS = ("crew_roster", "rally_leaderboard", "search_label")
+
+READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+([\w.]+)", re.IGNORECASE)
+WRITE_TABLES = re.compile(
+    r"\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|COPY"
+    r"|ALTER\s+TABLE|DROP\s+TABLE|REFRESH\s+MATERIALIZED\s+VIEW"
+    r"(?:\s+CONCURRENTLY)?)\s+([\w.]+)",
+    re.IGNORECASE,
+)
+READ_STATEMENT = re.compile(r"^\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+
+
+def result_size(columns: list[str], rows: list[Any]) -> int:
+    """
+    Estimate the memory used by the result of a query.
+
+    Parameters
+    ----------
+    columns : list[str]
+        Names of the columns.
+    rows : list[Any]
+        Fetched rows.
+
+    Returns
+    -------
+    int
+        Approximate size in bytes.
+    """
+    size = sys.getsizeof(columns) + sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+    return size
+
+
+def written_tables(query: str) -> set[str]:
+    """
+    Find the tables modified by a query.
+
+    Parameters
+    ----------
+    query : str
+        SQL query.
+
+    Returns
+    -------
+    set[str]
+        Names of the modified tables, without their schema, in lower case.
+    """
+    return {
+        match.rsplit(".", 1)[-1].lower()
+        for match in WRITE_TABLES.findall(query)
+    }
+
+
+class CacheEntry(NamedTuple):
+    """Result of a query stored in a `QueryCache`."""
+
+    columns: list[str]
+    rows: list[Any]
+    tables: frozenset[str]
+    size: int
+    expires_at: float
+
+
+class QueryCache:
+    """
+    Least recently used cache of query results, with expiration.
+
+    Results are keyed on the SQL query and its parameters, and are dropped
+    as soon as a query modifies one of the tables they were read from.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of results kept, by default 1024.
+    ttl : float, optional
+        Time in seconds after which a result expires, by default 300.
+    max_bytes : int, optional
+        Approximate maximum memory used by the results kept, by default
+        64 MiB.
+    dependencies : dict[str, set[str]], optional
+        Base tables of each view, so that results read from a view are
+        dropped when one of its tables is modified. By default, views of
+        `database_creation.ddl` and `data/migrations`.
+
+    Attributes
+    ----------
+    max_entries : int
+        Maximum number of results kept.
+    ttl : float
+        Time in seconds after which a result expires.
+    max_bytes : int
+        Approximate maximum memory used by the results kept.
+    dependencies : dict[str, set[str]]
+        Base tables of each view.
+    hits : int
+        Number of queries answered by the cache.
+    misses : int
+        Number of queries not found in the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        dependencies: dict[str, set[str]] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.dependencies = (
+            VIEW_DEPENDENCIES if dependencies is None else dependencies
+        )
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query: str, params: list[Any] | None) -> tuple[str, str]:
+        """
+        Give the key of a query in the cache.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any] | None
+            Values substituted into the query.
+
+        Returns
+        -------
+        tuple[str, str]
+            Query and representation of its parameters.
+        """
+        return query, repr(params)
+
+    @staticmethod
+    def _table_names(regex: re.Pattern[str], query: str) -> set[str]:
+        """
+        Find table names in a query, without their schema.
+
+        Parameters
+        ----------
+        regex : re.Pattern[str]
+            Regex whose first group is a table name.
+        query : str
+            SQL query.
+
+        Returns
+        -------
+        set[str]
+            Table names, in lower case.
+        """
+        return {
+            match.rsplit(".", 1)[-1].lower() for match in regex.findall(query)
+        }
+
+    def get(
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]] | None:
+        """
+        Give the cached result of a query.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+
+        Returns
+        -------
+        tuple[list[str], list[Any]] | None
+            Copy of the names of the returned columns and of the fetched
+            rows, or None if the result is not cached or has expired.
+        """
+        key = self._key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry.columns), list(entry.rows)
+
+    def store(
+        self,
+        query: str,
+        params: list[Any] | None,
+        columns: list[str],
+        rows: list[Any],
+    ) -> None:
+        """
+        Store the result of an executed query, or invalidate its tables.
+
+        Results of queries modifying tables are not stored, but cached
+        results depending on these tables are dropped. If the modified tables
+        cannot be found, the whole cache is cleared.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+        params : list[Any] | None
+            Values substituted into the query.
+        columns : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        """
+        if self.invalidate_query(query):
+            return
+
+        tables = self._table_names(READ_TABLES, query)
+        if not tables:
+            return
+        for table in list(tables):
+            tables |= self.dependencies.get(table, set())
+
+        size = result_size(columns, rows)
+        if size > self.max_bytes:
+            return
+
+        key = self._key(query, params)
+        entry = CacheEntry(
+            list(columns),
+            list(rows),
+            frozenset(tables),
+            size,
+            time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += size
+
+            while (
+                len(self._entries) > self.max_entries
+                or self._size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_query(self, query: str) -> bool:
+        """
+        Drop cached results made stale by a query.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+
+        Returns
+        -------
+        bool
+            Whether the query may modify tables, i.e. is not a read query.
+        """
+        tables = written_tables(query)
+        if tables:
+            self.invalidate(*tables)
+        elif not READ_STATEMENT.match(query):
+            self.clear()
+        else:
+            return False
+        return True
+
+    def invalidate(self, *tables: str) -> None:
+        """
+        Drop cached results read from some tables.
+
+        Parameters
+        ----------
+        *tables : str
+            Names of the modified tables.
+        """
+        modified = {table.rsplit(".", 1)[-1].lower() for table in tables}
+        with self._lock:
+            for key in [
+                key
+                for key, entry in self._entries.items()
+                if entry.tables & modified
+            ]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        """
+        Drop a cached result. The lock must be held.
+
+        Parameters
+        ----------
+        key : tuple[str, str]
+            Key of the result.
+        """
+        self._size -= self._entries.pop(key).size
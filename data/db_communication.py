@@ -1,20 +1,1269 @@
 """Container for `PostgreSQL` class to interact with a PostgreSQL database."""
 
+import base64
+import io
+import itertools
+import json
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Literal, overload
+from collections.abc import (
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from contextlib import AbstractContextManager, contextmanager
+from typing import TYPE_CHECKING, Any, Literal, overload
 
 import psycopg
+from psycopg import sql
+from psycopg_pool import ConnectionPool
+
+from data.cache import (
+    MATERIALIZED_VIEWS,
+    VIEW_DEPENDENCIES,
+    QueryCache,
+    written_tables,
+)
+from data.instrumentation import QueryMonitor
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+    import pandas as pd
+    import pyarrow as pa
+
+ReturnType = Literal[
+    "list", "dict", "list[dict]", "dataframe", "numpy", "arrow"
+]
+# Materialized views found in the database, which may lack the views of
+# pending migrations.
+CREATED_VIEWS_QUERY = (
+    "SELECT matviewname FROM pg_matviews WHERE matviewname = ANY(%s);"
+)
+# Size in bytes of the blocks read from a file by `copy_from`.
+COPY_BLOCK_SIZE = 1024 * 1024
+CONDITION_OPERATORS = {
+    "=",
+    "!=",
+    "<>",
+    "<",
+    "<=",
+    ">",
+    ">=",
+    "LIKE",
+    "ILIKE",
+}
+
+
+class SQLBuilder:
+    """Builder of the SQL queries shared by the SQL interfaces."""
+
+    @staticmethod
+    def _where_clause(
+        condition_data: dict[str, Any] | None,
+    ) -> tuple[str, list[Any]]:
+        """
+        Build a WHERE clause where each condition is separated by a AND.
+
+        A key is a column name, optionally followed by an operator: "=",
+        "!=", "<>", "<", "<=", ">", ">=", "LIKE", "ILIKE" or "BETWEEN", e.g.
+        {"year >=": 2000}. Without operator, the column must be equal to the
+        value. A list or tuple value matches any of its elements with "="
+        and none of them with "!=" or "<>", e.g. {"id": [1, 2, 3]}. The value
+        of "BETWEEN" is a pair of bounds, e.g. {"year BETWEEN": (2000, 2010)}.
+
+        Parameters
+        ----------
+        condition_data : dict[str, Any] | None
+            Dictionary with conditions that lines must meet.
+
+        Returns
+        -------
+        str
+            WHERE clause, starting with a space. Empty string if there is no
+            condition.
+        list[Any]
+            Values to substitute into the clause.
+
+        Raises
+        ------
+        ValueError
+            If an operator is not supported or a value does not suit its
+            operator.
+        """
+        if not condition_data:
+            return "", []
+
+        conditions = []
+        params: list[Any] = []
+        for key, value in condition_data.items():
+            column, _, operator = key.partition(" ")
+            operator = " ".join(operator.split()).upper() or "="
+
+            if operator == "BETWEEN":
+                try:
+                    low, high = value
+                except (TypeError, ValueError) as exc:
+                    msg = f"BETWEEN of {column} needs two bounds: {value!r}"
+                    raise ValueError(msg) from exc
+                conditions.append(f"{column} BETWEEN %s AND %s")
+                params.extend((low, high))
+            elif isinstance(value, (list, tuple)):
+                if operator == "=":
+                    conditions.append(f"{column} = ANY(%s)")
+                elif operator in {"!=", "<>"}:
+                    conditions.append(f"NOT {column} = ANY(%s)")
+                else:
+                    msg = f"Operator {operator} does not accept a list."
+                    raise ValueError(msg)
+                params.append(list(value))
+            elif operator in CONDITION_OPERATORS:
+                # Spaced, so that SQLite does not read "<%s" as the "<%"
+                # operator of word similarity.
+                conditions.append(f"{column} {operator} %s")
+                params.append(value)
+            else:
+                msg = f"Unsupported operator in condition: {key!r}"
+                raise ValueError(msg)
+
+        return " WHERE " + " AND ".join(conditions), params
+
+    def _select_query(
+        self,
+        table: str,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        number_values: int | None = None,
+    ) -> tuple[str, list[Any]]:
+        """
+        Build the SELECT query used by `read` and `iter_read`.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        columns : str | list[str], optional
+            List of column names to select or just one column name. By default
+            None, which selects all columns.
+        condition_data : dict[str, Any], optional
+            Dictionary with conditions that lines must meet to be read. By
+            default None.
+        number_values : int, optional
+            Maximum number of rows to return, by default None.
+
+        Returns
+        -------
+        str
+            SELECT query.
+        list[Any]
+            Values to substitute into the query.
+        """
+        if columns is None:
+            columns_str = "*"
+        elif isinstance(columns, list):
+            columns_str = ", ".join(columns)
+        else:
+            columns_str = columns
+
+        where_clause, params = self._where_clause(condition_data)
+        query = f"SELECT {columns_str} FROM {table}{where_clause}"
+
+        if number_values is not None:
+            query += f" LIMIT {number_values}"
+
+        return query + ";", params
+
+    @staticmethod
+    def _order_columns(
+        order_by: str | Sequence[str],
+    ) -> tuple[list[str], bool]:
+        """
+        Parse the ordering of a paginated read.
+
+        Parameters
+        ----------
+        order_by : str | Sequence[str]
+            Column or columns, each optionally followed by "ASC" or "DESC",
+            e.g. ["time", "id"] or "id DESC".
+
+        Returns
+        -------
+        list[str]
+            Column names.
+        bool
+            Whether the order is descending.
+
+        Raises
+        ------
+        ValueError
+            If columns are not all sorted in the same direction.
+        """
+        items = [order_by] if isinstance(order_by, str) else order_by
+        keys = []
+        directions = set()
+        for item in items:
+            column, _, direction = item.partition(" ")
+            keys.append(column)
+            directions.add(direction.strip().upper() or "ASC")
+
+        if not keys or len(directions) > 1 or directions - {"ASC", "DESC"}:
+            msg = f"Columns must be sorted in one direction: {order_by!r}"
+            raise ValueError(msg)
+        return keys, directions == {"DESC"}
+
+    def _page_query(
+        self,
+        table: str,
+        keys: list[str],
+        descending: bool,
+        after: list[Any] | None,
+        limit: int,
+        *,
+        columns: list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+    ) -> tuple[str, list[Any]]:
+        """
+        Build the SELECT query used by `read_page`.
+
+        Rows are filtered by comparing their keys to the ones of the last
+        row of the previous page, so that reading a page costs the same
+        whatever its position, instead of skipping rows with OFFSET.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        keys : list[str]
+            Columns ordering the rows.
+        descending : bool
+            Whether the order is descending.
+        after : list[Any] | None
+            Keys of the last row of the previous page, None for the first
+            page.
+        limit : int
+            Maximum number of rows of the page.
+        columns : list[str], optional
+            Column names to select, by default None, which selects all
+            columns. The keys are selected after them.
+        condition_data : dict[str, Any], optional
+            Dictionary with conditions that lines must meet to be read. By
+            default None.
+
+        Returns
+        -------
+        str
+            SELECT query.
+        list[Any]
+            Values to substitute into the query.
+        """
+        columns_str = "*" if columns is None else ", ".join(columns + keys)
+        keys_str = ", ".join(keys)
+        where_clause, params = self._where_clause(condition_data)
+
+        if after is not None:
+            operator = "<" if descending else ">"
+            places = ", ".join(["%s"] * len(keys))
+            where_clause += " AND " if where_clause else " WHERE "
+            where_clause += f"({keys_str}) {operator} ({places})"
+            params += after
+
+        order = (
+            ", ".join(f"{key} DESC" for key in keys)
+            if descending
+            else keys_str
+        )
+        query = (
+            f"SELECT {columns_str} FROM {table}{where_clause}"
+            f" ORDER BY {order} LIMIT {limit};"
+        )
+        return query, params
+
+    @staticmethod
+    def _decode_page_token(token: str, keys: list[str]) -> list[Any]:
+        """
+        Give the keys of the last row of a page from its continuation token.
+
+        Parameters
+        ----------
+        token : str
+            Token returned by `read_page`.
+        keys : list[str]
+            Columns ordering the rows.
+
+        Returns
+        -------
+        list[Any]
+            Keys of the last row of the page.
+
+        Raises
+        ------
+        ValueError
+            If the token is invalid or was made for another ordering.
+        """
+        try:
+            token_keys, values = json.loads(base64.urlsafe_b64decode(token))
+        except (TypeError, ValueError) as exc:
+            msg = f"Invalid page token: {token!r}"
+            raise ValueError(msg) from exc
+
+        if token_keys != keys or len(values) != len(keys):
+            msg = f"Page token made for another ordering: {token_keys}"
+            raise ValueError(msg)
+        return list(values)
+
+    def _page_result(
+        self,
+        keys: list[str],
+        columns: list[str] | None,
+        columns_list: list[str],
+        rows: list[Any],
+        *,
+        limit: int,
+        return_type: ReturnType,
+    ) -> tuple[Any, str | None]:
+        """
+        Format the rows of a page and make its continuation token.
+
+        Parameters
+        ----------
+        keys : list[str]
+            Columns ordering the rows.
+        columns : list[str] | None
+            Selected columns, without the keys added by `_page_query`. None
+            if all columns are selected.
+        columns_list : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        limit : int
+            Maximum number of rows of the page.
+        return_type : ReturnType
+            Format of the returned data.
+
+        Returns
+        -------
+        Any
+            Rows of the page, formatted as by `read`.
+        str | None
+            Token of the next page, None if this page is the last one.
+        """
+        token = None
+        if rows and len(rows) >= limit:
+            if columns is None:
+                positions = [columns_list.index(key) for key in keys]
+            else:
+                positions = list(range(len(columns), len(columns) + len(keys)))
+            payload = json.dumps(
+                [keys, [rows[-1][position] for position in positions]],
+                default=str,
+                separators=(",", ":"),
+            )
+            token = base64.urlsafe_b64encode(payload.encode()).decode()
+
+        if columns is not None:
+            columns_list = columns_list[: len(columns)]
+            rows = [row[: len(columns)] for row in rows]
+            if return_type == "list" and len(columns) == 1:
+                return [row[0] for row in rows], token
+
+        return self._format_rows(columns_list, rows, return_type), token
+
+    @staticmethod
+    def _is_single_column(columns: str | list[str] | None) -> bool:
+        """
+        Check if only one column is selected.
+
+        Parameters
+        ----------
+        columns : str | list[str] | None
+            Selected columns, as given to `read`.
+
+        Returns
+        -------
+        bool
+            True if `columns` is a column name or a list of one column name.
+        """
+        return columns is not None and (
+            isinstance(columns, str) or len(columns) == 1
+        )
+
+    @staticmethod
+    def _format_rows(
+        columns: list[str], rows: list[Any], return_type: ReturnType
+    ) -> Any:  # ruff: ignore[any-type]
+        """
+        Format fetched rows.
+
+        Parameters
+        ----------
+        columns : list[str]
+            Names of the columns of the rows.
+        rows : list[Any]
+            Fetched rows.
+        return_type : ReturnType
+            Format of the returned data.
+
+        Returns
+        -------
+        list[Any] | dict[str, Any] | pd.DataFrame | pa.Table
+            Rows as they are if return_type is "list", a list of dict, with
+            columns as keys, if return_type is "list[dict]", a dictionary
+            with column names as keys and lists of values as values if
+            return_type is "dict", or a columnar structure otherwise.
+        """
+        if return_type == "list":
+            return rows
+
+        if return_type in {"dataframe", "numpy", "arrow"}:
+            # Rows are transposed once into columns, which are converted
+            # without building any intermediate per-row object.
+            values = list(zip(*rows, strict=True)) or [()] * len(columns)
+
+            # Imported on first use, since they make importing the data
+            # layer several times slower.
+            if return_type == "numpy":
+                import numpy as np  # ruff: ignore[import-outside-top-level]
+
+                return {
+                    column: np.array(column_values)
+                    for column, column_values in zip(
+                        columns, values, strict=True
+                    )
+                }
+
+            if return_type == "arrow":
+                import pyarrow as pa  # ruff: ignore[import-outside-top-level]
+
+                return pa.Table.from_arrays(
+                    [pa.array(column_values) for column_values in values],
+                    names=columns,
+                )
+
+            import pandas as pd  # ruff: ignore[import-outside-top-level]
+
+            # Columns are indexed by position, so that duplicate names (e.g.
+            # two `name` columns of a join) are kept.
+            df = pd.DataFrame(dict(enumerate(values)))
+            df.columns = pd.Index(columns)
+            return df
+
+        if return_type == "list[dict]":
+            data_list: list[dict[str, Any]] = []
+            for row in rows:
+                data_dict: dict[str, Any] = dict(
+                    zip(columns, row, strict=True)
+                )
+                data_list.append(data_dict)
+            return data_list
+
+        data_dict = {}
+
+        for idx, key in enumerate(columns):
+            data_dict[key] = [row[idx] for row in rows]
+
+        return data_dict
+
+    @staticmethod
+    def _conflict_clause(
+        table: str,
+        columns: Iterable[str],
+        on_conflict: Sequence[str] | None,
+        update: Sequence[str] | Literal["nothing"] | None,
+    ) -> str:
+        """
+        Build the ON CONFLICT clause of an upsert.
+
+        Rows are only updated if one of the updated columns changes, so that
+        writing again the same lines does not touch them.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        columns : Iterable[str]
+            Written columns.
+        on_conflict : Sequence[str] | None
+            Columns of the unique constraint or one column name. None if the
+            lines are simply inserted.
+        update : Sequence[str] | Literal["nothing"] | None
+            Columns updated on conflict, "nothing" to keep the existing rows,
+            or None to update all written columns except `on_conflict`.
+
+        Returns
+        -------
+        str
+            ON CONFLICT clause, starting with a space. Empty string if
+            `on_conflict` is None.
+        """
+        if on_conflict is None:
+            return ""
+
+        keys = [on_conflict] if isinstance(on_conflict, str) else on_conflict
+        clause = f" ON CONFLICT ({', '.join(keys)})"
+
+        if update == "nothing":
+            updated: Sequence[str] = []
+        elif update is None:
+            updated = [column for column in columns if column not in keys]
+        else:
+            updated = [update] if isinstance(update, str) else update
+
+        if not updated:
+            return clause + " DO NOTHING"
+
+        assignments = ", ".join(f"{col}=EXCLUDED.{col}" for col in updated)
+        old_values = ", ".join(f"{table}.{col}" for col in updated)
+        new_values = ", ".join(f"EXCLUDED.{col}" for col in updated)
+        return (
+            f"{clause} DO UPDATE SET {assignments}"
+            f" WHERE ({old_values}) IS DISTINCT FROM ({new_values})"
+        )
+
+    def _insert_queries(
+        self,
+        table: str,
+        data: list[dict[str, Any]],
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> Iterator[tuple[str, list[Any]]]:
+        """
+        Build the INSERT queries used by `write`, of at most 10 000 lines.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : list[dict[str, Any]]
+            Lines to write.
+        on_conflict : Sequence[str], optional
+            Columns of the unique constraint on which lines are upserted, by
+            default None. See `_conflict_clause`.
+        update : Sequence[str] | Literal["nothing"], optional
+            Columns updated on conflict, by default None. See
+            `_conflict_clause`.
+
+        Yields
+        ------
+        str
+            INSERT query.
+        list[Any]
+            Values to substitute into the query.
+
+        Raises
+        ------
+        ValueError
+            If all dictionaries do not have the same keys.
+        """
+        query_empty = f"INSERT INTO {table}"
+
+        columns = data[0].keys()
+        if any(d.keys() != columns for d in data):
+            msg = "All dictionaries must have the same keys."
+            raise ValueError(msg)
+
+        columns_str = ", ".join(columns)
+        query_empty += f" ({columns_str})"
+        conflict_clause = self._conflict_clause(
+            table, columns, on_conflict, update
+        )
+
+        # We add max 10 000 items by request
+        max_insert = 10000
+        for idx in range(0, len(data), max_insert):
+            data_request = data[idx : idx + max_insert]
+
+            line_place = ", ".join(["%s"] * len(columns))
+            values_place = ", ".join([f"({line_place})"] * len(data_request))
+            query = query_empty + f" VALUES {values_place}{conflict_clause};"
+
+            items = [
+                value for values in data_request for value in values.values()
+            ]
+            yield query, items
+
+    @staticmethod
+    def _copy_rows(
+        data: Iterable[dict[str, Any]],
+    ) -> tuple[list[str], Iterator[list[Any]]]:
+        """
+        Give the columns and the values of lines to write with COPY.
+
+        Parameters
+        ----------
+        data : Iterable[dict[str, Any]]
+            Lines to write.
+
+        Returns
+        -------
+        list[str]
+            Column names, empty if there is no line.
+        Iterator[list[Any]]
+            Values of each line, in the same order as columns. It raises a
+            ValueError when it reaches a line with other keys than the first
+            one.
+        """
+        rows = iter(data)
+        first_row = next(rows, None)
+        if first_row is None:
+            return [], iter([])
+
+        columns = list(first_row.keys())
+
+        def values() -> Iterator[list[Any]]:
+            for row in itertools.chain([first_row], rows):
+                if row.keys() != first_row.keys():
+                    msg = "All dictionaries must have the same keys."
+                    raise ValueError(msg)
+                yield [row[column] for column in columns]
+
+        return columns, values()
+
+    def _update_query(
+        self,
+        table: str,
+        update_data: dict[str, Any],
+        condition_data: dict[str, Any] | None = None,
+    ) -> tuple[str, list[Any]]:
+        """
+        Build the UPDATE query used by `update`.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        update_data : dict[str, Any]
+            New data.
+        condition_data : dict[str, Any], optional
+            Data to filter updated rows, by default None.
+
+        Returns
+        -------
+        str
+            UPDATE query.
+        list[Any]
+            Values to substitute into the query.
+        """
+        set_clause = ", ".join(f"{key}=%s" for key in update_data)
+        where_clause, params = self._where_clause(condition_data)
+
+        query = f"UPDATE {table} SET {set_clause}{where_clause};"
+        return query, list(update_data.values()) + params
+
+    def _delete_query(
+        self, table: str, condition_data: dict[str, Any] | None = None
+    ) -> tuple[str, list[Any]]:
+        """
+        Build the DELETE query used by `delete_rows` and `delete_all`.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        condition_data : dict[str, Any], optional
+            Conditions to filter rows to delete, by default None, which
+            deletes all rows.
+
+        Returns
+        -------
+        str
+            DELETE query.
+        list[Any]
+            Values to substitute into the query.
+        """
+        where_clause, params = self._where_clause(condition_data)
+        return f"DELETE FROM {table}{where_clause};", params
+
+    @staticmethod
+    def _stale_views(queries: Iterable[str]) -> list[str]:
+        """
+        Find the materialized views depending on tables modified by queries.
+
+        Parameters
+        ----------
+        queries : Iterable[str]
+            Executed SQL queries.
+
+        Returns
+        -------
+        list[str]
+            Names of the views to refresh.
+        """
+        tables = set().union(*map(written_tables, queries))
+        return [
+            view
+            for view in MATERIALIZED_VIEWS
+            if VIEW_DEPENDENCIES[view] & tables
+        ]
+
+    @staticmethod
+    def _key_columns(
+        key: str | Sequence[str], columns: list[str]
+    ) -> tuple[list[str], list[str]]:
+        """
+        Split the columns of keyed lines into key columns and other ones.
+
+        Parameters
+        ----------
+        key : str | Sequence[str]
+            Column or columns identifying the rows.
+        columns : list[str]
+            Columns of the lines.
+
+        Returns
+        -------
+        list[str]
+            Key columns.
+        list[str]
+            Other columns.
+
+        Raises
+        ------
+        ValueError
+            If a key column is not in `columns`.
+        """
+        keys = [key] if isinstance(key, str) else list(key)
+        missing = [column for column in keys if column not in columns]
+        if missing:
+            msg = f"Lines must contain the key columns: {missing}"
+            raise ValueError(msg)
+        return keys, [column for column in columns if column not in keys]
+
+    @staticmethod
+    def _update_from_query(
+        table: str, source: str, keys: list[str], columns: list[str]
+    ) -> str:
+        """
+        Build the UPDATE query used by `update_many`.
+
+        Only rows whose values change are updated.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        source : str
+            Name of the table holding the keys and the new values.
+        keys : list[str]
+            Key columns, joining `table` and `source`.
+        columns : list[str]
+            Updated columns.
+
+        Returns
+        -------
+        str
+            UPDATE ... FROM query.
+        """
+        set_clause = ", ".join(f"{column}=src.{column}" for column in columns)
+        join = " AND ".join(f"{table}.{key}=src.{key}" for key in keys)
+        old_values = ", ".join(f"{table}.{column}" for column in columns)
+        new_values = ", ".join(f"src.{column}" for column in columns)
+        return (
+            f"UPDATE {table} SET {set_clause} FROM {source} AS src WHERE"
+            f" {join} AND ({old_values}) IS DISTINCT FROM ({new_values});"
+        )
+
+    @staticmethod
+    def _delete_in_query(table: str, source: str, keys: list[str]) -> str:
+        """
+        Build the DELETE query used by `delete_many`.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        source : str
+            Name of the table holding the keys of the rows to delete.
+        keys : list[str]
+            Key columns.
+
+        Returns
+        -------
+        str
+            DELETE query.
+        """
+        keys_str = ", ".join(keys)
+        return (
+            f"DELETE FROM {table} WHERE ({keys_str}) IN"
+            f" (SELECT {keys_str} FROM {source});"
+        )
+
+
+class BatchResult:
+    """
+    Handle on the result of a query queued in a `Batch`.
+
+    The result is available once the batch is flushed, i.e. at the end of
+    the `with database.batch()` block.
+    """
+
+    def __init__(self) -> None:
+        self._done = False
+        self._value: Any = None
+
+    def set_result(self, value: Any) -> None:  # ruff: ignore[any-type]
+        """
+        Store the result of the query.
+
+        Parameters
+        ----------
+        value : Any
+            Result of the query.
+        """
+        self._value = value
+        self._done = True
+
+    def done(self) -> bool:
+        """
+        Check if the result is available.
+
+        Returns
+        -------
+        bool
+            True if the batch of the query has been flushed.
+        """
+        return self._done
+
+    def result(self) -> Any:  # ruff: ignore[any-type]
+        """
+        Give the result of the query.
+
+        Returns
+        -------
+        Any
+            Result of the query, in the same format as the corresponding
+            method of `SQLInterface`.
+
+        Raises
+        ------
+        RuntimeError
+            If the batch of the query has not been flushed yet.
+        """
+        if not self._done:
+            msg = "The batch has not been flushed yet."
+            raise RuntimeError(msg)
+        return self._value
+
+
+class Batch(SQLBuilder):
+    """
+    Queue of queries sent together to the database.
+
+    Queries are not executed when they are queued: each method returns a
+    `BatchResult` whose result is available once the batch is flushed.
+
+    Parameters
+    ----------
+    database : SQLInterface
+        Database which executes the queries.
+    """
+
+    def __init__(self, database: "SQLInterface") -> None:
+        self.database = database
+        self._queries: list[tuple[str, list[Any] | None]] = []
+        self._handlers: list[
+            tuple[BatchResult, Callable[[list[str], list[Any]], Any]]
+        ] = []
+
+    def _queue(
+        self,
+        query: str,
+        params: list[Any] | None,
+        handler: Callable[[list[str], list[Any]], Any],
+    ) -> BatchResult:
+        """
+        Queue a query.
+
+        Parameters
+        ----------
+        query : str
+            SQL query to execute.
+        params : list[Any] | None
+            Values to substitute into the query.
+        handler : Callable[[list[str], list[Any]], Any]
+            Function building the result of the query from the names of the
+            returned columns and the fetched rows.
+
+        Returns
+        -------
+        BatchResult
+            Handle on the result of the query.
+        """
+        handle = BatchResult()
+        self._queries.append((query, params))
+        self._handlers.append((handle, handler))
+        return handle
+
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        return_type: ReturnType = "list",
+    ) -> BatchResult:
+        """
+        Queue a SQL query.
+
+        Parameters are the same as `SQLInterface.execute` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle on the result of `SQLInterface.execute`.
+        """
+        return self._queue(
+            query,
+            params,
+            lambda columns, rows: self._format_rows(
+                columns, rows, return_type
+            ),
+        )
+
+    def read(
+        self,
+        table: str,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        number_values: int | None = None,
+        return_type: ReturnType = "list[dict]",
+    ) -> BatchResult:
+        """
+        Queue a read of data from the database.
+
+        Parameters are the same as `SQLInterface.read` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle on the result of `SQLInterface.read`.
+        """
+        query, params = self._select_query(
+            table, columns, condition_data, number_values
+        )
+
+        def handler(columns_list: list[str], rows: list[Any]) -> Any:  # ruff: ignore[any-type]
+            if return_type == "list" and self._is_single_column(columns):
+                return [row[0] for row in rows]
+            return self._format_rows(columns_list, rows, return_type)
+
+        return self._queue(query, params, handler)
+
+    def write(
+        self,
+        table: str,
+        data: list[dict[str, Any]] | dict[str, Any],
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> BatchResult:
+        """
+        Queue the writing of new lines with INSERT statements.
+
+        Parameters are the same as `SQLInterface.write` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle whose result is None.
+        """
+        if isinstance(data, dict):
+            data = [data]
+
+        handle = BatchResult()
+        for query, items in self._insert_queries(
+            table, data, on_conflict, update
+        ):
+            handle = self._queue(query, items, lambda _c, _r: None)
+        return handle
+
+    def update(
+        self,
+        table: str,
+        update_data: dict[str, Any],
+        condition_data: dict[str, Any] | None = None,
+    ) -> BatchResult:
+        """
+        Queue an update of rows in a table.
+
+        Parameters are the same as `SQLInterface.update` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle whose result is None.
+        """
+        query, params = self._update_query(table, update_data, condition_data)
+        return self._queue(query, params, lambda _c, _r: None)
+
+    def delete_rows(
+        self, table: str, condition_data: dict[str, Any]
+    ) -> BatchResult:
+        """
+        Queue a deletion of rows of a given table.
+
+        Parameters are the same as `SQLInterface.delete_rows` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle whose result is None.
+
+        Raises
+        ------
+        ValueError
+            If there is no condition.
+        """
+        if not condition_data:
+            msg = "Conditions are required, use `delete_all` instead."
+            raise ValueError(msg)
+
+        query, params = self._delete_query(table, condition_data)
+        return self._queue(query, params, lambda _c, _r: None)
+
+    def delete_all(self, table: str) -> BatchResult:
+        """
+        Queue a deletion of all rows of a given table.
+
+        Parameters are the same as `SQLInterface.delete_all` ones.
+
+        Returns
+        -------
+        BatchResult
+            Handle whose result is None.
+        """
+        query, params = self._delete_query(table)
+        return self._queue(query, params, lambda _c, _r: None)
+
+    def flush(self) -> None:
+        """Execute the queued queries and set the results of their handles."""
+        queries, handlers = self._queries, self._handlers
+        self._queries, self._handlers = [], []
+        if not queries:
+            return
+
+        results = self.database.execute_batch(queries)
+        for (handle, handler), (columns, rows) in zip(
+            handlers, results, strict=True
+        ):
+            handle.set_result(handler(columns, rows))
+
+    def clear(self) -> None:
+        """Drop the queued queries, whose handles never get a result."""
+        self._queries, self._handlers = [], []
+
+
+class GuardedQuery:
+    """
+    Query run with guard rails, whose rows are fetched by chunks.
+
+    It is made by `SQLInterface.execute_guarded` to run queries written by
+    users: the database cancels the query when it runs too long, at most
+    `max_rows` rows are fetched, and the query can be cancelled from
+    another thread. Iterating over it runs the query and yields the rows by
+    chunks, so that they can be shown while the next ones are fetched.
+
+    Parameters
+    ----------
+    fetch : Callable[[GuardedQuery], Generator[list[Any]]]
+        Function of the interface running the query and yielding its rows by
+        chunks of `chunk_size` rows.
+    timeout : float
+        Time in seconds after which the database cancels the query.
+    max_rows : int
+        Maximum number of fetched rows.
+    chunk_size : int
+        Number of rows fetched at a time.
+
+    Attributes
+    ----------
+    timeout : float
+        Time in seconds after which the database cancels the query.
+    max_rows : int
+        Maximum number of fetched rows.
+    chunk_size : int
+        Number of rows fetched at a time.
+    columns : list[str]
+        Names of the returned columns, known once the query has started.
+    row_count : int
+        Number of rows yielded so far.
+    truncated : bool
+        Whether the query returns more than `max_rows` rows.
+    cancelled : bool
+        Whether `cancel` has been called.
+    canceller : Callable[[], None] | None
+        Function cancelling the running query on the server, set by the
+        interface while the query runs.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[["GuardedQuery"], Generator[list[Any]]],
+        *,
+        timeout: float,
+        max_rows: int,
+        chunk_size: int,
+    ) -> None:
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+        self.columns: list[str] = []
+        self.row_count = 0
+        self.truncated = False
+        self.cancelled = False
+        self.canceller: Callable[[], None] | None = None
+
+        self._fetch = fetch
+
+    def __iter__(self) -> Iterator[list[Any]]:
+        """
+        Run the query and yield its rows by chunks.
+
+        Iteration stops after `max_rows` rows or when the query is
+        cancelled. Stopping it early, e.g. with `break`, closes the cursor,
+        so remaining rows are never sent by the database.
+
+        Yields
+        ------
+        list[Any]
+            Chunk of at most `chunk_size` rows.
+        """
+        chunks = self._fetch(self)
+        try:
+            for chunk in chunks:
+                rows = self._take(chunk)
+                if not rows:
+                    break
+                yield rows
+        except Exception:
+            # The database raises an error in the query cancelled by `cancel`.
+            if not self.cancelled:
+                raise
+        finally:
+            chunks.close()
+
+    def _take(self, chunk: list[Any]) -> list[Any]:
+        """
+        Count the rows of a chunk which can be yielded.
+
+        Parameters
+        ----------
+        chunk : list[Any]
+            Fetched rows.
+
+        Returns
+        -------
+        list[Any]
+            Rows of the chunk within `max_rows`, none if the query is
+            cancelled.
+        """
+        if self.cancelled:
+            return []
+
+        rows = chunk[: self.max_rows - self.row_count]
+        self.truncated = len(rows) < len(chunk)
+        self.row_count += len(rows)
+        return rows
+
+    def cancel(self) -> None:
+        """
+        Cancel the query, e.g. from a button of another thread.
+
+        The running statement is cancelled on the server and the iteration
+        stops, without error, at its next chunk.
+        """
+        self.cancelled = True
+        canceller = self.canceller
+        if canceller is not None:
+            canceller()
+
+
+class SQLInterface(SQLBuilder, ABC):
+    """Interface for SQL communcation."""
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["list"] = "list",
+    ) -> list[Any]: ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["dict"] = ...,
+    ) -> dict[str, list[Any]]: ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["list[dict]"] = ...,
+    ) -> list[dict[str, Any]]: ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["dataframe"] = ...,
+    ) -> "pd.DataFrame": ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["numpy"] = ...,
+    ) -> dict[str, "npt.NDArray[Any]"]: ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = ...,
+        return_type: Literal["arrow"] = ...,
+    ) -> "pa.Table": ...
+
+    @abstractmethod
+    def execute(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        return_type: ReturnType = "list",
+    ) -> Any:
+        """
+        Execute a SQL query.
 
+        Parameters
+        ----------
+        query : str
+            SQL query to execute.
+        params : list[Any], optional
+            Values to substitute into the query, by default None.
+        return_type : ReturnType, optional
+            Format of the returned data, by default "list". See `read` for
+            the available formats.
 
-class SQLInterface(ABC):
-    """Interface for SQL communcation."""
+        Returns
+        -------
+        list[Any] | dict[str, list[Any]] | pd.DataFrame | pa.Table
+            Query result. If the query is a SELECT statement, it returns the
+            fetched rows, as they are if return_type is "list". For other
+            queries, it returns no rows.
+        """
+        raise NotImplementedError
 
     @abstractmethod
-    def execute(
+    def execute_with_columns(
         self, query: str, params: list[Any] | None = None
-    ) -> list[Any]:
+    ) -> tuple[list[str], list[Any]]:
         """
-        Execute a SQL query.
+        Execute a SQL query and give the names of the returned columns.
 
         Parameters
         ----------
@@ -25,12 +1274,24 @@ class SQLInterface(ABC):
 
         Returns
         -------
+        list[str]
+            Names of the returned columns. Empty if the query does not
+            return rows.
         list[Any]
-            Query result. If the query is a SELECT statement, it returns the
-            fetched rows. For other queries, it returns an empty list.
+            Fetched rows, empty if the query does not return rows.
         """
         raise NotImplementedError
 
+    @overload
+    def read(
+        self,
+        table: str,
+        columns: str | list[str] | None = ...,
+        condition_data: dict[str, Any] | None = ...,
+        number_values: int | None = ...,
+        return_type: Literal["list[dict]"] = "list[dict]",
+    ) -> list[dict[str, Any]]: ...
+
     @overload
     def read(
         self,
@@ -58,8 +1319,28 @@ class SQLInterface(ABC):
         columns: str | list[str] | None = ...,
         condition_data: dict[str, Any] | None = ...,
         number_values: int | None = ...,
-        return_type: Literal["list[dict]"] = "list[dict]",
-    ) -> list[dict[str, Any]]: ...
+        return_type: Literal["dataframe"] = ...,
+    ) -> "pd.DataFrame": ...
+
+    @overload
+    def read(
+        self,
+        table: str,
+        columns: str | list[str] | None = ...,
+        condition_data: dict[str, Any] | None = ...,
+        number_values: int | None = ...,
+        return_type: Literal["numpy"] = ...,
+    ) -> dict[str, "npt.NDArray[Any]"]: ...
+
+    @overload
+    def read(
+        self,
+        table: str,
+        columns: str | list[str] | None = ...,
+        condition_data: dict[str, Any] | None = ...,
+        number_values: int | None = ...,
+        return_type: Literal["arrow"] = ...,
+    ) -> "pa.Table": ...
 
     @abstractmethod
     def read(
@@ -68,7 +1349,7 @@ class SQLInterface(ABC):
         columns: str | list[str] | None = None,
         condition_data: dict[str, Any] | None = None,
         number_values: int | None = None,
-        return_type: Literal["list", "dict", "list[dict]"] = "list[dict]",
+        return_type: ReturnType = "list[dict]",
     ) -> Any:
         """
         Read data from the database.
@@ -78,6 +1359,10 @@ class SQLInterface(ABC):
         WHERE condition_data.keys()=condition_data.values()
         LIMIT number_values;
 
+        Keys of `condition_data` can end with a comparison operator, e.g.
+        {"year >=": 2000}, and list values match any of their elements, e.g.
+        {"id": [1, 2, 3]} (see `SQLBuilder._where_clause`).
+
         Parameters
         ----------
         table : str
@@ -91,24 +1376,33 @@ class SQLInterface(ABC):
         number_values : int, optional
             Maximum number of rows to return, by default None, which selects
             all rows.
-        return_type : Literal["list", "dict", "list[dict], optional
+        return_type : ReturnType, optional
             Format of the returned data, by default "list[dict]".
 
         Returns
         -------
-        list[dict[str, Any] | tuple[Any] | Any] | dict[str, list[Any]]
+        list[Any] | dict[str, Any] | pd.DataFrame | pa.Table
             Queried data in the specified format. If return_type is
             "list[dict]" it returns a list of dict, where each dict is a line,
             with columns as keys. If return_type is "list", it returns a list
             of lists with data in same order as columns. If return_type is
             "dict",  it returns a dictionary with column names as keys and
-            lists of values as values.
+            lists of values as values. If return_type is "dataframe",
+            "numpy" or "arrow", data is built column by column into a pandas
+            DataFrame, a dictionary of NumPy arrays with column names as keys
+            or a pyarrow Table.
         """
         raise NotImplementedError
 
     @abstractmethod
     def write(
-        self, table: str, data: list[dict[str, Any]] | dict[str, Any]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
     ) -> None:
         """
         Write new lines to the specified table.
@@ -117,19 +1411,51 @@ class SQLInterface(ABC):
         INSERT INTO table (data[0].keys())
         VALUES (data[0].values()), (data[1].values());
 
+        With `on_conflict`, lines are upserted, so that a load can be run
+        again: ON CONFLICT (on_conflict) DO UPDATE SET update=EXCLUDED.update
+        WHERE (update) IS DISTINCT FROM (EXCLUDED.update). Unchanged rows are
+        not touched.
+
+        Once the lines are committed, the materialized views depending on
+        `table` are refreshed entirely, which may take longer than the write
+        itself. Several writes grouped in `transaction`, `batch` or
+        `defer_refresh` refresh them only once.
+
         Parameters
         ----------
         table : str
             Table name.
-        data : list[dict[str, Any]] | dict[str, Any]
-            List of lines to write. For each dict, keys are column names and
-            values are values to write. If data is a dict, it writes a single
-            line.
+        data : Iterable[dict[str, Any]] | dict[str, Any]
+            Lines to write. For each dict, keys are column names and values
+            are values to write. If data is a dict, it writes a single line.
+        method : Literal["auto", "insert", "copy"], optional
+            How lines are sent to the database, by default "auto". "insert"
+            sends INSERT statements, "copy" streams lines with a bulk copy
+            and "auto" chooses according to the number of lines.
+        on_conflict : Sequence[str], optional
+            Columns of a unique constraint, or one column name, on which
+            lines conflicting with existing rows are upserted. By default
+            None, which raises an error on conflict. Lines written together
+            must not conflict with each other.
+        update : Sequence[str] | Literal["nothing"], optional
+            Columns updated on conflict, or "nothing" to keep the existing
+            rows. By default None, which updates all written columns except
+            `on_conflict`.
 
         Raises
         ------
         ValueError
             If all dictionaries do not have the same keys.
+
+        Examples
+        --------
+        >>> database.write("city", cities, on_conflict="id")
+        >>> database.write(
+        ...     "result",
+        ...     results,
+        ...     on_conflict=["id_rally", "id"],
+        ...     update="nothing",
+        ... )
         """
         raise NotImplementedError
 
@@ -147,6 +1473,9 @@ class SQLInterface(ABC):
         UPDATE table SET update_data.keys()=update_data.values() WHERE
         condition_data.keys()=condition_data.values();
 
+        As for `write`, the materialized views depending on `table` are
+        refreshed entirely once the update is committed.
+
         Parameters
         ----------
         table : str
@@ -154,7 +1483,79 @@ class SQLInterface(ABC):
         update_data : dict[str, Any]
             New data.
         condition_data : dict[str, Any], optional
-            Data to filter updated rows, by default None.
+            Data to filter updated rows, by default None. See `read` for the
+            syntax of conditions.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_many(
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        """
+        Update many rows, each with its own values, in one statement.
+
+        Lines are loaded into a temporary table, which is joined to `table`
+        by a single UPDATE ... FROM, instead of one UPDATE per row.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : Iterable[dict[str, Any]]
+            New values. Each dict holds the key columns of a row and the new
+            values of the columns to update. All dicts must have the same
+            keys.
+        key : str | Sequence[str], optional
+            Column or columns identifying the rows, by default "id".
+
+        Returns
+        -------
+        int
+            Number of updated rows. Rows whose values do not change are not
+            updated.
+
+        Raises
+        ------
+        ValueError
+            If all dictionaries do not have the same keys or lack a key
+            column.
+
+        Examples
+        --------
+        >>> database.update_many(
+        ...     "result",
+        ...     [{"id": 1, "time": 3605.2}, {"id": 2, "time": 3598.7}],
+        ... )
+        2
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_many(self, table: str, data: Iterable[dict[str, Any]]) -> int:
+        """
+        Delete many rows, identified by their keys, in one statement.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : Iterable[dict[str, Any]]
+            Keys of the rows to delete, e.g. {"id": 3} or
+            {"id_rally": 1, "id_team": 4}. All dicts must have the same keys.
+
+        Returns
+        -------
+        int
+            Number of deleted rows.
+
+        Raises
+        ------
+        ValueError
+            If all dictionaries do not have the same keys.
         """
         raise NotImplementedError
 
@@ -166,39 +1567,431 @@ class SQLInterface(ABC):
         columns_type: list[str],
     ) -> None:
         """
-        Create a new table.
+        Create a new table.
+
+        Not implemented, inputs can be changed.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_rows(self, table: str, condition_data: dict[str, Any]) -> None:
+        """
+        Delete rows of a given table based on specified conditions.
+
+        To delete all rows, use `delete_all` method.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        condition_data : dict[str, Any]
+            Conditions to filter rows to delete. See `read` for the syntax of
+            conditions.
+
+        Raises
+        ------
+        ValueError
+            If there is no condition.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_all(self, table: str) -> None:
+        """
+        Delete all rows of a given table.
+
+        To select only specific rows, use `delete_rows` method.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        itersize: int = 1000,
+        return_type: Literal["list", "dict", "list[dict]"] = "list",
+    ) -> Iterator[Any]:
+        """
+        Execute a SELECT query and iterate over its rows.
+
+        Rows are fetched from the database by chunks of `itersize` rows, so
+        the memory used does not depend on the number of rows returned.
+
+        Parameters
+        ----------
+        query : str
+            SELECT query to execute.
+        params : list[Any], optional
+            Values to substitute into the query, by default None.
+        itersize : int, optional
+            Number of rows fetched at a time, by default 1000.
+        return_type : Literal["list", "dict", "list[dict]"], optional
+            Format of the yielded data, by default "list".
+
+        Yields
+        ------
+        tuple[Any, ...] | dict[str, Any] | dict[str, list[Any]]
+            If return_type is "list", each row as a tuple. If return_type is
+            "list[dict]", each row as a dict with columns as keys. If
+            return_type is "dict", each chunk of at most `itersize` rows as a
+            dictionary with column names as keys and lists of values as
+            values.
+        """
+        raise NotImplementedError
+
+    def iter_read(
+        self,
+        table: str,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        itersize: int = 1000,
+        return_type: Literal["list", "dict", "list[dict]"] = "list[dict]",
+    ) -> Iterator[Any]:
+        """
+        Iterate over data of the database without loading it all in memory.
+
+        The query's shape is the same as `read` one, and rows are fetched by
+        chunks of `itersize` rows.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        columns : str | list[str], optional
+            List of column names to select or just one column name. By default
+            None, which selects all columns.
+        condition_data : dict[str, Any], optional
+            Dictionary with conditions that lines must meet to be read. By
+            default None.
+        itersize : int, optional
+            Number of rows fetched at a time, by default 1000.
+        return_type : Literal["list", "dict", "list[dict]"], optional
+            Format of the yielded data, by default "list[dict]".
+
+        Yields
+        ------
+        tuple[Any, ...] | Any | dict[str, Any] | dict[str, list[Any]]
+            Same as `stream`, except that if return_type is "list" and only
+            one column is selected, values are yielded instead of tuples.
+        """
+        query, params = self._select_query(table, columns, condition_data)
+        rows = self.stream(query, params, itersize, return_type)
+
+        if return_type == "list" and self._is_single_column(columns):
+            yield from (row[0] for row in rows)
+        else:
+            yield from rows
+
+    @abstractmethod
+    def execute_guarded(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        timeout: float = 5.0,
+        max_rows: int = 10000,
+        chunk_size: int = 1000,
+    ) -> GuardedQuery:
+        """
+        Prepare a query written by a user, to run it with guard rails.
+
+        Unlike `execute`, rows are fetched by chunks, through a server-side
+        cursor on PostgreSQL, so that a query returning millions of rows
+        neither loads them all in memory nor holds a connection for long.
+        Results are not cached.
+
+        Parameters
+        ----------
+        query : str
+            SQL query, which must return rows (e.g. a SELECT query).
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+        timeout : float, optional
+            Time in seconds after which the database cancels the query, by
+            default 5. On PostgreSQL, it is the `statement_timeout` of each
+            fetch.
+        max_rows : int, optional
+            Maximum number of fetched rows, by default 10 000.
+        chunk_size : int, optional
+            Number of rows fetched at a time, by default 1000.
+
+        Returns
+        -------
+        GuardedQuery
+            Query, run when iterated over.
+
+        Examples
+        --------
+        >>> guarded = database.execute_guarded("SELECT * FROM result;")
+        >>> for rows in guarded:
+        ...     print(len(rows), guarded.columns)
+        >>> guarded.truncated
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def explain(
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        analyze: bool = True,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """
+        Give the plan chosen by the database to run a query.
+
+        With `analyze`, the query is run to measure each node of the plan,
+        then rolled back, so that a modifying query changes nothing.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+        analyze : bool, optional
+            Whether to run the query to measure the actual times, numbers of
+            rows and buffers of each node, by default True.
+        timeout : float | None, optional
+            Time in seconds after which the database cancels the query, by
+            default None (no limit).
+
+        Returns
+        -------
+        dict[str, Any]
+            Plan in the JSON format of PostgreSQL's EXPLAIN: the root node is
+            under "Plan", each node has a "Node Type" and its children under
+            "Plans", and "Execution Time" is given in milliseconds with
+            `analyze`.
+
+        Examples
+        --------
+        >>> plan = database.explain(
+        ...     "SELECT * FROM result WHERE id_stage=%s;", [3]
+        ... )
+        >>> plan["Execution Time"], seq_scans(plan)
+        """
+        raise NotImplementedError
+
+    def read_page(
+        self,
+        table: str,
+        order_by: str | Sequence[str] = "id",
+        after: str | None = None,
+        limit: int = 1000,
+        *,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        return_type: ReturnType = "list[dict]",
+    ) -> tuple[Any, str | None]:
+        """
+        Read a page of rows, starting after the previous page.
+
+        Pages are read with keyset pagination: the query's shape is
+        SELECT columns FROM table WHERE (order_by) > (last keys)
+        ORDER BY order_by LIMIT limit;
+        so each page costs the same if `order_by` is indexed, e.g. a primary
+        key, unlike LIMIT ... OFFSET which reads all previous rows.
+
+        Parameters
+        ----------
+        table : str
+            Table name.
+        order_by : str | Sequence[str], optional
+            Column or columns ordering the rows, each optionally followed by
+            "ASC" or "DESC", all in the same direction. By default "id". They
+            must identify the rows and not be NULL, e.g. end with the primary
+            key.
+        after : str | None, optional
+            Token returned with the previous page, by default None, which
+            reads the first page. A ValueError is raised if it was not made
+            for this ordering.
+        limit : int, optional
+            Maximum number of rows of the page, by default 1000.
+        columns : str | list[str], optional
+            List of column names to select or just one column name. By default
+            None, which selects all columns.
+        condition_data : dict[str, Any], optional
+            Dictionary with conditions that lines must meet to be read. By
+            default None. See `read` for the syntax of conditions.
+        return_type : ReturnType, optional
+            Format of the returned data, by default "list[dict]". See `read`.
+
+        Returns
+        -------
+        Any
+            Rows of the page, formatted as by `read`.
+        str | None
+            Opaque token to pass as `after` to read the next page, None if
+            this page is the last one.
+
+        Examples
+        --------
+        >>> token = None
+        >>> while True:
+        ...     results, token = database.read_page("result", after=token)
+        ...     if token is None:
+        ...         break
+        """
+        keys, descending = self._order_columns(order_by)
+        after_keys = (
+            None if after is None else self._decode_page_token(after, keys)
+        )
+        selected = [columns] if isinstance(columns, str) else columns
+
+        query, params = self._page_query(
+            table,
+            keys,
+            descending,
+            after_keys,
+            limit,
+            columns=selected,
+            condition_data=condition_data,
+        )
+        columns_list, rows = self.execute_with_columns(query, params)
+        return self._page_result(
+            keys,
+            selected,
+            columns_list,
+            rows,
+            limit=limit,
+            return_type=return_type,
+        )
+
+    def execute_batch(
+        self, queries: list[tuple[str, list[Any] | None]]
+    ) -> list[tuple[list[str], list[Any]]]:
+        """
+        Execute several SQL queries.
+
+        By default, queries are executed one after the other. Subclasses can
+        send them together to the database, in a single transaction.
+
+        Parameters
+        ----------
+        queries : list[tuple[str, list[Any] | None]]
+            Queries to execute, with the values to substitute into them.
+
+        Returns
+        -------
+        list[tuple[list[str], list[Any]]]
+            Names of the returned columns and fetched rows of each query, as
+            given by `execute_with_columns`.
+        """
+        return list(itertools.starmap(self.execute_with_columns, queries))
+
+    @contextmanager
+    def batch(self) -> Generator[Batch]:
+        """
+        Queue queries and send them together at the end of the block.
+
+        Results are available through the handles returned when queueing
+        queries, once the block is exited.
+
+        Yields
+        ------
+        Batch
+            Queue of queries.
+
+        Examples
+        --------
+        >>> with database.batch() as batch:
+        ...     rally = batch.read("rally", condition_data={"id": 1})
+        ...     stages = batch.read("stage", condition_data={"id_rally": 1})
+        >>> rally.result()
+        """
+        batch = Batch(self)
+        try:
+            yield batch
+        except BaseException:
+            # Queries queued by a failed block are not sent.
+            batch.clear()
+            raise
+        else:
+            batch.flush()
+
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager[None]:
+        """
+        Run the queries of a block in one transaction.
+
+        Queries of the block are committed together at the end of the block,
+        or rolled back together if an exception is raised. A transaction
+        opened inside another one is a savepoint: an exception raised in it
+        only rolls back its own queries if it is caught in the outer block.
+
+        Returns
+        -------
+        AbstractContextManager[None]
+            Context manager of the transaction.
+
+        Examples
+        --------
+        >>> with database.transaction():
+        ...     database.write("rally", {"name": "Paris Dakar", "year": 2026})
+        ...     database.delete_rows("rally", {"year": 1995})
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def defer_refresh(self) -> AbstractContextManager[None]:
+        """
+        Refresh the materialized views once, at the end of a block.
 
-        Not implemented, inputs can be changed.
+        Each write committed outside a transaction refreshes the views made
+        stale by its tables. In this block, they are refreshed once for all
+        the writes of the block when it ends, even if an exception is
+        raised, since the writes committed before it are kept. Until then,
+        reads of the views may miss the writes of the block.
+
+        Returns
+        -------
+        AbstractContextManager[None]
+            Context manager deferring the refreshes.
+
+        Examples
+        --------
+        >>> with database.defer_refresh():
+        ...     for result in results:
+        ...         database.write("result", result, on_conflict="id")
         """
         raise NotImplementedError
 
     @abstractmethod
-    def delete_rows(self, table: str, condition_data: dict[str, Any]) -> None:
+    def refresh_views(self, *views: str) -> None:
         """
-        Delete rows of a given table based on specified conditions.
+        Recompute materialized views from their tables.
 
-        To delete all rows, use `delete_all` method.
+        Views made stale by a write are refreshed automatically once it is
+        committed, or at the end of `defer_refresh`, so this is only needed
+        after writes made by other clients.
 
         Parameters
         ----------
-        table : str
-            Table name.
-        condition_data : dict[str, Any]
-            Conditions to filter rows to delete.
+        *views : str
+            Names of the views, refreshed in this order. By default, all
+            materialized views of `database_creation.ddl` and
+            `data/migrations` created in the database, in the order of
+            `MATERIALIZED_VIEWS`.
         """
         raise NotImplementedError
 
     @abstractmethod
-    def delete_all(self, table: str) -> None:
+    def warmup(self) -> None:
         """
-        Delete all rows of a given table.
-
-        To select only specific rows, use `delete_rows` method.
+        Open the connections to the database before the first query.
 
-        Parameters
-        ----------
-        table : str
-            Table name.
+        Connections are opened on first use, so that creating the object,
+        e.g. when importing a module, does not wait for the database. Calling
+        this method, e.g. from a background thread at startup, hides this
+        wait from the first query.
         """
         raise NotImplementedError
 
@@ -211,6 +2004,42 @@ class PostgreSQL(SQLInterface):
     """
     Class to read and write data from and to a PostgreSQL database.
 
+    By default, all queries go through one shared connection, used by one
+    thread at a time. In pooled mode, each query borrows a connection from a
+    pool for its duration, so several threads (e.g. several Streamlit
+    sessions) can run queries in parallel.
+
+    No connection is opened before the first query or a call to `warmup`.
+
+    Parameters
+    ----------
+    hostname : str
+        Hostname of the database server.
+    db_name : str
+        Name of the database.
+    username : str
+        Username to connect to the database.
+    password : str
+        Password to connect to the database.
+    port : int
+        Port number of the database server.
+    pooled : bool, optional
+        Whether to use a pool of connections, by default False.
+    min_size : int, optional
+        Minimum number of connections kept open by the pool, by default 1.
+    max_size : int, optional
+        Maximum number of connections opened by the pool, by default 10.
+    timeout : float, optional
+        Maximum time in seconds to wait for a connection of the pool, by
+        default 30.
+    copy_threshold : int, optional
+        Minimum number of lines from which `write` uses COPY instead of
+        INSERT when its method is "auto", by default 1000.
+    cache : QueryCache | None, optional
+        Cache of query results, by default None (no cache).
+    monitor : QueryMonitor | None, optional
+        Monitor measuring each query, by default None (no measure).
+
     Attributes
     ----------
     hostname : str
@@ -223,10 +2052,17 @@ class PostgreSQL(SQLInterface):
         Password to connect to the database.
     port : int
         Port number of the database server.
-    conn : psycopg2.extensions.connection
-        Connection object to the database.
-    cursor : psycopg2.extensions.cursor
-        Cursor object to execute SQL queries.
+    copy_threshold : int
+        Minimum number of lines from which `write` uses COPY.
+    cache : QueryCache | None
+        Cache of query results, None if results are not cached.
+    monitor : QueryMonitor | None
+        Monitor measuring each query, None if queries are not measured.
+    pool : ConnectionPool | None
+        Pool of connections in pooled mode, None otherwise.
+    conn : psycopg.Connection | None
+        Shared connection when not in pooled mode, None in pooled mode or
+        before the first query.
     """
 
     def __init__(
@@ -236,160 +2072,888 @@ class PostgreSQL(SQLInterface):
         username: str,
         password: str,
         port: int,
+        *,
+        pooled: bool = False,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        copy_threshold: int = 1000,
+        cache: QueryCache | None = None,
+        monitor: QueryMonitor | None = None,
     ) -> None:
         self.hostname = hostname
         self.db_name = db_name
         self.username = username
         self.password = password
         self.port = port
+        self.copy_threshold = copy_threshold
+        self.cache = cache
+        self.monitor = monitor
+
+        self.pool: ConnectionPool | None = None
+        self.conn: psycopg.Connection[Any] | None = None
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Connection and queries of the transaction of each thread.
+        self._local = threading.local()
+
+        if pooled:
+            self.pool = ConnectionPool(
+                kwargs=self._connection_kwargs(),
+                min_size=min_size,
+                max_size=max_size,
+                timeout=timeout,
+                check=ConnectionPool.check_connection,
+                open=False,
+            )
 
-        self.conn = psycopg.connect(
-            host=self.hostname,
-            dbname=self.db_name,
-            user=self.username,
-            password=self.password,
-            port=self.port,
-        )
+    def _connection_kwargs(self) -> dict[str, Any]:
+        """
+        Give the parameters to open a connection to the database.
+
+        Returns
+        -------
+        dict[str, Any]
+            Keyword arguments for `psycopg.connect`.
+        """
+        return {
+            "host": self.hostname,
+            "dbname": self.db_name,
+            "user": self.username,
+            "password": self.password,
+            "port": self.port,
+        }
+
+    @contextmanager
+    def _connection(self) -> Generator[psycopg.Connection[Any]]:
+        """
+        Check out a connection for the duration of a block.
+
+        The transaction is committed at the end of the block, or rolled back
+        if an exception is raised.
+
+        Yields
+        ------
+        psycopg.Connection
+            Connection borrowed from the pool in pooled mode, shared
+            connection otherwise. In a transaction, connection of the
+            transaction.
+        """
+        if self.pool is not None:
+            pinned: psycopg.Connection[Any] | None = getattr(
+                self._local, "conn", None
+            )
+            if pinned is not None:
+                yield pinned
+                return
+
+            self.pool.open()
+            with self.pool.connection() as conn:
+                yield conn
+            return
+
+        with self._lock:
+            if self.conn is None or self.conn.closed:
+                self.conn = psycopg.connect(**self._connection_kwargs())
+
+            # Only the outermost block of the thread holding the lock ends the
+            # transaction, e.g. a query run while iterating over `stream` must
+            # not close its server-side cursor.
+            self._depth += 1
+            try:
+                yield self.conn
+            except:
+                self._depth -= 1
+                if not self._depth and not self.conn.closed:
+                    self.conn.rollback()
+                raise
+            self._depth -= 1
+            if not self._depth:
+                self.conn.commit()
+
+    @contextmanager
+    def transaction(self) -> Generator[None]:  # ruff: ignore[undocumented-public-method]
+        outermost = not self._in_transaction()
+        queries: list[str] = []
+        with self._connection() as conn:
+            if outermost:
+                # The other queries of the thread use the same connection
+                # until the end of the transaction.
+                self._local.conn = conn
+                self._local.queries = queries
+
+            try:
+                # psycopg makes a savepoint if a transaction is in progress.
+                with conn.transaction():
+                    yield
+            finally:
+                if outermost:
+                    self._local.conn = None
+                    self._local.queries = None
+                    # Other connections may have cached results of tables
+                    # modified by the transaction before it ended.
+                    if self.cache is not None:
+                        for query in queries:
+                            self.cache.invalidate_query(query)
+
+        # Only reached once the transaction is committed.
+        self._refresh_stale_views(*queries)
+
+    @contextmanager
+    def defer_refresh(self) -> Generator[None]:  # ruff: ignore[undocumented-public-method]
+        if getattr(self._local, "deferred", None) is not None:
+            yield
+            return
+
+        queries: list[str] = []
+        self._local.deferred = queries
+        try:
+            yield
+        finally:
+            self._local.deferred = None
+            self._refresh_stale_views(*queries)
+
+    def _in_transaction(self) -> bool:
+        """
+        Check if the current thread is in a transaction.
+
+        Returns
+        -------
+        bool
+            True if the thread is in a `transaction` block.
+        """
+        return getattr(self._local, "queries", None) is not None
+
+    def _cache_result(
+        self,
+        query: str,
+        params: list[Any] | None,
+        columns: list[str],
+        rows: list[Any],
+    ) -> None:
+        """
+        Store the result of an executed query in the cache, if any.
+
+        In a transaction, results are not stored since other connections
+        cannot see them yet, and results made stale by the query are dropped
+        again at the end of the transaction. The query is also kept to
+        refresh the materialized views it makes stale once committed.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+        params : list[Any] | None
+            Values substituted into the query.
+        columns : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        """
+        if self._in_transaction():
+            self._local.queries.append(query)
+            if self.cache is not None:
+                self.cache.invalidate_query(query)
+        elif self.cache is not None:
+            self.cache.store(query, params, columns, rows)
+
+    def _refresh_stale_views(self, *queries: str) -> None:
+        """
+        Refresh the materialized views made stale by committed queries.
+
+        In a transaction, nothing is done until it is committed, and in a
+        `defer_refresh` block, until its end. Views not created yet, e.g. by
+        a pending migration, are skipped.
+
+        Parameters
+        ----------
+        *queries : str
+            Executed SQL queries.
+        """
+        if self._in_transaction():
+            return
+        deferred: list[str] | None = getattr(self._local, "deferred", None)
+        if deferred is not None:
+            deferred.extend(queries)
+            return
+
+        views = self._created_views(self._stale_views(queries))
+        if views:
+            self.refresh_views(*views)
+
+    def _created_views(self, views: Sequence[str]) -> list[str]:
+        """
+        Keep the materialized views found in the database.
+
+        Parameters
+        ----------
+        views : Sequence[str]
+            Names of the views.
+
+        Returns
+        -------
+        list[str]
+            Names of the created views, in the same order.
+        """
+        if not views:
+            return []
+        # Read without cache, since creating a view does not invalidate it.
+        with self._connection() as conn, conn.cursor() as cursor:
+            cursor.execute(CREATED_VIEWS_QUERY, [list(views)])
+            created = {row[0] for row in cursor.fetchall()}
+        return [view for view in views if view in created]
+
+    def _reconnect(self) -> None:
+        """Replace broken connections after a server-side timeout."""
+        if self.pool is not None:
+            self.pool.check()
+            return
+
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = psycopg.connect(**self._connection_kwargs())
+
+    def execute_with_columns(  # ruff: ignore[undocumented-public-method]
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        if self.monitor is None or not self.monitor.active:
+            return self._execute_with_columns(query, params)
 
-        self.cursor = self.conn.cursor()
+        start = time.perf_counter()
+        columns, rows = self._execute_with_columns(query, params)
+        self.monitor.record(query, start, columns, rows, params)
+        return columns, rows
 
-    def execute(  # noqa: D102
+    def _execute_with_columns(
         self, query: str, params: list[Any] | None = None
-    ) -> list[Any]:
+    ) -> tuple[list[str], list[Any]]:
+        """
+        Execute a SQL query, or give its cached result.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+
+        Returns
+        -------
+        list[str]
+            Names of the returned columns.
+        list[Any]
+            Fetched rows.
+
+        Raises
+        ------
+        psycopg.errors.IdleInTransactionSessionTimeout
+            If the server closed the connection of a `transaction` block.
+        """
+        if self.cache is not None and not self._in_transaction():
+            cached = self.cache.get(query, params)
+            if cached is not None:
+                return cached
+
         try:
-            self.cursor.execute(query, params)
-            if query.lower().startswith("select"):
-                return list(self.cursor.fetchall())
-            self.conn.commit()
+            with self._connection() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params)
+                columns = [desc.name for desc in cursor.description or []]
+                rows = cursor.fetchall() if columns else []
         except psycopg.errors.IdleInTransactionSessionTimeout:
-            self.conn = psycopg.connect(
-                host=self.hostname,
-                dbname=self.db_name,
-                user=self.username,
-                password=self.password,
-                port=self.port,
+            # The queries already run in the transaction are lost.
+            if self._in_transaction():
+                raise
+            self._reconnect()
+            return self._execute_with_columns(query, params)
+
+        # Stored once committed, so that other threads never get the result
+        # of a rolled back transaction.
+        self._cache_result(query, params, columns, rows)
+        self._refresh_stale_views(query)
+        return columns, rows
+
+    def execute(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        return_type: ReturnType = "list",
+    ) -> Any:  # ruff: ignore[any-type]
+        columns, rows = self.execute_with_columns(query, params)
+        return self._format_rows(columns, rows, return_type)
+
+    def execute_batch(  # ruff: ignore[undocumented-public-method]
+        self, queries: list[tuple[str, list[Any] | None]]
+    ) -> list[tuple[list[str], list[Any]]]:
+        # Cached results are given without a round trip, as by
+        # `execute_with_columns`, and only the other queries are sent.
+        results: list[tuple[list[str], list[Any]] | None] = []
+        for query, params in queries:
+            start = time.perf_counter()
+            cached = (
+                self.cache.get(query, params)
+                if self.cache is not None and not self._in_transaction()
+                else None
             )
+            if (
+                cached is not None
+                and self.monitor is not None
+                and self.monitor.active
+            ):
+                self.monitor.record(query, start, *cached, params)
+            results.append(cached)
+
+        missed = [
+            query
+            for query, result in zip(queries, results, strict=True)
+            if result is None
+        ]
+        fetched = iter(self._execute_pipeline(missed) if missed else [])
+        return [
+            next(fetched) if result is None else result for result in results
+        ]
+
+    def _execute_pipeline(
+        self, queries: list[tuple[str, list[Any] | None]]
+    ) -> list[tuple[list[str], list[Any]]]:
+        """
+        Execute SQL queries in a pipeline.
 
-            self.cursor = self.conn.cursor()
-            return self.execute(query, params)
-        except:
-            self.conn.rollback()
-            raise
-        return []
+        Parameters
+        ----------
+        queries : list[tuple[str, list[Any] | None]]
+            SQL queries and the values substituted into them.
+
+        Returns
+        -------
+        list[tuple[list[str], list[Any]]]
+            Names of the returned columns and fetched rows of each query.
+        """
+        start = time.perf_counter()
+        # In pipeline mode, queries are sent without waiting for the result
+        # of the previous one, so the batch costs about one round trip.
+        with self._connection() as conn:
+            with conn.pipeline():
+                cursors = []
+                for query, params in queries:
+                    cursor = conn.cursor()
+                    cursor.execute(query, params)
+                    cursors.append(cursor)
+
+            results: list[tuple[list[str], list[Any]]] = []
+            for cursor in cursors:
+                if cursor.description is None:
+                    results.append(([], []))
+                else:
+                    columns = [desc.name for desc in cursor.description]
+                    results.append((columns, cursor.fetchall()))
+                cursor.close()
+
+        for (query, params), (columns, rows) in zip(
+            queries, results, strict=True
+        ):
+            self._cache_result(query, params, columns, rows)
+        self._refresh_stale_views(*(query for query, _ in queries))
+
+        if self.monitor is not None and self.monitor.active:
+            # The queries of a pipeline are answered together, so each one
+            # is measured as the whole batch.
+            for (query, params), (columns, rows) in zip(
+                queries, results, strict=True
+            ):
+                self.monitor.record(query, start, columns, rows, params)
+        return results
 
-    def read(  # noqa: D102
+    def read(  # ruff: ignore[undocumented-public-method]
         self,
         table: str,
         columns: str | list[str] | None = None,
         condition_data: dict[str, Any] | None = None,
         number_values: int | None = None,
-        return_type: Literal["list", "dict", "list[dict]"] = "list[dict]",
-    ) -> Any:  # noqa: ANN401
-        if columns is None:
-            columns_str = "*"
-        elif isinstance(columns, list):
-            columns_str = ", ".join(columns)
-        else:
-            columns_str = columns
-
-        query = f"SELECT {columns_str} FROM {table}"
+        return_type: ReturnType = "list[dict]",
+    ) -> Any:  # ruff: ignore[any-type]
+        query, parameters = self._select_query(
+            table, columns, condition_data, number_values
+        )
 
-        parameters: list[Any] = []
-        if condition_data:
-            query += " WHERE "
-            condition_columns, parameters = (
-                list(condition_data.keys()),
-                list(condition_data.values()),
-            )
+        columns_list, data = self.execute_with_columns(query, parameters)
 
-            query += " AND ".join(
-                f"{column}=%s" for column in condition_columns
-            )
+        if return_type == "list" and self._is_single_column(columns):
+            return [row[0] for row in data]
 
-        if number_values is not None:
-            query += f" LIMIT {number_values}"
+        return self._format_rows(columns_list, data, return_type)
 
-        query += ";"
+    def stream(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        itersize: int = 1000,
+        return_type: Literal["list", "dict", "list[dict]"] = "list",
+    ) -> Iterator[Any]:
+        # A named cursor is a server-side cursor: rows stay on the server
+        # until they are fetched.
+        cursor_name = f"stream_{uuid.uuid4().hex}"
+        with (
+            self._connection() as conn,
+            conn.cursor(name=cursor_name) as cursor,
+        ):
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            columns = [desc.name for desc in cursor.description or []]
+
+            while rows := cursor.fetchmany(itersize):
+                if return_type == "dict":
+                    yield self._format_rows(columns, rows, "dict")
+                else:
+                    yield from self._format_rows(columns, rows, return_type)
+
+    def execute_guarded(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        timeout: float = 5.0,
+        max_rows: int = 10000,
+        chunk_size: int = 1000,
+    ) -> GuardedQuery:
+        def fetch(guarded: GuardedQuery) -> Generator[list[Any]]:
+            cursor_name = f"guarded_{uuid.uuid4().hex}"
+            with (
+                self._connection() as conn,
+                conn.cursor(name=cursor_name) as cursor,
+            ):
+                self._set_statement_timeout(conn, guarded.timeout)
+                guarded.canceller = conn.cancel_safe
+                try:
+                    cursor.execute(query, params)
+                    guarded.columns = [
+                        desc.name for desc in cursor.description or []
+                    ]
+                    while rows := cursor.fetchmany(guarded.chunk_size):
+                        yield rows
+                finally:
+                    guarded.canceller = None
+
+        return GuardedQuery(
+            fetch, timeout=timeout, max_rows=max_rows, chunk_size=chunk_size
+        )
 
-        data = self.execute(query, parameters)
+    def explain(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        analyze: bool = True,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        with (
+            self._connection() as conn,
+            conn.transaction(force_rollback=True),
+            conn.cursor() as cursor,
+        ):
+            if timeout is not None:
+                self._set_statement_timeout(conn, timeout)
+            cursor.execute(f"EXPLAIN ({options}) {query}", params)
+            row = cursor.fetchone()
+
+        plans: list[dict[str, Any]] = row[0] if row else [{}]
+        return plans[0]
+
+    @staticmethod
+    def _set_statement_timeout(
+        conn: psycopg.Connection[Any], timeout: float
+    ) -> None:
+        """
+        Limit the duration of the statements of the current transaction.
 
-        if return_type == "list":
-            if columns is not None and (
-                isinstance(columns, str) or len(columns) == 1
-            ):
-                return [row[0] for row in data]
-            return data
+        Parameters
+        ----------
+        conn : psycopg.Connection
+            Connection in a transaction.
+        timeout : float
+            Time in seconds after which the database cancels a statement.
+        """
+        conn.execute(
+            "SELECT set_config('statement_timeout', %s, true);",
+            [f"{round(timeout * 1000)}ms"],
+        )
 
-        columns_list = [desc[0] for desc in self.cursor.description or []]
+    def write(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",
+        binary: bool = False,
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        if isinstance(data, dict):
+            data = [data]
 
-        if return_type == "list[dict]":
-            data_list: list[dict[str, Any]] = []
-            for row in data:
-                data_dict: dict[str, Any] = dict(
-                    zip(columns_list, row, strict=True)
-                )
-                data_list.append(data_dict)
-            return data_list
+        if method == "auto":
+            method = (
+                "insert"
+                if isinstance(data, list) and len(data) < self.copy_threshold
+                else "copy"
+            )
 
-        data_dict = {}
+        if method == "copy":
+            self._write_copy(table, data, binary, on_conflict, update)
+        else:
+            self._write_insert(table, list(data), on_conflict, update)
 
-        for idx, key in enumerate(columns_list):
-            data_dict[key] = [row[idx] for row in data]
+    def _write_insert(
+        self,
+        table: str,
+        data: list[dict[str, Any]],
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        """
+        Write new lines with INSERT statements of at most 10 000 lines.
 
-        return data_dict
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : list[dict[str, Any]]
+            Lines to write.
+        on_conflict : Sequence[str], optional
+            Columns on which lines are upserted, by default None.
+        update : Sequence[str] | Literal["nothing"], optional
+            Columns updated on conflict, by default None.
+        """
+        # One transaction, so that the table is not left half written if a
+        # chunk fails.
+        with self.transaction():
+            for query, items in self._insert_queries(
+                table, data, on_conflict, update
+            ):
+                self.execute(query, items)
 
-    def write(  # noqa: D102
-        self, table: str, data: list[dict[str, Any]] | dict[str, Any]
+    def _write_copy(
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        binary: bool,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
     ) -> None:
-        if isinstance(data, dict):
-            data = [data]
+        """
+        Stream new lines with a `COPY ... FROM STDIN` statement.
 
-        query_empty = f"INSERT INTO {table}"
+        Lines are sent one by one as `data` is iterated, so it can be a
+        generator which is never fully loaded in memory. To upsert them, they
+        are copied into a temporary table, which is then merged into `table`
+        with a single INSERT ... SELECT ... ON CONFLICT.
 
-        columns = data[0].keys()
-        if any(d.keys() != columns for d in data):
-            msg = "All dictionaries must have the same keys."
-            raise ValueError(msg)
+        Parameters
+        ----------
+        table : str
+            Table name.
+        data : Iterable[dict[str, Any]]
+            Lines to write.
+        binary : bool
+            Whether to use the binary format of COPY instead of the text one.
+        on_conflict : Sequence[str], optional
+            Columns on which lines are upserted, by default None.
+        update : Sequence[str] | Literal["nothing"], optional
+            Columns updated on conflict, by default None.
+        """
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return
 
         columns_str = ", ".join(columns)
-        query_empty += f" ({columns_str})"
+        conflict_clause = self._conflict_clause(
+            table, columns, on_conflict, update
+        )
+        target = f"upsert_{uuid.uuid4().hex}" if conflict_clause else table
+
+        query = f"COPY {target} ({columns_str}) FROM STDIN"
+        if binary:
+            query += " (FORMAT BINARY)"
+
+        with (
+            self.transaction(),
+            self._connection() as conn,
+            conn.cursor() as cursor,
+        ):
+            if binary:
+                types = self._column_types(cursor, table, columns)
+
+            if conflict_clause:
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {target} (LIKE {table}"
+                    " INCLUDING DEFAULTS) ON COMMIT DROP;"
+                )
 
-        # We add max 10 000 items by request
-        max_insert = 10000
-        for idx in range(0, len(data), max_insert):
-            data_request = data[idx : idx + max_insert]
+            with cursor.copy(query) as copy:
+                if binary:
+                    copy.set_types(types)
 
-            line_place = ", ".join(["%s"] * len(columns))
-            values_place = ", ".join([f"({line_place})"] * len(data_request))
-            query = query_empty + f" VALUES {values_place};"
+                for row in rows:
+                    copy.write_row(row)
 
-            items = [
-                value for values in data_request for value in values.values()
-            ]
-            self.execute(query, items)
+            if conflict_clause:
+                query = (
+                    f"INSERT INTO {table} ({columns_str})"
+                    f" SELECT {columns_str} FROM {target}{conflict_clause};"
+                )
+                cursor.execute(query)
+
+        self._cache_result(query, None, [], [])
+        self._refresh_stale_views(query)
+
+    @staticmethod
+    def _column_types(
+        cursor: psycopg.Cursor[Any], table: str, columns: list[str]
+    ) -> list[int]:
+        """
+        Give the type OIDs of columns of a table.
+
+        Parameters
+        ----------
+        cursor : psycopg.Cursor
+            Cursor used to query the catalog.
+        table : str
+            Table name.
+        columns : list[str]
+            Column names.
+
+        Returns
+        -------
+        list[int]
+            Type OIDs, in the same order as `columns`.
+        """
+        cursor.execute(
+            "SELECT attname, atttypid::integer FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 "
+            "AND NOT attisdropped;",
+            [table],
+        )
+        types: dict[str, int] = dict(cursor.fetchall())
+        return [types[column] for column in columns]
 
-    def update(  # noqa: D102
+    def update(  # ruff: ignore[undocumented-public-method]
         self,
         table: str,
         update_data: dict[str, Any],
         condition_data: dict[str, Any] | None = None,
     ) -> None:
-        params_execute = list(update_data.values())
-        query = f"UPDATE {table} SET"
+        self.execute(*self._update_query(table, update_data, condition_data))
+
+    def update_many(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+        keys, updated = self._key_columns(key, columns)
+        if not updated:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._update_from_query(table, source, keys, updated),
+        )
+
+    def delete_many(  # ruff: ignore[undocumented-public-method]
+        self, table: str, data: Iterable[dict[str, Any]]
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._delete_in_query(table, source, columns),
+        )
+
+    def _execute_from_copy(
+        self,
+        table: str,
+        source: str,
+        columns: list[str],
+        rows: Iterable[list[Any]],
+        query: str,
+    ) -> int:
+        """
+        Copy lines into a temporary table, then run a query reading it.
+
+        Parameters
+        ----------
+        table : str
+            Table whose column types are used for the temporary table.
+        source : str
+            Name of the temporary table, dropped at the end of the
+            transaction.
+        columns : list[str]
+            Columns of the lines.
+        rows : Iterable[list[Any]]
+            Values of the lines.
+        query : str
+            Query joining `source`.
+
+        Returns
+        -------
+        int
+            Number of rows affected by `query`.
+        """
+        columns_str = ", ".join(columns)
+        with (
+            self.transaction(),
+            self._connection() as conn,
+            conn.cursor() as cursor,
+        ):
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {source} ON COMMIT DROP AS"
+                f" SELECT {columns_str} FROM {table} WITH NO DATA;"
+            )
+            with cursor.copy(
+                f"COPY {source} ({columns_str}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+            cursor.execute(query)
+            count = cursor.rowcount
+
+        self._cache_result(query, None, [], [])
+        self._refresh_stale_views(query)
+        return count
+
+    def copy_to(
+        self,
+        table: str,
+        file: io.BufferedIOBase,
+        columns: Sequence[str] | None = None,
+        snapshot: str | None = None,
+    ) -> int:
+        """
+        Write the rows of a table to a file, in the text format of COPY.
+
+        Parameters
+        ----------
+        table : str
+            Table name, possibly partitioned.
+        file : io.BufferedIOBase
+            File open for writing in binary mode, e.g. compressed with gzip.
+        columns : Sequence[str] | None, optional
+            Columns written, by default None (all, in the table order).
+        snapshot : str | None, optional
+            Snapshot exported by another transaction with
+            `pg_export_snapshot()`, so that tables copied by several
+            connections are consistent, by default None (rows committed
+            when the copy starts). Must not be given in a transaction.
+
+        Returns
+        -------
+        int
+            Number of copied rows.
+        """
+        columns_str = ", ".join(columns) if columns else "*"
+        with self._connection() as conn, conn.cursor() as cursor:
+            if snapshot is not None:
+                cursor.execute(
+                    "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;"
+                )
+                cursor.execute(
+                    sql.SQL("SET TRANSACTION SNAPSHOT {};").format(
+                        sql.Literal(snapshot)
+                    )
+                )
+
+            # A partitioned table can only be copied through a query.
+            with cursor.copy(
+                f"COPY (SELECT {columns_str} FROM {table}) TO STDOUT"
+            ) as copy:
+                file.writelines(copy)
+            return cursor.rowcount
+
+    def copy_from(
+        self,
+        table: str,
+        file: io.BufferedIOBase,
+        columns: Sequence[str] | None = None,
+        *,
+        refresh: bool = True,
+    ) -> int:
+        """
+        Add the rows of a file, in the text format of COPY, to a table.
 
-        query += ", ".join(f"{key}=%s" for key in update_data)
+        The file is streamed by blocks, so it is never fully loaded in
+        memory.
 
-        if condition_data:
-            query += " WHERE"
+        Parameters
+        ----------
+        table : str
+            Table name.
+        file : io.BufferedIOBase
+            File open for reading in binary mode, e.g. written by `copy_to`.
+        columns : Sequence[str] | None, optional
+            Columns of the rows of the file, by default None (all, in the
+            table order).
+        refresh : bool, optional
+            Whether to refresh the materialized views made stale, by
+            default True. False to refresh them once after several copies.
 
-            columns = list(condition_data.keys())
-            query += " AND ".join(f"{column}=%s" for column in columns)
+        Returns
+        -------
+        int
+            Number of added rows.
+        """
+        columns_str = f" ({', '.join(columns)})" if columns else ""
+        query = f"COPY {table}{columns_str} FROM STDIN"
+        with (
+            self.transaction(),
+            self._connection() as conn,
+            conn.cursor() as cursor,
+        ):
+            with cursor.copy(query) as copy:
+                while block := file.read(COPY_BLOCK_SIZE):
+                    copy.write(block)
+            count = cursor.rowcount
+
+        self._cache_result(query, None, [], [])
+        if refresh:
+            self._refresh_stale_views(query)
+        return count
+
+    def execute_statement(self, query: str, *, refresh: bool = True) -> None:
+        """
+        Execute a SQL statement returning no rows, e.g. TRUNCATE or DDL.
 
-            params_execute += list(condition_data.values())
+        Parameters
+        ----------
+        query : str
+            SQL statement.
+        refresh : bool, optional
+            Whether to refresh the materialized views made stale, by
+            default True. False to refresh them once after several
+            statements.
+        """
+        with self._connection() as conn:
+            conn.execute(query)
 
-        self.execute(query, params_execute)
+        self._cache_result(query, None, [], [])
+        if refresh:
+            self._refresh_stale_views(query)
 
-    def create_table(  # noqa: D102
+    def create_table(  # ruff: ignore[undocumented-public-method]
         self,
         table_name: str,
         columns_names: list[str],
@@ -397,23 +2961,35 @@ class PostgreSQL(SQLInterface):
     ) -> None:
         pass
 
-    def delete_rows(  # noqa: D102
+    def delete_rows(  # ruff: ignore[undocumented-public-method]
         self, table: str, condition_data: dict[str, Any]
     ) -> None:
-        query = f"DELETE FROM {table}"
-
-        query += " WHERE"
-
-        columns = list(condition_data.keys())
-        query += " AND ".join(f"{column}=%s" for column in columns)
+        if not condition_data:
+            msg = "Conditions are required, use `delete_all` instead."
+            raise ValueError(msg)
 
-        query += ";"
+        self.execute(*self._delete_query(table, condition_data))
 
-        self.execute(query, list(condition_data.values()))
+    def delete_all(self, table: str) -> None:  # ruff: ignore[undocumented-public-method]
+        self.execute(*self._delete_query(table))
 
-    def delete_all(self, table: str) -> None:  # noqa: D102
-        self.execute(f"DELETE FROM {table};")
+    def refresh_views(self, *views: str) -> None:  # ruff: ignore[undocumented-public-method]
+        for view in views or self._created_views(MATERIALIZED_VIEWS):
+            # Readers are not blocked, thanks to the unique index of the view.
+            self.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view};")
 
-    def __del__(self) -> None:  # noqa: D105
-        if hasattr(self, "conn"):
-            self.conn.close()
+    def warmup(self) -> None:  # ruff: ignore[undocumented-public-method]
+        if self.pool is not None:
+            # Waits until the pool holds its minimum number of connections.
+            self.pool.open(wait=True)
+        else:
+            with self._connection():
+                pass
+
+    def __del__(self) -> None:  # ruff: ignore[undocumented-magic-method]
+        pool: ConnectionPool | None = getattr(self, "pool", None)
+        if pool is not None:
+            pool.close()
+        conn: psycopg.Connection[Any] | None = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
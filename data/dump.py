@@ -0,0 +1,525 @@
+"""Command line interface dumping and restoring the database in parallel."""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from dotenv import load_dotenv
+
+from data.cache import VIEW_DEPENDENCIES
+from data.db_communication import PostgreSQL
+from data.migrations.migrator import VERSION_TABLE, Migrator
+
+LOGGER = logging.getLogger(__name__)
+
+DUMP_DIR = Path(__file__).parent / "dump"
+MANIFEST = "manifest.json"
+# The text of COPY compresses well even at the fastest level.
+COMPRESS_LEVEL = 1
+
+# Tables of the public schema, partitions being copied with their table.
+TABLES_QUERY = (
+    "SELECT relname FROM pg_class "
+    "WHERE relnamespace = 'public'::regnamespace AND relkind IN ('r', 'p') "
+    "AND NOT relispartition ORDER BY relname;"
+)
+COLUMNS_QUERY = (
+    "SELECT attname FROM pg_attribute "
+    "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped "
+    "ORDER BY attnum;"
+)
+FOREIGN_KEYS_QUERY = (
+    "SELECT child.relname, parent.relname FROM pg_constraint "
+    "JOIN pg_class child ON child.oid = conrelid "
+    "JOIN pg_class parent ON parent.oid = confrelid "
+    "WHERE contype = 'f' AND conparentid = 0;"
+)
+# Foreign keys and indexes which no constraint relies on are built again
+# once the rows are loaded, which is much faster than maintaining them row
+# by row.
+CONSTRAINTS_QUERY = (
+    "SELECT tab.relname, conname, pg_get_constraintdef(pg_constraint.oid) "
+    "FROM pg_constraint JOIN pg_class tab ON tab.oid = conrelid "
+    "WHERE contype = 'f' AND conparentid = 0 "
+    "AND tab.relnamespace = 'public'::regnamespace "
+    "AND tab.relname = ANY(%s);"
+)
+INDEXES_QUERY = (
+    "SELECT idx.relname, pg_get_indexdef(idx.oid) FROM pg_index "
+    "JOIN pg_class idx ON idx.oid = indexrelid "
+    "JOIN pg_class tab ON tab.oid = indrelid "
+    "WHERE tab.relnamespace = 'public'::regnamespace "
+    "AND tab.relname = ANY(%s) AND NOT idx.relispartition "
+    "AND NOT EXISTS "
+    "(SELECT FROM pg_constraint WHERE conindid = indexrelid);"
+)
+SEQUENCES_QUERY = (
+    "SELECT tab.relname, attname, seq.relname FROM pg_depend "
+    "JOIN pg_class seq ON seq.oid = objid AND seq.relkind = 'S' "
+    "JOIN pg_class tab ON tab.oid = refobjid "
+    "JOIN pg_attribute ON attrelid = refobjid AND attnum = refobjsubid "
+    "WHERE deptype IN ('a', 'i') AND tab.relname = ANY(%s);"
+)
+
+
+class Credentials(NamedTuple):
+    """Parameters to connect worker processes to the database."""
+
+    hostname: str
+    db_name: str
+    username: str
+    password: str
+    port: int
+
+
+@cache
+def worker_database(credentials: Credentials) -> PostgreSQL:
+    """
+    Connect the current worker process to the database, once.
+
+    Parameters
+    ----------
+    credentials : Credentials
+        Parameters of the connection.
+
+    Returns
+    -------
+    PostgreSQL
+        Database, without cache.
+    """
+    return PostgreSQL(*credentials)
+
+
+def dump_table(
+    credentials: Credentials,
+    table: str,
+    columns: list[str],
+    path: Path,
+    snapshot: str,
+) -> int:
+    """
+    Write the rows of a table to a compressed file, in a worker process.
+
+    Parameters
+    ----------
+    credentials : Credentials
+        Parameters of the connection.
+    table : str
+        Table name.
+    columns : list[str]
+        Columns written.
+    path : Path
+        Path of the file, compressed with gzip.
+    snapshot : str
+        Snapshot shared by the tables of the dump.
+
+    Returns
+    -------
+    int
+        Number of written rows.
+    """
+    with gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL) as file:
+        return worker_database(credentials).copy_to(
+            table, file, columns, snapshot
+        )
+
+
+def restore_table(
+    credentials: Credentials, table: str, columns: list[str], path: Path
+) -> int:
+    """
+    Add the rows of a compressed file to a table, in a worker process.
+
+    Parameters
+    ----------
+    credentials : Credentials
+        Parameters of the connection.
+    table : str
+        Table name.
+    columns : list[str]
+        Columns of the rows of the file.
+    path : Path
+        Path of the file, written by `dump_table`.
+
+    Returns
+    -------
+    int
+        Number of added rows.
+    """
+    with gzip.open(path, "rb") as file:
+        return worker_database(credentials).copy_from(
+            table, file, columns, refresh=False
+        )
+
+
+def run_statement(credentials: Credentials, query: str) -> None:
+    """
+    Run a statement building a part of the schema, in a worker process.
+
+    Parameters
+    ----------
+    credentials : Credentials
+        Parameters of the connection.
+    query : str
+        SQL statement, e.g. CREATE INDEX.
+    """
+    # The materialized views are refreshed once, after the restore.
+    worker_database(credentials).execute_statement(query, refresh=False)
+
+
+def dumped_tables(database: PostgreSQL) -> dict[str, list[str]]:
+    """
+    Give the tables holding the data of the database, with their columns.
+
+    The table of the applied migrations and the tables maintained by
+    triggers, which are filled again when their base tables are restored,
+    are left out.
+
+    Parameters
+    ----------
+    database : PostgreSQL
+        Database to dump.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        Columns of each table.
+    """
+    tables: list[tuple[str]] = database.execute(TABLES_QUERY)
+    return {
+        table: [
+            column for (column,) in database.execute(COLUMNS_QUERY, [table])
+        ]
+        for (table,) in tables
+        if table != VERSION_TABLE and table not in VIEW_DEPENDENCIES
+    }
+
+
+def dependency_levels(
+    database: PostgreSQL, tables: Sequence[str]
+) -> list[list[str]]:
+    """
+    Group tables so that each one comes after the tables it references.
+
+    Parameters
+    ----------
+    database : PostgreSQL
+        Database whose foreign keys are followed.
+    tables : Sequence[str]
+        Names of the tables.
+
+    Returns
+    -------
+    list[list[str]]
+        Groups of tables, which only reference tables of previous groups.
+
+    Raises
+    ------
+    ValueError
+        If foreign keys form a cycle.
+    """
+    references: dict[str, set[str]] = {table: set() for table in tables}
+    for child, parent in database.execute(FOREIGN_KEYS_QUERY):
+        if child in references and parent in references and child != parent:
+            references[child].add(parent)
+
+    levels: list[list[str]] = []
+    placed: set[str] = set()
+    while len(placed) < len(references):
+        level = sorted(
+            table
+            for table, parents in references.items()
+            if table not in placed and parents <= placed
+        )
+        if not level:
+            msg = "Foreign keys form a cycle between the tables."
+            raise ValueError(msg)
+        levels.append(level)
+        placed.update(level)
+    return levels
+
+
+def credentials(database: PostgreSQL) -> Credentials:
+    """
+    Give the parameters to connect worker processes to a database.
+
+    Parameters
+    ----------
+    database : PostgreSQL
+        Database of the main process.
+
+    Returns
+    -------
+    Credentials
+        Parameters of the connection.
+    """
+    return Credentials(
+        database.hostname,
+        database.db_name,
+        database.username,
+        database.password,
+        database.port,
+    )
+
+
+def dump(
+    database: PostgreSQL, directory: Path = DUMP_DIR, jobs: int | None = None
+) -> dict[str, int]:
+    """
+    Write each table to a compressed file, in parallel.
+
+    All tables are read from the same snapshot, so the dump is consistent
+    even if the database is written meanwhile. A manifest records the
+    columns of each table and the schema version.
+
+    Parameters
+    ----------
+    database : PostgreSQL
+        Database to dump.
+    directory : Path, optional
+        Directory of the dump, by default `data/dump`.
+    jobs : int | None, optional
+        Number of worker processes, by default the number of processors.
+
+    Returns
+    -------
+    dict[str, int]
+        Number of rows of each table.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = dumped_tables(database)
+    version = Migrator(database).version()
+
+    with database.transaction():
+        # Workers read the snapshot of this transaction while it is open.
+        database.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+        snapshot: str = database.execute("SELECT pg_export_snapshot();")[0][0]
+        with ProcessPoolExecutor(jobs) as executor:
+            futures = {
+                table: executor.submit(
+                    dump_table,
+                    credentials(database),
+                    table,
+                    columns,
+                    directory / f"{table}.copy.gz",
+                    snapshot,
+                )
+                for table, columns in tables.items()
+            }
+            rows = {
+                table: future.result() for table, future in futures.items()
+            }
+
+    manifest: dict[str, Any] = {
+        "version": version,
+        "tables": {
+            table: {"columns": columns, "rows": rows[table]}
+            for table, columns in tables.items()
+        },
+    }
+    (directory / MANIFEST).write_text(
+        json.dumps(manifest, indent=2), encoding="utf-8"
+    )
+    return rows
+
+
+def restore(
+    database: PostgreSQL, directory: Path = DUMP_DIR, jobs: int | None = None
+) -> dict[str, int]:
+    """
+    Replace the rows of the tables by those of a dump, in parallel.
+
+    The schema must be at the version of the dump. Tables are emptied, then
+    filled several at a time, in the order of their foreign keys so that
+    triggers (e.g. creating the partitions of `result` for each rally) find
+    the rows they need. Foreign keys and indexes not needed by constraints
+    are dropped before and built again after, then sequences, statistics
+    and materialized views are updated.
+
+    The files of the dump are checked before the tables are emptied, but
+    the restore is not atomic: if a file cannot be read or a table cannot
+    be filled, the tables are left empty or incomplete, with their indexes
+    and foreign keys, and the restore must be run again.
+
+    Parameters
+    ----------
+    database : PostgreSQL
+        Database to fill.
+    directory : Path, optional
+        Directory of the dump, by default `data/dump`.
+    jobs : int | None, optional
+        Number of worker processes, by default the number of processors.
+
+    Returns
+    -------
+    dict[str, int]
+        Number of rows of each table.
+
+    Raises
+    ------
+    RuntimeError
+        If the schema is not at the version of the dump.
+    FileNotFoundError
+        If a table of the dump has no file.
+    """
+    manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+    tables: dict[str, dict[str, Any]] = manifest["tables"]
+    version = Migrator(database).version()
+    if version != manifest["version"]:
+        msg = (
+            f"The dump has schema version {manifest['version']}, the "
+            f"database has version {version}."
+        )
+        raise RuntimeError(msg)
+
+    missing = [
+        table
+        for table in tables
+        if not (directory / f"{table}.copy.gz").is_file()
+    ]
+    if missing:
+        msg = f"The dump has no file for {', '.join(missing)}."
+        raise FileNotFoundError(msg)
+
+    names = list(tables)
+    levels = dependency_levels(database, names)
+    constraints: list[tuple[str, str, str]] = database.execute(
+        CONSTRAINTS_QUERY, [names]
+    )
+    indexes: list[tuple[str, str]] = database.execute(INDEXES_QUERY, [names])
+
+    # The materialized views are refreshed once, after the restore.
+    database.execute_statement(f"TRUNCATE {', '.join(names)};", refresh=False)
+    for table, constraint, _ in constraints:
+        database.execute_statement(
+            f"ALTER TABLE {table} DROP CONSTRAINT {constraint};",
+            refresh=False,
+        )
+    for index, _ in indexes:
+        database.execute_statement(f"DROP INDEX {index};", refresh=False)
+
+    rows: dict[str, int] = {}
+    with ProcessPoolExecutor(jobs) as executor:
+        try:
+            for level in levels:
+                futures = {
+                    table: executor.submit(
+                        restore_table,
+                        credentials(database),
+                        table,
+                        tables[table]["columns"],
+                        directory / f"{table}.copy.gz",
+                    )
+                    for table in level
+                }
+                rows.update(
+                    (table, future.result())
+                    for table, future in futures.items()
+                )
+        except Exception:
+            LOGGER.exception(
+                "Restore failed: the tables are empty or incomplete, "
+                "restore them again from a valid dump."
+            )
+            raise
+        finally:
+            # Even if a table failed, so that the schema is left complete.
+            # Indexes of partitioned tables are defined on the table only,
+            # which would leave them without the indexes of the partitions.
+            for queries in (
+                [
+                    query.replace(" ON ONLY ", " ON ", 1)
+                    for _, query in indexes
+                ],
+                [
+                    f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+                    f"{definition};"
+                    for table, constraint, definition in constraints
+                ],
+            ):
+                for future in [
+                    executor.submit(
+                        run_statement, credentials(database), query
+                    )
+                    for query in queries
+                ]:
+                    future.result()
+
+    for table, column, sequence in database.execute(SEQUENCES_QUERY, [names]):
+        database.execute(
+            f"SELECT setval('{sequence}', COALESCE(MAX({column}), 1), "
+            f"MAX({column}) IS NOT NULL) FROM {table};"
+        )
+    database.execute(f"ANALYZE {', '.join(names)};")
+    database.refresh_views()
+    return rows
+
+
+def connect() -> PostgreSQL:
+    """
+    Connect to the database of the `.env` credentials, without cache.
+
+    Returns
+    -------
+    PostgreSQL
+        Database to dump or restore.
+    """
+    load_dotenv(override=True)
+    return PostgreSQL(
+        hostname=os.environ["HOSTNAME"],
+        db_name=os.environ["DB_NAME"],
+        username=os.environ["USERNAME"],
+        password=os.environ["PASSWORD"],
+        port=int(os.environ["PORT"]),
+    )
+
+
+def main() -> None:
+    """Dump or restore the database from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Dump or restore the tables of the database in parallel."
+    )
+    parser.add_argument(
+        "command",
+        choices=["dump", "restore"],
+        help="write the tables to files, or replace them by these files",
+    )
+    parser.add_argument(
+        "directory",
+        type=Path,
+        nargs="?",
+        default=DUMP_DIR,
+        help="directory of the dump, by default data/dump",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="number of worker processes"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    database = connect()
+    start = time.perf_counter()
+    if args.command == "dump":
+        rows = dump(database, args.directory, args.jobs)
+    else:
+        rows = restore(database, args.directory, args.jobs)
+    for table, count in rows.items():
+        LOGGER.info("%-24s %10d rows", table, count)
+    LOGGER.info(
+        "%s of %d tables in %.2f s",
+        args.command.capitalize(),
+        len(rows),
+        time.perf_counter() - start,
+    )
+
+
+if __name__ == "__main__":
+    main()
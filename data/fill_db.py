@@ -5,15 +5,16 @@ import random
 import string
 import time
 from pathlib import Path
-from typing import Any
+from typing import Any, cast
 
 import pandas as pd
-from db_communication import PostgreSQL
 from faker import Faker
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from geopy.geocoders import Nominatim
 from geopy.location import Location
 
+from data.db_communication import PostgreSQL, SQLInterface
+
 DATABASE = PostgreSQL(
     hostname="ep-curly-dew-ad41zuv8-pooler.c-2.us-east-1.aws.neon.tech",
     db_name="neondb",
@@ -24,7 +25,7 @@ DATABASE = PostgreSQL(
 FAKE = Faker("fr_FR")
 
 
-def fill_rally(database: PostgreSQL) -> None:
+def fill_rally(database: SQLInterface) -> None:
     """
     Fill rally table of `database`.
 
@@ -88,7 +89,7 @@ def get_location(geolocator: Nominatim, city_name: str) -> Location:
             time.sleep(1)
 
 
-def fill_stage(database: PostgreSQL) -> None:
+def fill_stage(database: SQLInterface) -> None:
     """
     Fill stage table and city table of `database`.
 
@@ -123,7 +124,9 @@ def fill_stage(database: PostgreSQL) -> None:
 
     df_cities["id"] = range(1, len(df_cities) + 1)
 
-    database.write("city", [row[1].to_dict() for row in df_cities.iterrows()])
+    database.write(
+        "city", cast("list[dict[str, Any]]", df_cities.to_dict("records"))
+    )
 
     # Fill stage table
     rallys = database.read("rally", ["id", "year"])
@@ -156,10 +159,12 @@ def fill_stage(database: PostgreSQL) -> None:
     df_stages = df_stages.drop(
         ["starting_city", "ending_city", "year"], axis="columns"
     )
-    database.write("stage", [row[1].to_dict() for row in df_stages.iterrows()])
+    database.write(
+        "stage", cast("list[dict[str, Any]]", df_stages.to_dict("records"))
+    )
 
 
-def fill_team(database: PostgreSQL) -> None:
+def fill_team(database: SQLInterface) -> None:
     """
     Fill team table of `database`.
 
@@ -184,7 +189,7 @@ def fill_team(database: PostgreSQL) -> None:
     database.write("team", list_dicts)
 
 
-def fill_team_sponsor(database: PostgreSQL) -> None:
+def fill_team_sponsor(database: SQLInterface) -> None:
     """
     Fill team_sponsor table of `database`.
 
@@ -208,7 +213,7 @@ def fill_team_sponsor(database: PostgreSQL) -> None:
     database.write("team_sponsor", list_dicts)
 
 
-def fill_crew(database: PostgreSQL) -> None:
+def fill_crew(database: SQLInterface) -> None:
     """
     Fill crew table of `database`.
 
@@ -227,7 +232,7 @@ def fill_crew(database: PostgreSQL) -> None:
     database.write("crew", list_dicts)
 
 
-def fill_contestant(database: PostgreSQL) -> None:
+def fill_contestant(database: SQLInterface) -> None:
     """
     Fill contestant table of `database`.
 
@@ -280,7 +285,7 @@ def fill_contestant(database: PostgreSQL) -> None:
     database.write("contestant", list_dicts)
 
 
-def fill_vehicle(database: PostgreSQL) -> None:
+def fill_vehicle(database: SQLInterface) -> None:
     """
     Fill vehicle table of `database`.
 
@@ -333,7 +338,7 @@ def fill_vehicle(database: PostgreSQL) -> None:
     database.write("vehicle", list_dicts)
 
 
-def fill_supplier(database: PostgreSQL) -> None:
+def fill_supplier(database: SQLInterface) -> None:
     """
     Fill supplier table and rally_sponsor table of `database`.
 
@@ -344,21 +349,22 @@ def fill_supplier(database: PostgreSQL) -> None:
     """
     rally_ids = database.read("rally", "id", return_type="list")
 
-    for table in ("supplier", "rally_sponsor"):
-        list_dicts: list[dict[str, Any]] = []
+    with database.batch() as batch:
+        for table in ("supplier", "rally_sponsor"):
+            list_dicts: list[dict[str, Any]] = []
 
-        for rally_id in rally_ids:
-            list_dicts.extend(
-                [
-                    {"id_rally": rally_id, "name": FAKE.company()}
-                    for _ in range(random.randint(0, 6))
-                ]
-            )
+            for rally_id in rally_ids:
+                list_dicts.extend(
+                    [
+                        {"id_rally": rally_id, "name": FAKE.company()}
+                        for _ in range(random.randint(0, 6))
+                    ]
+                )
 
-        database.write(table, list_dicts)
+            batch.write(table, list_dicts)
 
 
-def fill_result(database: PostgreSQL) -> None:
+def fill_result(database: SQLInterface) -> None:
     """
     Fill result table of `database`.
 
@@ -367,11 +373,19 @@ def fill_result(database: PostgreSQL) -> None:
     database : PostgreSQL
         Database to be filled.
     """
-    stages = database.read(
-        "stage", ["id", "id_rally", "type", "max_time", "number", "kilometers"]
-    )
-    crews = database.read("crew", ["id", "id_team"])
-    participations = database.read("participation", ["id_rally", "id_team"])
+    with database.batch() as batch:
+        stages_result = batch.read(
+            "stage",
+            ["id", "id_rally", "type", "max_time", "number", "kilometers"],
+        )
+        crews_result = batch.read("crew", ["id", "id_team"])
+        participations_result = batch.read(
+            "participation", ["id_rally", "id_team"]
+        )
+
+    stages = stages_result.result()
+    crews = crews_result.result()
+    participations = participations_result.result()
 
     list_dicts: list[dict[str, Any]] = []
 
@@ -416,6 +430,7 @@ def fill_result(database: PostgreSQL) -> None:
                 list_dicts.append(
                     {
                         "id_stage": stage["id"],
+                        "id_rally": rally,
                         "id_crew": crew["id"],
                         "time": time,
                         "disqualification": disqualification,
@@ -427,5 +442,29 @@ def fill_result(database: PostgreSQL) -> None:
     database.write("result", list_dicts)
 
 
+def fill_database(database: SQLInterface) -> None:
+    """
+    Fill all tables of `database`, in one transaction.
+
+    If a step fails, nothing is written, so the seed can be run again.
+
+    Parameters
+    ----------
+    database : SQLInterface
+        Database to fill, with the tables of `database_creation.ddl`.
+    """
+    with database.transaction():
+        fill_rally(database)
+        fill_stage(database)
+        fill_team(database)
+        fill_team_sponsor(database)
+        fill_crew(database)
+        fill_contestant(database)
+        fill_vehicle(database)
+        fill_supplier(database)
+        fill_result(database)
+
+
 if __name__ == "__main__":
-    DATABASE.read("result")
+    for _ in DATABASE.iter_read("result"):
+        pass
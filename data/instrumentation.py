@@ -0,0 +1,356 @@
+"""Container for `QueryMonitor` class to measure the SQL queries."""
+
+import bisect
+import inspect
+import logging
+import re
+import sysconfig
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Generator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from types import FrameType
+from typing import Any, NamedTuple
+
+from data.cache import result_size
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the buckets of the histograms.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER = re.compile(r"%s|\?")
+PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+VALUES_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+WHITESPACE = re.compile(r"\s+")
+
+# Frames of these files are skipped when looking for the caller of a query.
+SKIPPED_PATHS = (
+    str(Path(__file__).parent / "db_communication.py"),
+    str(Path(__file__).parent / "async_db_communication.py"),
+    str(Path(__file__).parent / "local_db.py"),
+    str(Path(__file__)),
+    sysconfig.get_paths()["stdlib"],
+)
+
+
+@lru_cache(maxsize=4096)
+def normalize_query(query: str) -> str:
+    """
+    Give the shape of a query, without its values.
+
+    Literals and placeholders are replaced by `?`, lists of placeholders by
+    `...`, so that the same query run with different values has one shape.
+
+    Parameters
+    ----------
+    query : str
+        SQL query.
+
+    Returns
+    -------
+    str
+        Shape of the query, e.g. "SELECT * FROM rally WHERE id=?;".
+    """
+    shape = STRING_LITERAL.sub("?", query)
+    shape = NUMBER_LITERAL.sub("?", shape)
+    shape = PLACEHOLDER.sub("?", shape)
+    shape = PLACEHOLDER_LIST.sub("...", shape)
+    shape = VALUES_LIST.sub("(...)", shape)
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+def find_caller(frame: FrameType | None) -> str:
+    """
+    Find the function which called the data layer.
+
+    Parameters
+    ----------
+    frame : FrameType | None
+        Frame from which to go up the stack.
+
+    Returns
+    -------
+    str
+        Module and function, e.g. "rally.create_page", or "unknown".
+    """
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(SKIPPED_PATHS):
+            return f"{Path(filename).stem}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over the nodes of a query plan.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        Plan given by `SQLInterface.explain`, or one of its nodes.
+
+    Yields
+    ------
+    dict[str, Any]
+        Nodes of the plan, parents before their children.
+    """
+    node = plan.get("Plan", plan)
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def seq_scans(plan: dict[str, Any]) -> list[str]:
+    """
+    Find the tables read entirely by a query plan.
+
+    A sequential scan of a large table in a join often means that an index
+    is missing or not used.
+
+    Parameters
+    ----------
+    plan : dict[str, Any]
+        Plan given by `SQLInterface.explain`.
+
+    Returns
+    -------
+    list[str]
+        Names of the sequentially scanned tables.
+    """
+    return [
+        node.get("Relation Name", "?")
+        for node in plan_nodes(plan)
+        if node.get("Node Type") == "Seq Scan"
+    ]
+
+
+class QueryRecord(NamedTuple):
+    """Measures of one execution of a query."""
+
+    query: str
+    params: list[Any] | None
+    shape: str
+    duration: float
+    rows: int
+    size: int
+    caller: str
+
+
+class ShapeStats:
+    """
+    Statistics of the queries with the same shape.
+
+    Attributes
+    ----------
+    count : int
+        Number of executions.
+    total_time : float
+        Total time of the executions in seconds.
+    max_time : float
+        Longest execution in seconds.
+    rows : int
+        Total number of returned rows.
+    size : int
+        Approximate total size of the returned rows in bytes.
+    histogram : list[int]
+        Number of executions per bucket of `BUCKETS_MS`, the last bucket
+        being for longer executions.
+    callers : Counter[str]
+        Number of executions per calling function.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.size = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.callers: Counter[str] = Counter()
+
+    @property
+    def mean_time(self) -> float:
+        """Mean time of the executions in seconds."""
+        return self.total_time / self.count if self.count else 0.0
+
+    def add(self, record: QueryRecord) -> None:
+        """
+        Add an execution to the statistics.
+
+        Parameters
+        ----------
+        record : QueryRecord
+            Measures of the execution.
+        """
+        self.count += 1
+        self.total_time += record.duration
+        self.max_time = max(self.max_time, record.duration)
+        self.rows += record.rows
+        self.size += record.size
+        self.histogram[
+            bisect.bisect_left(BUCKETS_MS, record.duration * 1000)
+        ] += 1
+        self.callers[record.caller] += 1
+
+
+class QueryMonitor:
+    """
+    Measure the queries run through a SQL interface.
+
+    For each query, the wall time, the number of returned rows, their
+    approximate size and the calling function are measured. Statistics are
+    kept per shape of query (see `normalize_query`), queries slower than a
+    threshold are logged, and each measure is passed to the callbacks, e.g.
+    to export it.
+
+    Parameters
+    ----------
+    slow_threshold : float, optional
+        Time in seconds from which a query is logged as slow, by default 0.5.
+    callbacks : list[Callable[[QueryRecord], None]] | None, optional
+        Functions called with the measures of each query, by default None.
+
+    Attributes
+    ----------
+    slow_threshold : float
+        Time in seconds from which a query is logged as slow.
+    callbacks : list[Callable[[QueryRecord], None]]
+        Functions called with the measures of each query.
+    enabled : bool
+        Whether queries are measured. Interfaces skip the monitor when it is
+        not `active`.
+    """
+
+    def __init__(
+        self,
+        slow_threshold: float = 0.5,
+        callbacks: list[Callable[[QueryRecord], None]] | None = None,
+    ) -> None:
+        self.slow_threshold = slow_threshold
+        self.callbacks = callbacks or []
+        self.enabled = True
+
+        self._stats: dict[str, ShapeStats] = {}
+        # Captures of the current context, so that each thread (e.g. each
+        # Streamlit session) only collects its own queries.
+        self._captures: ContextVar[tuple[list[QueryRecord], ...]] = ContextVar(
+            f"captures_{id(self)}", default=()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether queries are measured: if enabled or in `capture`."""
+        return self.enabled or bool(self._captures.get())
+
+    @contextmanager
+    def capture(self) -> Generator[list[QueryRecord]]:
+        """
+        Collect the measures of the queries run during a block.
+
+        Queries are measured during the block even if the monitor is not
+        enabled. Only the queries of the current context are collected: the
+        ones of the calling thread, and of the coroutines and threads it
+        starts with a copy of its context, e.g. through
+        `AsyncSQLInterface.run`, but not the ones of other threads.
+
+        Yields
+        ------
+        list[QueryRecord]
+            Measures of the queries, filled while the block runs.
+
+        Examples
+        --------
+        >>> with monitor.capture() as records:
+        ...     database.read("rally")
+        >>> [database.explain(r.query, r.params) for r in records]
+        """
+        records: list[QueryRecord] = []
+        token = self._captures.set((*self._captures.get(), records))
+        try:
+            yield records
+        finally:
+            self._captures.reset(token)
+
+    def record(
+        self,
+        query: str,
+        start: float,
+        columns: list[str],
+        rows: list[Any],
+        params: list[Any] | None = None,
+    ) -> None:
+        """
+        Measure an executed query.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+        start : float
+            Value of `time.perf_counter` before the execution.
+        columns : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+        """
+        duration = time.perf_counter() - start
+        record = QueryRecord(
+            query,
+            params,
+            normalize_query(query),
+            duration,
+            len(rows),
+            result_size(columns, rows),
+            find_caller(inspect.currentframe()),
+        )
+
+        with self._lock:
+            self._stats.setdefault(record.shape, ShapeStats()).add(record)
+        for records in self._captures.get():
+            records.append(record)
+
+        if duration >= self.slow_threshold:
+            LOGGER.warning(
+                "Slow query (%.3f s, %d rows, from %s): %s",
+                duration,
+                record.rows,
+                record.caller,
+                record.shape,
+            )
+
+        for callback in self.callbacks:
+            callback(record)
+
+    def stats(self) -> dict[str, ShapeStats]:
+        """
+        Give the statistics per shape of query.
+
+        Returns
+        -------
+        dict[str, ShapeStats]
+            Statistics, sorted by decreasing total time.
+        """
+        with self._lock:
+            return dict(
+                sorted(
+                    self._stats.items(),
+                    key=lambda item: item[1].total_time,
+                    reverse=True,
+                )
+            )
+
+    def reset(self) -> None:
+        """Forget the statistics."""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,1131 @@
+"""Container for `SQLite` class to run the database locally, without server."""
+
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections.abc import (
+    Coroutine,
+    Generator,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Literal, TypeVar
+
+from data.async_db_communication import AsyncSQLInterface
+from data.cache import QueryCache
+from data.db_communication import GuardedQuery, ReturnType, SQLInterface
+from data.instrumentation import QueryMonitor
+from data.migrations.migrator import Migrator
+
+T = TypeVar("T")
+
+DATA_DIR = Path(__file__).parent
+DDL_PATH = DATA_DIR / "database_creation.ddl"
+DUMP_PATH = DATA_DIR / "dump.sql"
+
+PLACEHOLDER = re.compile(r"%([%s])")
+ILIKE = re.compile(r"\bILIKE\b", re.IGNORECASE)
+ANY = re.compile(r"=\s*ANY\s*\(\s*%s\s*\)", re.IGNORECASE)
+SERIAL = re.compile(r"\bserial\b", re.IGNORECASE)
+# Operator `<%` of pg_trgm, doubled in queries with parameters. Operands are
+# placeholders, columns or string literals.
+WORD_SIMILAR = re.compile(r"(%s|[\w.]+|'[^']*')\s*<%%?\s*(%s|[\w.]+|'[^']*')")
+WORD = re.compile(r"[^\W_]+")
+# Default of `pg_trgm.word_similarity_threshold`.
+WORD_SIMILARITY_THRESHOLD = 0.6
+MATERIALIZED_VIEW = re.compile(
+    r"^CREATE\s+MATERIALIZED\s+VIEW\s+(\w+)", re.IGNORECASE
+)
+INDEX_TABLE = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+\w+\s+ON\s+(\w+)", re.IGNORECASE
+)
+COPY_COLUMNS = re.compile(r"^COPY\s+[\w.]+\s+\((.*)\)\s+FROM\s+stdin;")
+COPY_ESCAPE = re.compile(r"\\(x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)")
+COPY_ESCAPES = {
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Give the trigrams of a text, as `pg_trgm` extracts them.
+
+    Each word, in lower case, is padded with two spaces before and one
+    after.
+
+    Parameters
+    ----------
+    text : str
+        Text to split.
+
+    Returns
+    -------
+    set[str]
+        Trigrams of the words of the text.
+    """
+    padded = [f"  {word} " for word in WORD.findall(text.lower())]
+    return {
+        word[start : start + 3]
+        for word in padded
+        for start in range(len(word) - 2)
+    }
+
+
+def word_similarity(term: str | None, text: str | None) -> float:
+    """
+    Approximate the function `word_similarity` of `pg_trgm`, missing in SQLite.
+
+    The share of the trigrams of the term found in the text is given, while
+    PostgreSQL only counts those found in a single extent of the text.
+
+    Parameters
+    ----------
+    term : str | None
+        Searched term.
+    text : str | None
+        Text searched, e.g. a label.
+
+    Returns
+    -------
+    float
+        Similarity between 0 and 1, 0 if a value is NULL.
+    """
+    if term is None or text is None:
+        return 0.0
+    searched = trigrams(term)
+    if not searched:
+        return 0.0
+    return len(searched & trigrams(text)) / len(searched)
+
+
+class BoolOr:
+    """Aggregate `bool_or` of PostgreSQL, missing in SQLite."""
+
+    def __init__(self) -> None:
+        self.value = False
+
+    def step(self, value: int | None) -> None:
+        """
+        Add a value to the aggregate.
+
+        Parameters
+        ----------
+        value : int | None
+            Boolean value stored by SQLite, NULL values are ignored.
+        """
+        self.value = self.value or bool(value)
+
+    def finalize(self) -> bool:
+        """
+        Give the result of the aggregate.
+
+        Returns
+        -------
+        bool
+            Whether at least one value is true.
+        """
+        return self.value
+
+
+class DumpReader:
+    """
+    Reader of the data of a dump in the custom format of `pg_dump`.
+
+    Only the data of the tables is read, the schema is expected to be created
+    from `database_creation.ddl`.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the dump.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a dump in the custom format.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.data = path.read_bytes()
+        if self.data[:5] != b"PGDMP" or self.data[10] != 1:
+            msg = f"{path} is not a dump in the custom format of pg_dump."
+            raise ValueError(msg)
+
+        self.version = tuple(self.data[5:8])
+        self.int_size = self.data[8]
+        self.offset_size = self.data[9]
+        self.pos = 11
+
+    def _read_int(self) -> int:
+        """
+        Read an integer, stored as a sign byte and little-endian bytes.
+
+        Returns
+        -------
+        int
+            Read integer.
+        """
+        sign = self.data[self.pos]
+        value = int.from_bytes(
+            self.data[self.pos + 1 : self.pos + 1 + self.int_size], "little"
+        )
+        self.pos += 1 + self.int_size
+        return -value if sign else value
+
+    def _read_str(self) -> str | None:
+        """
+        Read a string, stored as its length and its bytes.
+
+        Returns
+        -------
+        str | None
+            Read string, None for a NULL string.
+        """
+        length = self._read_int()
+        if length < 0:
+            return None
+        value = self.data[self.pos : self.pos + length].decode()
+        self.pos += length
+        return value
+
+    def _read_offset(self) -> int | None:
+        """
+        Read the position of the data of an entry.
+
+        Returns
+        -------
+        int | None
+            Position in the file, None if the data is missing.
+        """
+        flag = self.data[self.pos]
+        value = int.from_bytes(
+            self.data[self.pos + 1 : self.pos + 1 + self.offset_size],
+            "little",
+        )
+        self.pos += 1 + self.offset_size
+        # 2 means the position is set, 3 that the entry has no data.
+        return value if flag == 2 else None  # ruff: ignore[magic-value-comparison]
+
+    def _read_header(self) -> bool:
+        """
+        Read the header of the dump.
+
+        Returns
+        -------
+        bool
+            Whether data blocks are compressed with zlib.
+        """
+        if self.version >= (1, 15, 0):
+            compressed = self.data[self.pos] != 0
+            self.pos += 1
+        else:
+            compressed = self._read_int() != 0
+
+        for _ in range(7):  # Creation date
+            self._read_int()
+        for _ in range(3):  # Database name and versions
+            self._read_str()
+        return compressed
+
+    def _read_block(self, position: int, compressed: bool) -> str:
+        """
+        Read a data block, made of chunks of bytes.
+
+        Parameters
+        ----------
+        position : int
+            Position of the block in the file.
+        compressed : bool
+            Whether the block is compressed with zlib.
+
+        Returns
+        -------
+        str
+            Output of `COPY ... TO stdout` for the table.
+        """
+        self.pos = position + 1  # Block type
+        self._read_int()  # Dump ID
+
+        decompressor = zlib.decompressobj()
+        chunks = []
+        while (length := self._read_int()) > 0:
+            chunk = self.data[self.pos : self.pos + length]
+            self.pos += length
+            chunks.append(
+                decompressor.decompress(chunk) if compressed else chunk
+            )
+        if compressed:
+            chunks.append(decompressor.flush())
+        return b"".join(chunks).decode()
+
+    @staticmethod
+    def _unescape(value: str) -> str | None:
+        """
+        Decode a value of the text format of COPY.
+
+        Parameters
+        ----------
+        value : str
+            Value written by COPY.
+
+        Returns
+        -------
+        str | None
+            Decoded value, None for NULL.
+        """
+        if value == r"\N":
+            return None
+
+        def replace(match: re.Match[str]) -> str:
+            escape = match.group(1)
+            if escape[0] == "x" and len(escape) > 1:
+                return chr(int(escape[1:], 16))
+            if escape.isdigit():
+                return chr(int(escape, 8))
+            return COPY_ESCAPES.get(escape, escape)
+
+        return COPY_ESCAPE.sub(replace, value)
+
+    def tables(
+        self,
+    ) -> Iterator[tuple[str, list[str], list[list[str | None]]]]:
+        """
+        Read the data of each table of the dump.
+
+        Yields
+        ------
+        str
+            Table name.
+        list[str]
+            Column names.
+        list[list[str | None]]
+            Rows, with values in the text format of COPY.
+        """
+        compressed = self._read_header()
+        entries = []
+        for _ in range(self._read_int()):
+            self._read_int()  # Dump ID
+            self._read_int()  # Whether there is data
+            self._read_str()  # Table OID
+            self._read_str()  # OID
+            tag = self._read_str()
+            desc = self._read_str()
+            self._read_int()  # Section
+            self._read_str()  # Definition
+            self._read_str()  # Drop statement
+            copy_statement = self._read_str()
+            for _ in range(3):  # Schema, tablespace and table access method
+                self._read_str()
+            if self.version >= (1, 16, 0):
+                self._read_int()  # Kind of relation
+            self._read_str()  # Owner
+            self._read_str()  # With OIDs
+            while self._read_str() is not None:  # Dependencies
+                pass
+            position = self._read_offset()
+
+            if desc == "TABLE DATA" and tag and copy_statement and position:
+                entries.append((tag, copy_statement, position))
+
+        for table, copy_statement, position in entries:
+            match = COPY_COLUMNS.match(copy_statement)
+            if match is None:
+                continue
+            columns = [
+                column.strip().strip('"')
+                for column in match.group(1).split(",")
+            ]
+            rows = [
+                [self._unescape(value) for value in line.split("\t")]
+                for line in self._read_block(position, compressed).splitlines()
+                if line and line != "\\."
+            ]
+            yield table, columns, rows
+
+
+class SQLite(SQLInterface):
+    """
+    Class to read and write data from and to a local SQLite database.
+
+    The database has the schema of `database_creation.ddl` and, when it is
+    created, it is filled with the data of `dump.sql`, then the migrations
+    of `data/migrations` are applied. So the application
+    and the scripts can run without a PostgreSQL server, e.g. for tests and
+    benchmarks. Queries are written for PostgreSQL and translated: `%s`
+    placeholders, `= ANY(%s)`, `ILIKE`, `bool_or`, and `word_similarity`
+    with its operator `<%` (approximated) are supported. The
+    constraints added with `ALTER TABLE` (foreign keys and checks) are not
+    created. The database is filled on first use or by `warmup`.
+
+    Parameters
+    ----------
+    path : str | Path, optional
+        Path of the database file, by default ":memory:" (in-memory
+        database, lost when the object is deleted).
+    ddl_path : Path | None, optional
+        DDL file creating the schema, by default `database_creation.ddl`.
+        None to create no table.
+    dump_path : Path | None, optional
+        Dump in the custom format of `pg_dump` filling the tables, by
+        default `dump.sql`. None to keep the tables empty.
+    cache : QueryCache | None, optional
+        Cache of query results, by default None (no cache).
+    monitor : QueryMonitor | None, optional
+        Monitor measuring each query, by default None (no measure).
+
+    Attributes
+    ----------
+    path : str | Path
+        Path of the database file.
+    ddl_path : Path | None
+        DDL file creating the schema of an empty database.
+    dump_path : Path | None
+        Dump filling the tables of an empty database.
+    cache : QueryCache | None
+        Cache of query results, None if results are not cached.
+    monitor : QueryMonitor | None
+        Monitor measuring each query, None if queries are not measured.
+    conn : sqlite3.Connection
+        Shared connection, used by one thread at a time.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        ddl_path: Path | None = DDL_PATH,
+        dump_path: Path | None = DUMP_PATH,
+        *,
+        cache: QueryCache | None = None,
+        monitor: QueryMonitor | None = None,
+    ) -> None:
+        self.path = path
+        self.ddl_path = ddl_path
+        self.dump_path = dump_path
+        self.cache = cache
+        self.monitor = monitor
+
+        sqlite3.register_converter("boolean", lambda value: value != b"0")
+        self.conn = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        self.conn.create_aggregate("bool_or", 1, BoolOr)
+        self.conn.create_function(
+            "word_similarity", 2, word_similarity, deterministic=True
+        )
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Queries of the transaction of each thread.
+        self._local = threading.local()
+        self._ready = False
+
+    @staticmethod
+    def _translate(
+        query: str, params: list[Any] | None = None
+    ) -> tuple[str, list[Any]]:
+        """
+        Translate a PostgreSQL query and its parameters to SQLite.
+
+        Parameters
+        ----------
+        query : str
+            Query written for PostgreSQL, with `%s` placeholders.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+
+        Returns
+        -------
+        str
+            Query for SQLite, with `?` placeholders.
+        list[Any]
+            Values for SQLite, lists being encoded in JSON for `json_each`.
+        """
+        query = ANY.sub("IN (SELECT value FROM json_each(%s))", query)
+        query = WORD_SIMILAR.sub(
+            rf"word_similarity(\1, \2) >= {WORD_SIMILARITY_THRESHOLD}", query
+        )
+        query = PLACEHOLDER.sub(
+            lambda match: "?" if match.group(1) == "s" else "%", query
+        )
+        values = [
+            json.dumps(value) if isinstance(value, (list, tuple)) else value
+            for value in params or []
+        ]
+        return ILIKE.sub("LIKE", query), values
+
+    @staticmethod
+    def _translate_ddl(script: str) -> list[str]:
+        """
+        Translate a PostgreSQL DDL script to SQLite statements.
+
+        Materialized views become views, always up to date, and their
+        indexes are dropped.
+
+        Parameters
+        ----------
+        script : str
+            DDL script, e.g. the content of `database_creation.ddl`.
+
+        Returns
+        -------
+        list[str]
+            Statements supported by SQLite.
+        """
+        lines = [
+            line
+            for line in script.splitlines()
+            if not line.lstrip().startswith("--")
+        ]
+        statements = []
+        views: set[str] = set()
+        for raw_statement in "\n".join(lines).split(";"):
+            statement = " ".join(raw_statement.split())
+            lowered = statement.lower()
+            # SQLite has one database per file and cannot add constraints
+            # to existing tables.
+            if not statement or lowered.startswith("create database"):
+                continue
+            if lowered.startswith("alter table") and "add constraint" in (
+                lowered
+            ):
+                continue
+
+            if match := MATERIALIZED_VIEW.match(statement):
+                views.add(match.group(1).lower())
+                statement = MATERIALIZED_VIEW.sub(r"CREATE VIEW \1", statement)
+            index = INDEX_TABLE.match(statement)
+            if index and index.group(1).lower() in views:
+                continue
+            statements.append(SERIAL.sub("integer", statement))
+        return statements
+
+    def load(self, ddl_path: Path, dump_path: Path | None = None) -> None:
+        """
+        Create the tables and views, then fill the tables.
+
+        Parameters
+        ----------
+        ddl_path : Path
+            DDL file creating the schema.
+        dump_path : Path | None, optional
+            Dump in the custom format of `pg_dump` filling the tables, by
+            default None.
+        """
+        statements = self._translate_ddl(ddl_path.read_text(encoding="utf-8"))
+        with self._connection() as conn:
+            for statement in statements:
+                conn.execute(statement)
+
+            tables = (
+                [] if dump_path is None else DumpReader(dump_path).tables()
+            )
+            for table, columns, rows in tables:
+                booleans = {
+                    name
+                    for _, name, type_name, *_ in conn.execute(
+                        f"PRAGMA table_info({table});"
+                    )
+                    if type_name.lower() == "boolean"
+                }
+                indexes = [
+                    index
+                    for index, column in enumerate(columns)
+                    if column in booleans
+                ]
+                values: list[list[Any]] = rows
+                for row in values:
+                    for index in indexes:
+                        row[index] = (
+                            None if row[index] is None else row[index] == "t"
+                        )
+
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))});",
+                    values,
+                )
+
+        if self.cache is not None:
+            self.cache.clear()
+
+    @contextmanager
+    def _connection(self) -> Generator[sqlite3.Connection]:
+        """
+        Lock the connection for the duration of a block.
+
+        The transaction is committed at the end of the outermost block, or
+        rolled back if an exception is raised.
+
+        Yields
+        ------
+        sqlite3.Connection
+            Shared connection.
+        """
+        with self._lock:
+            if not self._ready:
+                self.warmup()
+
+            self._depth += 1
+            try:
+                yield self.conn
+            except:
+                self._depth -= 1
+                if not self._depth:
+                    self.conn.rollback()
+                raise
+            self._depth -= 1
+            if not self._depth:
+                self.conn.commit()
+
+    @contextmanager
+    def transaction(self) -> Generator[None]:  # ruff: ignore[undocumented-public-method]
+        with self._connection() as conn:
+            outermost = not self._in_transaction()
+            if outermost:
+                self._local.queries = []
+
+            # The outermost savepoint starts and ends the transaction, the
+            # other ones are nested in it.
+            savepoint = f"transaction_{self._depth}"
+            conn.execute(f"SAVEPOINT {savepoint};")
+            try:
+                yield
+            except:
+                conn.execute(f"ROLLBACK TO {savepoint};")
+                raise
+            finally:
+                conn.execute(f"RELEASE {savepoint};")
+                if outermost:
+                    queries: list[str] = self._local.queries
+                    self._local.queries = None
+                    if self.cache is not None:
+                        for query in queries:
+                            self.cache.invalidate_query(query)
+
+    def _in_transaction(self) -> bool:
+        """
+        Check if the current thread is in a transaction.
+
+        Returns
+        -------
+        bool
+            True if the thread is in a `transaction` block.
+        """
+        return getattr(self._local, "queries", None) is not None
+
+    def _cache_result(
+        self,
+        query: str,
+        params: list[Any] | None,
+        columns: list[str],
+        rows: list[Any],
+    ) -> None:
+        """
+        Store the result of an executed query in the cache, if any.
+
+        In a transaction, results are not stored since they are not
+        committed yet, and results made stale by the query are dropped again
+        at the end of the transaction.
+
+        Parameters
+        ----------
+        query : str
+            Executed SQL query.
+        params : list[Any] | None
+            Values substituted into the query.
+        columns : list[str]
+            Names of the returned columns.
+        rows : list[Any]
+            Fetched rows.
+        """
+        if self.cache is None:
+            return
+
+        if self._in_transaction():
+            self.cache.invalidate_query(query)
+            self._local.queries.append(query)
+        else:
+            self.cache.store(query, params, columns, rows)
+
+    def execute_with_columns(  # ruff: ignore[undocumented-public-method]
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        if self.monitor is None or not self.monitor.active:
+            return self._execute_with_columns(query, params)
+
+        start = time.perf_counter()
+        columns, rows = self._execute_with_columns(query, params)
+        self.monitor.record(query, start, columns, rows, params)
+        return columns, rows
+
+    def _execute_with_columns(
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        """
+        Execute a SQL query, or give its cached result.
+
+        Parameters
+        ----------
+        query : str
+            SQL query.
+        params : list[Any], optional
+            Values substituted into the query, by default None.
+
+        Returns
+        -------
+        list[str]
+            Names of the returned columns.
+        list[Any]
+            Fetched rows.
+        """
+        if self.cache is not None and not self._in_transaction():
+            cached = self.cache.get(query, params)
+            if cached is not None:
+                return cached
+
+        with self._connection() as conn:
+            cursor = conn.execute(*self._translate(query, params))
+            columns = [desc[0] for desc in cursor.description or []]
+            rows = cursor.fetchall() if columns else []
+
+        self._cache_result(query, params, columns, rows)
+        return columns, rows
+
+    def execute(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        return_type: ReturnType = "list",
+    ) -> Any:  # ruff: ignore[any-type]
+        columns, rows = self.execute_with_columns(query, params)
+        return self._format_rows(columns, rows, return_type)
+
+    def execute_batch(  # ruff: ignore[undocumented-public-method]
+        self, queries: list[tuple[str, list[Any] | None]]
+    ) -> list[tuple[list[str], list[Any]]]:
+        # There is no round trip to save, but the batch is one transaction.
+        with self._connection():
+            return super().execute_batch(queries)
+
+    def execute_guarded(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        timeout: float = 5.0,
+        max_rows: int = 10000,
+        chunk_size: int = 1000,
+    ) -> GuardedQuery:
+        def fetch(guarded: GuardedQuery) -> Generator[list[Any]]:
+            with (
+                self._connection() as conn,
+                self._timeout(conn, guarded.timeout),
+            ):
+                guarded.canceller = conn.interrupt
+                try:
+                    cursor = conn.execute(*self._translate(query, params))
+                    guarded.columns = [
+                        desc[0] for desc in cursor.description or []
+                    ]
+                    while rows := cursor.fetchmany(guarded.chunk_size):
+                        yield rows
+                finally:
+                    guarded.canceller = None
+
+        return GuardedQuery(
+            fetch, timeout=timeout, max_rows=max_rows, chunk_size=chunk_size
+        )
+
+    @staticmethod
+    @contextmanager
+    def _timeout(
+        conn: sqlite3.Connection, timeout: float | None
+    ) -> Generator[None]:
+        """
+        Interrupt the queries of a block which run for too long.
+
+        Parameters
+        ----------
+        conn : sqlite3.Connection
+            Connection running the queries.
+        timeout : float | None
+            Time in seconds after which queries are interrupted, None for no
+            limit.
+
+        Yields
+        ------
+        None
+        """
+        if timeout is None:
+            yield
+            return
+
+        deadline = time.monotonic() + timeout
+        # SQLite calls the handler while it runs a query, and interrupts the
+        # query when the handler returns True.
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            yield
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def explain(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        *,
+        analyze: bool = True,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        # EXPLAIN QUERY PLAN gives one row per node, with the id of its
+        # parent, which are converted to the nodes of PostgreSQL's format.
+        translated, values = self._translate(query, params)
+        root: dict[str, Any] = {"Node Type": "Query", "Plans": []}
+        nodes = {0: root}
+        with self._connection() as conn, self._timeout(conn, timeout):
+            for node_id, parent, _, detail in conn.execute(
+                f"EXPLAIN QUERY PLAN {translated}", values
+            ):
+                node: dict[str, Any] = {"Node Type": detail, "Plans": []}
+                # Scans of an index or of a virtual table (json_each) are
+                # not sequential scans of a table.
+                words = detail.split()
+                if words[0] == "SCAN" and not {"USING", "VIRTUAL"} & {*words}:
+                    node["Node Type"] = "Seq Scan"
+                    node["Relation Name"] = words[1]
+                    node["Detail"] = detail
+                nodes[node_id] = node
+                nodes.get(parent, root)["Plans"].append(node)
+
+            plan: dict[str, Any] = {"Plan": root}
+            if analyze:
+                conn.execute("SAVEPOINT explain;")
+                try:
+                    start = time.perf_counter()
+                    conn.execute(translated, values).fetchall()
+                    plan["Execution Time"] = (
+                        time.perf_counter() - start
+                    ) * 1000
+                finally:
+                    conn.execute("ROLLBACK TO explain;")
+                    conn.execute("RELEASE explain;")
+
+        return plan
+
+    def read(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        columns: str | list[str] | None = None,
+        condition_data: dict[str, Any] | None = None,
+        number_values: int | None = None,
+        return_type: ReturnType = "list[dict]",
+    ) -> Any:  # ruff: ignore[any-type]
+        query, parameters = self._select_query(
+            table, columns, condition_data, number_values
+        )
+
+        columns_list, data = self.execute_with_columns(query, parameters)
+
+        if return_type == "list" and self._is_single_column(columns):
+            return [row[0] for row in data]
+
+        return self._format_rows(columns_list, data, return_type)
+
+    def stream(  # ruff: ignore[undocumented-public-method]
+        self,
+        query: str,
+        params: list[Any] | None = None,
+        itersize: int = 1000,
+        return_type: Literal["list", "dict", "list[dict]"] = "list",
+    ) -> Iterator[Any]:
+        # SQLite cursors already step through the result lazily.
+        with self._connection() as conn:
+            cursor = conn.execute(*self._translate(query, params))
+            columns = [desc[0] for desc in cursor.description or []]
+
+            while rows := cursor.fetchmany(itersize):
+                if return_type == "dict":
+                    yield self._format_rows(columns, rows, "dict")
+                else:
+                    yield from self._format_rows(columns, rows, return_type)
+
+    def write(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",  # ruff: ignore[unused-method-argument]
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        # `executemany` is the bulk path of SQLite, whatever the method.
+        if isinstance(data, dict):
+            data = [data]
+
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return
+
+        conflict_clause = self._conflict_clause(
+            table, columns, on_conflict, update
+        )
+        query = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}){conflict_clause};"
+        )
+        with self._connection() as conn:
+            conn.executemany(query, rows)
+
+        self._cache_result(query, None, [], [])
+
+    def update(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        update_data: dict[str, Any],
+        condition_data: dict[str, Any] | None = None,
+    ) -> None:
+        self.execute(*self._update_query(table, update_data, condition_data))
+
+    def update_many(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+        keys, updated = self._key_columns(key, columns)
+        if not updated:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._update_from_query(table, source, keys, updated),
+        )
+
+    def delete_many(  # ruff: ignore[undocumented-public-method]
+        self, table: str, data: Iterable[dict[str, Any]]
+    ) -> int:
+        columns, rows = self._copy_rows(data)
+        if not columns:
+            return 0
+
+        source = f"bulk_{uuid.uuid4().hex}"
+        return self._execute_from_copy(
+            table,
+            source,
+            columns,
+            rows,
+            self._delete_in_query(table, source, columns),
+        )
+
+    def _execute_from_copy(
+        self,
+        table: str,
+        source: str,
+        columns: list[str],
+        rows: Iterable[list[Any]],
+        query: str,
+    ) -> int:
+        """
+        Insert lines into a temporary table, then run a query reading it.
+
+        Parameters
+        ----------
+        table : str
+            Table whose columns are used for the temporary table.
+        source : str
+            Name of the temporary table, dropped at the end.
+        columns : list[str]
+            Columns of the lines.
+        rows : Iterable[list[Any]]
+            Values of the lines.
+        query : str
+            Query joining `source`.
+
+        Returns
+        -------
+        int
+            Number of rows affected by `query`.
+        """
+        columns_str = ", ".join(columns)
+        with self.transaction(), self._connection() as conn:
+            conn.execute(
+                f"CREATE TEMPORARY TABLE {source} AS"
+                f" SELECT {columns_str} FROM {table} LIMIT 0;"
+            )
+            try:
+                conn.executemany(
+                    f"INSERT INTO {source} ({columns_str}) "
+                    f"VALUES ({', '.join('?' * len(columns))});",
+                    rows,
+                )
+                count = conn.execute(query).rowcount
+            finally:
+                conn.execute(f"DROP TABLE temp.{source};")
+
+        self._cache_result(query, None, [], [])
+        return count
+
+    def create_table(  # ruff: ignore[undocumented-public-method]
+        self,
+        table_name: str,
+        columns_names: list[str],
+        columns_type: list[str],
+    ) -> None:
+        columns = ", ".join(
+            f"{name} {SERIAL.sub('integer', column_type)}"
+            for name, column_type in zip(
+                columns_names, columns_type, strict=True
+            )
+        )
+        self.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({columns});")
+
+    def delete_rows(  # ruff: ignore[undocumented-public-method]
+        self, table: str, condition_data: dict[str, Any]
+    ) -> None:
+        if not condition_data:
+            msg = "Conditions are required, use `delete_all` instead."
+            raise ValueError(msg)
+
+        self.execute(*self._delete_query(table, condition_data))
+
+    def delete_all(self, table: str) -> None:  # ruff: ignore[undocumented-public-method]
+        self.execute(*self._delete_query(table))
+
+    @contextmanager
+    def defer_refresh(self) -> Generator[None]:  # ruff: ignore[undocumented-public-method, no-self-use]
+        # Materialized views are plain views in SQLite, always up to date.
+        yield
+
+    def refresh_views(self, *views: str) -> None:  # ruff: ignore[undocumented-public-method]
+        # Materialized views are plain views in SQLite, always up to date.
+        pass
+
+    def warmup(self) -> None:  # ruff: ignore[undocumented-public-method]
+        with self._lock:
+            if self._ready:
+                return
+            # Set first, since `load` runs its queries through `_connection`.
+            self._ready = True
+
+            is_empty = not self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table';"
+            ).fetchone()
+            if is_empty and self.ddl_path is not None:
+                self.load(self.ddl_path, self.dump_path)
+                # The local copy has the schema of the live database.
+                Migrator(self, dialect="sqlite").upgrade()
+
+    def __del__(self) -> None:  # ruff: ignore[undocumented-magic-method]
+        conn: sqlite3.Connection | None = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
+
+
+class AsyncSQLite(AsyncSQLInterface):
+    """
+    Asynchronous interface of a `SQLite` database.
+
+    Queries run in worker threads, one at a time since they share the
+    connection of the `SQLite` object, so this class only exists for the
+    code written for `AsyncPostgreSQL` to run locally.
+
+    Parameters
+    ----------
+    database : SQLite
+        Local database to query.
+
+    Attributes
+    ----------
+    database : SQLite
+        Local database to query.
+    """
+
+    def __init__(self, database: SQLite) -> None:
+        self.database = database
+
+    async def execute_with_columns(  # ruff: ignore[undocumented-public-method]
+        self, query: str, params: list[Any] | None = None
+    ) -> tuple[list[str], list[Any]]:
+        return await asyncio.to_thread(
+            self.database.execute_with_columns, query, params
+        )
+
+    async def write(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]] | dict[str, Any],
+        method: Literal["auto", "insert", "copy"] = "auto",
+        *,
+        on_conflict: Sequence[str] | None = None,
+        update: Sequence[str] | Literal["nothing"] | None = None,
+    ) -> None:
+        await asyncio.to_thread(
+            self.database.write,
+            table,
+            data,
+            method,
+            on_conflict=on_conflict,
+            update=update,
+        )
+
+    async def update_many(  # ruff: ignore[undocumented-public-method]
+        self,
+        table: str,
+        data: Iterable[dict[str, Any]],
+        key: str | Sequence[str] = "id",
+    ) -> int:
+        return await asyncio.to_thread(
+            self.database.update_many, table, data, key
+        )
+
+    async def delete_many(  # ruff: ignore[undocumented-public-method]
+        self, table: str, data: Iterable[dict[str, Any]]
+    ) -> int:
+        return await asyncio.to_thread(self.database.delete_many, table, data)
+
+    async def refresh_views(self, *views: str) -> None:  # ruff: ignore[undocumented-public-method]
+        await asyncio.to_thread(self.database.refresh_views, *views)
+
+    async def warmup(self) -> None:  # ruff: ignore[undocumented-public-method]
+        await asyncio.to_thread(self.database.warmup)
+
+    async def close(self) -> None:
+        """Do nothing, the connection belongs to the `SQLite` object."""
+
+    @staticmethod
+    def run(coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine from synchronous code and wait for its result.
+
+        Parameters
+        ----------
+        coroutine : Coroutine[Any, Any, T]
+            Coroutine to run, e.g. `database.gather(...)`.
+
+        Returns
+        -------
+        T
+            Result of the coroutine.
+        """
+        return asyncio.run(coroutine)
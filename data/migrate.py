@@ -0,0 +1,223 @@
+"""Command line interface of the schema migrations, with a benchmark."""
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import time
+from typing import Any
+
+import psycopg
+from dotenv import load_dotenv
+
+from data.db_communication import PostgreSQL, SQLInterface
+from data.local_db import SQLite
+from data.migrations.migrator import Migrator
+
+LOGGER = logging.getLogger(__name__)
+
+# Queries run by the pages of the application, with the sample values they
+# are benchmarked with, named after `SAMPLE_QUERY` columns.
+SAMPLE_QUERY = (
+    "SELECT result.id_stage, result.id_crew, stage.id_rally, crew.id_team, "
+    "team.type, team.name AS team_name "
+    "FROM result "
+    "JOIN stage ON stage.id = result.id_stage "
+    "JOIN crew ON crew.id = result.id_crew "
+    "JOIN team ON team.id = crew.id_team "
+    "ORDER BY result.id LIMIT 1;"
+)
+PAGE_QUERIES: dict[str, tuple[str, list[str]]] = {
+    "home: search": (
+        (
+            "SELECT type, id, label FROM search_label "
+            "WHERE label ILIKE %s ESCAPE '\\' OR %s <%% label "
+            "ORDER BY label ILIKE %s ESCAPE '\\' DESC, "
+            "word_similarity(%s, label) DESC, length(label), label "
+            "LIMIT 10;"
+        ),
+        ["team_name", "team_name", "team_name", "team_name"],
+    ),
+    "rally: stages": (
+        (
+            "SELECT id, number, id_starting_city, id_ending_city, type, "
+            "kilometers FROM stage WHERE id_rally = %s ORDER BY number;"
+        ),
+        ["id_rally"],
+    ),
+    "rally: team numbers": (
+        (
+            "SELECT COUNT(*) FROM team "
+            "JOIN participation ON team.id = id_team "
+            "WHERE id_rally = %s AND team.type = %s;"
+        ),
+        ["id_rally", "type"],
+    ),
+    "rally: leaderboard": (
+        (
+            "SELECT id_rally, team_name, total_time, id_team, "
+            "disqualification FROM rally_leaderboard "
+            "WHERE id_rally = %s AND type = %s "
+            "ORDER BY id_rally, rank, id_crew;"
+        ),
+        ["id_rally", "type"],
+    ),
+    "stage: ranking": (
+        (
+            "SELECT sr.time, sr.category_rank, cr.id_team, cr.team_name, "
+            "cr.first_name_1, cr.last_name_1, cr.first_name_2, "
+            "cr.last_name_2 FROM stage_ranking AS sr "
+            "LEFT JOIN crew_roster AS cr ON cr.id_crew = sr.id_crew "
+            "WHERE sr.id_stage = %s AND sr.type = %s "
+            "ORDER BY sr.category_rank IS NULL, sr.category_rank, "
+            "sr.time = 0, sr.time;"
+        ),
+        ["id_stage", "type"],
+    ),
+    "stage: general ranking": (
+        (
+            "SELECT CASE WHEN gr.disqualification THEN 0 "
+            "ELSE gr.total_time END AS time, gr.category_rank, cr.id_team, "
+            "cr.team_name, cr.first_name_1, cr.last_name_1, "
+            "cr.first_name_2, cr.last_name_2 FROM general_ranking AS gr "
+            "LEFT JOIN crew_roster AS cr ON cr.id_crew = gr.id_crew "
+            "WHERE gr.id_stage = %s AND gr.type = %s "
+            "ORDER BY gr.category_rank IS NULL, gr.category_rank, "
+            "gr.total_time;"
+        ),
+        ["id_stage", "type"],
+    ),
+    "team: rallies": (
+        "SELECT id, name, year FROM race_by_team WHERE id_team = %s;",
+        ["id_team"],
+    ),
+    "team: members": (
+        (
+            "SELECT last_name, first_name FROM contestant WHERE id_crew = %s "
+            "ORDER BY id;"
+        ),
+        ["id_crew"],
+    ),
+}
+
+
+def benchmark(database: SQLInterface, repeat: int = 5) -> dict[str, float]:
+    """
+    Measure the queries of the pages of the application.
+
+    The database should have no cache, otherwise only its lookup time is
+    measured. Queries which fail, e.g. on columns added by a later
+    migration, are skipped.
+
+    Parameters
+    ----------
+    database : SQLInterface
+        Database to measure.
+    repeat : int, optional
+        Number of runs of each query, by default 5.
+
+    Returns
+    -------
+    dict[str, float]
+        Median time in seconds of each query of `PAGE_QUERIES` which ran.
+    """
+    samples = database.execute(SAMPLE_QUERY, return_type="list[dict]")
+    if not samples:
+        return {}
+    sample: dict[str, Any] = samples[0]
+
+    times = {}
+    for label, (query, names) in PAGE_QUERIES.items():
+        params = [sample[name] for name in names]
+        durations = []
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                database.execute(query, params)
+                durations.append(time.perf_counter() - start)
+        except (psycopg.Error, sqlite3.Error) as error:
+            LOGGER.info("Skipped %s: %s", label, error)
+            continue
+        times[label] = statistics.median(durations)
+    return times
+
+
+def connect() -> Migrator:
+    """
+    Connect to the database of the application, without cache.
+
+    As for the application, DB_BACKEND=sqlite uses the local database of
+    SQLITE_PATH instead of the one of the `.env` credentials.
+
+    Returns
+    -------
+    Migrator
+        Runner of the migrations of the database.
+    """
+    load_dotenv(override=True)
+    if os.getenv("DB_BACKEND", "postgresql") == "sqlite":
+        return Migrator(
+            SQLite(os.getenv("SQLITE_PATH", ":memory:")), dialect="sqlite"
+        )
+    return Migrator(
+        PostgreSQL(
+            hostname=os.environ["HOSTNAME"],
+            db_name=os.environ["DB_NAME"],
+            username=os.environ["USERNAME"],
+            password=os.environ["PASSWORD"],
+            port=int(os.environ["PORT"]),
+        )
+    )
+
+
+def main() -> None:
+    """Run the migrations from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Apply or revert the migrations of the schema."
+    )
+    parser.add_argument(
+        "command",
+        choices=["status", "up", "down", "benchmark"],
+        help=(
+            "show the applied versions, apply or revert migrations, or "
+            "measure the page queries before and after applying them"
+        ),
+    )
+    parser.add_argument("--to", type=int, default=None, help="target version")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs of each query"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    migrator = connect()
+    if args.command == "up":
+        migrator.upgrade(args.to)
+    elif args.command == "down":
+        migrator.downgrade(args.to)
+    elif args.command == "benchmark":
+        before = benchmark(migrator.database, args.repeat)
+        after = (
+            benchmark(migrator.database, args.repeat)
+            if migrator.upgrade(args.to)
+            else before
+        )
+        for label in PAGE_QUERIES:
+            LOGGER.info(
+                "%-24s %12s -> %12s",
+                label,
+                f"{before[label] * 1000:.2f} ms" if label in before else "-",
+                f"{after[label] * 1000:.2f} ms" if label in after else "-",
+            )
+
+    pending = [migration.version for migration in migrator.pending()]
+    LOGGER.info(
+        "Schema version %s, pending migrations: %s",
+        migrator.version(),
+        pending or "none",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+CREATE INDEX IF NOT EXISTS FKcompose_IND
+     ON contestant (id_crew);
+DROP INDEX IF EXISTS contestant_crew_id_IND;
+
+DROP INDEX IF EXISTS team_type_IND;
+
+CREATE INDEX IF NOT EXISTS FKforme_IND
+     ON stage (id_rally);
+DROP INDEX IF EXISTS stage_rally_number_IND;
+
+CREATE INDEX IF NOT EXISTS FKpossede_IND
+     ON result (id_stage);
+DROP INDEX IF EXISTS result_stage_crew_IND;
@@ -0,0 +1,60 @@
+-- Composite indexes of the hot queries of the pages. Each one replaces the
+-- single-column index of DB-Main on its first column, which it covers.
+-- participation(id_rally) is not added: the primary key ID_participe on
+-- (id_rally, id_team) already serves lookups by rally.
+
+-- Results of a stage, and time of a crew on a stage.
+CREATE INDEX IF NOT EXISTS result_stage_crew_IND
+     ON result (id_stage, id_crew);
+DROP INDEX IF EXISTS FKpossede_IND;
+
+-- Stages of a rally, in order.
+CREATE INDEX IF NOT EXISTS stage_rally_number_IND
+     ON stage (id_rally, number);
+DROP INDEX IF EXISTS FKforme_IND;
+
+-- Teams and crews of a vehicle type.
+CREATE INDEX IF NOT EXISTS team_type_IND
+     ON team (type);
+
+-- Members of a crew, in order.
+CREATE INDEX IF NOT EXISTS contestant_crew_id_IND
+     ON contestant (id_crew, id);
+DROP INDEX IF EXISTS FKcompose_IND;
+
+-- Leaderboard of database_creation.ddl, missing from the databases created
+-- before it was added there. The unique index allows REFRESH ...
+-- CONCURRENTLY.
+CREATE MATERIALIZED VIEW IF NOT EXISTS rally_leaderboard AS
+SELECT id_rally, type, id_crew, id_team, team_name, total_time,
+first_name_1, last_name_1, first_name_2, last_name_2, disqualification,
+RANK() OVER (
+    PARTITION BY id_rally, type
+    ORDER BY disqualification ASC, total_time ASC
+) AS rank
+FROM (
+    SELECT stage.id_rally, team.type, crew.id AS id_crew,
+    team.id AS id_team, team.name AS team_name,
+    SUM(result.time) AS total_time,
+    c1.first_name AS first_name_1, c1.last_name AS last_name_1,
+    c2.first_name AS first_name_2, c2.last_name AS last_name_2,
+    BOOL_OR(result.disqualification) AS disqualification
+    FROM crew
+    JOIN result ON result.id_crew = crew.id
+    JOIN stage ON stage.id = result.id_stage
+    JOIN team ON team.id = crew.id_team
+    JOIN contestant c1 ON c1.id_crew = crew.id
+    JOIN contestant c2 ON c2.id_crew = crew.id AND c2.id > c1.id
+    GROUP BY stage.id_rally, team.type, crew.id, team.id, team.name,
+    c1.first_name, c1.last_name, c2.first_name, c2.last_name
+) AS totals;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rally_leaderboard_IND
+     ON rally_leaderboard (id_rally, type, id_crew);
+
+-- Statistics of the new indexes, without which the planner may prefer the
+-- index on team(type), whose three values are not selective.
+ANALYZE result;
+ANALYZE stage;
+ANALYZE team;
+ANALYZE contestant;
@@ -0,0 +1,32 @@
+-- Composite indexes of the hot queries of the pages. Each one replaces the
+-- single-column index of DB-Main on its first column, which it covers.
+-- participation(id_rally) is not added: the primary key ID_participe on
+-- (id_rally, id_team) already serves lookups by rally.
+-- The local copy always has rally_leaderboard, created as a plain view
+-- from database_creation.ddl: only the indexes are added.
+
+-- Results of a stage, and time of a crew on a stage.
+CREATE INDEX IF NOT EXISTS result_stage_crew_IND
+     ON result (id_stage, id_crew);
+DROP INDEX IF EXISTS FKpossede_IND;
+
+-- Stages of a rally, in order.
+CREATE INDEX IF NOT EXISTS stage_rally_number_IND
+     ON stage (id_rally, number);
+DROP INDEX IF EXISTS FKforme_IND;
+
+-- Teams and crews of a vehicle type.
+CREATE INDEX IF NOT EXISTS team_type_IND
+     ON team (type);
+
+-- Members of a crew, in order.
+CREATE INDEX IF NOT EXISTS contestant_crew_id_IND
+     ON contestant (id_crew, id);
+DROP INDEX IF EXISTS FKcompose_IND;
+
+-- Statistics of the new indexes, without which the planner may prefer the
+-- index on team(type), whose three values are not selective.
+ANALYZE result;
+ANALYZE stage;
+ANALYZE team;
+ANALYZE contestant;
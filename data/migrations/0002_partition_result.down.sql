@@ -0,0 +1,68 @@
+LOCK TABLE result IN SHARE MODE;
+
+DROP TRIGGER rally_result_partition ON rally;
+DROP FUNCTION create_result_partition();
+
+create table result_single (
+     id integer not null default nextval('result_id_seq'),
+     time real not null,
+     disqualification boolean not null,
+     id_crew integer not null,
+     id_stage integer not null,
+     constraint ID_RESULT primary key (id),
+     constraint result_time_check check (time >= 0));
+
+INSERT INTO result_single (id, time, disqualification, id_crew, id_stage)
+SELECT id, time, disqualification, id_crew, id_stage
+FROM result;
+
+DROP MATERIALIZED VIEW IF EXISTS rally_leaderboard;
+ALTER SEQUENCE result_id_seq OWNED BY result_single.id;
+-- Drops the partitions too.
+DROP TABLE result;
+ALTER TABLE result_single RENAME TO result;
+ALTER TABLE stage DROP CONSTRAINT stage_id_rally_unique;
+
+alter table result add constraint FKobtient_FK
+     foreign key (id_crew)
+     references crew;
+
+alter table result add constraint FKpossede_FK
+     foreign key (id_stage)
+     references stage;
+
+create index FKobtient_IND
+     on result (id_crew);
+
+create index result_stage_crew_IND
+     on result (id_stage, id_crew);
+
+-- View of `database_creation.ddl`.
+CREATE MATERIALIZED VIEW rally_leaderboard AS
+SELECT id_rally, type, id_crew, id_team, team_name, total_time,
+first_name_1, last_name_1, first_name_2, last_name_2, disqualification,
+RANK() OVER (
+    PARTITION BY id_rally, type
+    ORDER BY disqualification ASC, total_time ASC
+) AS rank
+FROM (
+    SELECT stage.id_rally, team.type, crew.id AS id_crew,
+    team.id AS id_team, team.name AS team_name,
+    SUM(result.time) AS total_time,
+    c1.first_name AS first_name_1, c1.last_name AS last_name_1,
+    c2.first_name AS first_name_2, c2.last_name AS last_name_2,
+    BOOL_OR(result.disqualification) AS disqualification
+    FROM crew
+    JOIN result ON result.id_crew = crew.id
+    JOIN stage ON stage.id = result.id_stage
+    JOIN team ON team.id = crew.id_team
+    JOIN contestant c1 ON c1.id_crew = crew.id
+    JOIN contestant c2 ON c2.id_crew = crew.id AND c2.id > c1.id
+    GROUP BY stage.id_rally, team.type, crew.id, team.id, team.name,
+    c1.first_name, c1.last_name, c2.first_name, c2.last_name
+) AS totals;
+
+CREATE UNIQUE INDEX rally_leaderboard_IND
+     ON rally_leaderboard (id_rally, type, id_crew);
+
+ANALYZE result;
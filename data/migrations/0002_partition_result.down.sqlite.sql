@@ -0,0 +1 @@
+ALTER TABLE result DROP COLUMN id_rally;
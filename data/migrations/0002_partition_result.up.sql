@@ -0,0 +1,110 @@
+-- Partition result by rally: each rally has its own partition, so that the
+-- queries of a rally or of a stage only scan one partition, and the results
+-- of an old rally can be archived with DETACH PARTITION or dropped.
+-- The rows are copied under a SHARE lock: results can still be read during
+-- the copy, writes wait for the end of the migration.
+LOCK TABLE result IN SHARE MODE;
+
+-- The rally of a result is the one of its stage.
+ALTER TABLE stage ADD CONSTRAINT stage_id_rally_unique UNIQUE (id, id_rally);
+
+create table result_by_rally (
+     id integer not null default nextval('result_id_seq'),
+     time real not null,
+     disqualification boolean not null,
+     id_crew integer not null,
+     id_stage integer not null,
+     id_rally integer not null,
+     constraint ID_RESULT_RALLY primary key (id_rally, id),
+     constraint result_time_check check (time >= 0))
+     partition by list (id_rally);
+
+DO $$
+DECLARE
+    rally_id integer;
+BEGIN
+    FOR rally_id IN SELECT id FROM rally LOOP
+        EXECUTE format(
+            'CREATE TABLE result_%s PARTITION OF result_by_rally '
+            'FOR VALUES IN (%s)',
+            rally_id,
+            rally_id
+        );
+    END LOOP;
+END
+$$;
+
+-- Results of rallies without partition, e.g. created by another client.
+CREATE TABLE result_default PARTITION OF result_by_rally DEFAULT;
+
+INSERT INTO result_by_rally
+     (id, time, disqualification, id_crew, id_stage, id_rally)
+SELECT result.id, result.time, result.disqualification, result.id_crew,
+result.id_stage, stage.id_rally
+FROM result
+JOIN stage ON stage.id = result.id_stage;
+
+DROP MATERIALIZED VIEW IF EXISTS rally_leaderboard;
+ALTER SEQUENCE result_id_seq OWNED BY result_by_rally.id;
+DROP TABLE result;
+ALTER TABLE result_by_rally RENAME TO result;
+
+alter table result add constraint FKobtient_FK
+     foreign key (id_crew)
+     references crew;
+
+alter table result add constraint FKpossede_FK
+     foreign key (id_stage, id_rally)
+     references stage (id, id_rally);
+
+create index FKobtient_IND
+     on result (id_crew);
+
+create index result_stage_crew_IND
+     on result (id_stage, id_crew);
+
+-- Each new rally gets its partition.
+CREATE FUNCTION create_result_partition() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS result_%s PARTITION OF result '
+        'FOR VALUES IN (%s)',
+        NEW.id,
+        NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER rally_result_partition
+AFTER INSERT ON rally
+FOR EACH ROW EXECUTE FUNCTION create_result_partition();
+
+-- Same view, without the join on stage.
+CREATE MATERIALIZED VIEW rally_leaderboard AS
+SELECT id_rally, type, id_crew, id_team, team_name, total_time,
+first_name_1, last_name_1, first_name_2, last_name_2, disqualification,
+RANK() OVER (
+    PARTITION BY id_rally, type
+    ORDER BY disqualification ASC, total_time ASC
+) AS rank
+FROM (
+    SELECT result.id_rally, team.type, crew.id AS id_crew,
+    team.id AS id_team, team.name AS team_name,
+    SUM(result.time) AS total_time,
+    c1.first_name AS first_name_1, c1.last_name AS last_name_1,
+    c2.first_name AS first_name_2, c2.last_name AS last_name_2,
+    BOOL_OR(result.disqualification) AS disqualification
+    FROM crew
+    JOIN result ON result.id_crew = crew.id
+    JOIN team ON team.id = crew.id_team
+    JOIN contestant c1 ON c1.id_crew = crew.id
+    JOIN contestant c2 ON c2.id_crew = crew.id AND c2.id > c1.id
+    GROUP BY result.id_rally, team.type, crew.id, team.id, team.name,
+    c1.first_name, c1.last_name, c2.first_name, c2.last_name
+) AS totals;
+
+CREATE UNIQUE INDEX rally_leaderboard_IND
+     ON rally_leaderboard (id_rally, type, id_crew);
+
+ANALYZE result;
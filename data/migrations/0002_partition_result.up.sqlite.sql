@@ -0,0 +1,8 @@
+-- SQLite has no partitioning: result only gets the column id_rally, which
+-- the queries filter on.
+ALTER TABLE result ADD COLUMN id_rally integer;
+
+UPDATE result
+SET id_rally = (
+    SELECT stage.id_rally FROM stage WHERE stage.id = result.id_stage
+);
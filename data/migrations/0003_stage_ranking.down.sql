@@ -0,0 +1,8 @@
+DROP TRIGGER result_rank_truncate ON result;
+DROP TRIGGER result_rank_delete ON result;
+DROP TRIGGER result_rank_update ON result;
+DROP TRIGGER result_rank_insert ON result;
+DROP FUNCTION clear_stage_ranking();
+DROP FUNCTION rank_modified_stages();
+DROP FUNCTION rank_stages(integer[]);
+DROP TABLE stage_ranking;
@@ -0,0 +1 @@
+DROP VIEW stage_ranking;
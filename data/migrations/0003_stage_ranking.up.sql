@@ -0,0 +1,99 @@
+-- Rank of each result in its stage, overall and in the category of its
+-- crew, kept up to date by triggers on result. Disqualified crews have no
+-- rank. Stage pages and exercise 6 read the ranks with an index lookup.
+create table stage_ranking (
+     id_result integer not null,
+     id_rally integer not null,
+     id_stage integer not null,
+     id_crew integer not null,
+     type text not null,
+     time real not null,
+     disqualification boolean not null,
+     stage_rank integer,
+     category_rank integer,
+     constraint ID_STAGE_RANKING primary key (id_stage, id_result));
+
+create index stage_ranking_category_IND
+     on stage_ranking (id_stage, type, category_rank);
+
+-- Ranks again all the results of some stages with window functions.
+CREATE FUNCTION rank_stages(stages integer[]) RETURNS void AS $$
+    -- Concurrent writes to the same stage rank it one after the other, and
+    -- the last one sees the results of both. NO KEY UPDATE does not block
+    -- the foreign key checks of result on stage.
+    SELECT id FROM stage WHERE id = ANY(stages) ORDER BY id
+    FOR NO KEY UPDATE;
+
+    DELETE FROM stage_ranking WHERE id_stage = ANY(stages);
+
+    INSERT INTO stage_ranking
+    SELECT result.id, result.id_rally, result.id_stage, result.id_crew,
+    team.type, result.time, result.disqualification,
+    CASE WHEN NOT result.disqualification THEN RANK() OVER (
+        PARTITION BY result.id_stage, result.disqualification
+        ORDER BY result.time
+    ) END,
+    CASE WHEN NOT result.disqualification THEN RANK() OVER (
+        PARTITION BY result.id_stage, team.type, result.disqualification
+        ORDER BY result.time
+    ) END
+    FROM result
+    JOIN crew ON crew.id = result.id_crew
+    JOIN team ON team.id = crew.id_team
+    WHERE result.id_stage = ANY(stages);
+$$ LANGUAGE sql;
+
+-- Each statement ranks once the stages it modified, read from its
+-- transition tables.
+CREATE FUNCTION rank_modified_stages() RETURNS trigger AS $$
+DECLARE
+    stages integer[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT id_stage) INTO stages FROM new_results;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT id_stage) INTO stages FROM old_results;
+    ELSE
+        SELECT array_agg(id_stage) INTO stages FROM (
+            SELECT id_stage FROM new_results
+            UNION SELECT id_stage FROM old_results
+        ) AS modified;
+    END IF;
+
+    IF stages IS NOT NULL THEN
+        PERFORM rank_stages(stages);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables only has one event.
+CREATE TRIGGER result_rank_insert
+AFTER INSERT ON result
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_stages();
+
+CREATE TRIGGER result_rank_update
+AFTER UPDATE ON result
+REFERENCING OLD TABLE AS old_results NEW TABLE AS new_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_stages();
+
+CREATE TRIGGER result_rank_delete
+AFTER DELETE ON result
+REFERENCING OLD TABLE AS old_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_stages();
+
+CREATE FUNCTION clear_stage_ranking() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE stage_ranking;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_rank_truncate
+AFTER TRUNCATE ON result
+FOR EACH STATEMENT EXECUTE FUNCTION clear_stage_ranking();
+
+SELECT rank_stages(array_agg(id)) FROM stage;
+
+ANALYZE stage_ranking;
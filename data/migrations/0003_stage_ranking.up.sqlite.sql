@@ -0,0 +1,16 @@
+-- The local copy computes the ranks on read, with the same columns as the
+-- table maintained by PostgreSQL.
+CREATE VIEW stage_ranking AS
+SELECT result.id AS id_result, result.id_rally, result.id_stage,
+result.id_crew, team.type, result.time, result.disqualification,
+CASE WHEN NOT result.disqualification THEN RANK() OVER (
+    PARTITION BY result.id_stage, result.disqualification
+    ORDER BY result.time
+) END AS stage_rank,
+CASE WHEN NOT result.disqualification THEN RANK() OVER (
+    PARTITION BY result.id_stage, team.type, result.disqualification
+    ORDER BY result.time
+) END AS category_rank
+FROM result
+JOIN crew ON crew.id = result.id_crew
+JOIN team ON team.id = crew.id_team;
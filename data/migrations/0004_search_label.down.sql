@@ -0,0 +1,2 @@
+-- The pg_trgm extension is kept, other objects may use it.
+DROP MATERIALIZED VIEW search_label;
@@ -0,0 +1 @@
+DROP VIEW search_label;
@@ -0,0 +1,31 @@
+-- Labels of the home page search, one per rally, stage and team, with a
+-- trigram index. The search reads the few best matches with an index scan
+-- instead of loading and filtering every label in the application.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE MATERIALIZED VIEW search_label AS
+SELECT 'rally' AS type, id, name || ' ' || year AS label
+FROM rally
+UNION ALL
+SELECT 'stage', stage.id,
+CASE WHEN stage.number = 0 THEN 'Prologue'
+ELSE stage.number || 'e étape' END
+|| ' du ' || rally.name || ' ' || rally.year
+FROM stage
+JOIN rally ON rally.id = stage.id_rally
+UNION ALL
+SELECT 'team', id, name || ' (' || CASE type
+    WHEN 'car' THEN 'voiture'
+    WHEN 'motorbike' THEN 'moto'
+    WHEN 'truck' THEN 'camion'
+END || ')'
+FROM team;
+
+-- The unique index allows REFRESH ... CONCURRENTLY.
+CREATE UNIQUE INDEX search_label_IND
+     ON search_label (type, id);
+
+CREATE INDEX search_label_trgm_IND
+     ON search_label USING gin (label gin_trgm_ops);
+
+ANALYZE search_label;
@@ -0,0 +1,20 @@
+-- The local copy builds the labels on read, with the same columns as the
+-- materialized view of PostgreSQL. The trigram search is emulated by the
+-- word_similarity function of the connection.
+CREATE VIEW search_label AS
+SELECT 'rally' AS type, id, name || ' ' || year AS label
+FROM rally
+UNION ALL
+SELECT 'stage', stage.id,
+CASE WHEN stage.number = 0 THEN 'Prologue'
+ELSE stage.number || 'e étape' END
+|| ' du ' || rally.name || ' ' || rally.year
+FROM stage
+JOIN rally ON rally.id = stage.id_rally
+UNION ALL
+SELECT 'team', id, name || ' (' || CASE type
+    WHEN 'car' THEN 'voiture'
+    WHEN 'motorbike' THEN 'moto'
+    WHEN 'truck' THEN 'camion'
+END || ')'
+FROM team;
@@ -0,0 +1,28 @@
+DROP VIEW IF EXISTS rally_leaderboard;
+
+-- Leaderboard of `database_creation.ddl`.
+CREATE VIEW rally_leaderboard AS
+SELECT id_rally, type, id_crew, id_team, team_name, total_time,
+first_name_1, last_name_1, first_name_2, last_name_2, disqualification,
+RANK() OVER (
+    PARTITION BY id_rally, type
+    ORDER BY disqualification ASC, total_time ASC
+) AS rank
+FROM (
+    SELECT stage.id_rally, team.type, crew.id AS id_crew,
+    team.id AS id_team, team.name AS team_name,
+    SUM(result.time) AS total_time,
+    c1.first_name AS first_name_1, c1.last_name AS last_name_1,
+    c2.first_name AS first_name_2, c2.last_name AS last_name_2,
+    BOOL_OR(result.disqualification) AS disqualification
+    FROM crew
+    JOIN result ON result.id_crew = crew.id
+    JOIN stage ON stage.id = result.id_stage
+    JOIN team ON team.id = crew.id_team
+    JOIN contestant c1 ON c1.id_crew = crew.id
+    JOIN contestant c2 ON c2.id_crew = crew.id AND c2.id > c1.id
+    GROUP BY stage.id_rally, team.type, crew.id, team.id, team.name,
+    c1.first_name, c1.last_name, c2.first_name, c2.last_name
+) AS totals;
+
+DROP VIEW crew_roster;
@@ -0,0 +1,47 @@
+-- Crew of each team with its two drivers on one row, refreshed after
+-- writes to its tables. Stage pages read the drivers of their crews with
+-- an index lookup instead of pivoting every contestant.
+CREATE MATERIALIZED VIEW crew_roster AS
+WITH member AS (
+    SELECT id_crew, first_name, last_name,
+    ROW_NUMBER() OVER (PARTITION BY id_crew ORDER BY id) AS position
+    FROM contestant
+)
+SELECT crew.id AS id_crew, team.id AS id_team, team.name AS team_name,
+team.type, m1.first_name AS first_name_1, m1.last_name AS last_name_1,
+m2.first_name AS first_name_2, m2.last_name AS last_name_2
+FROM crew
+JOIN team ON team.id = crew.id_team
+LEFT JOIN member m1 ON m1.id_crew = crew.id AND m1.position = 1
+LEFT JOIN member m2 ON m2.id_crew = crew.id AND m2.position = 2;
+
+-- The unique index allows REFRESH ... CONCURRENTLY.
+CREATE UNIQUE INDEX crew_roster_IND
+     ON crew_roster (id_crew);
+
+-- Same leaderboard, with the total time of each crew computed from result
+-- alone and the names read from crew_roster, refreshed before it.
+DROP MATERIALIZED VIEW IF EXISTS rally_leaderboard;
+
+CREATE MATERIALIZED VIEW rally_leaderboard AS
+SELECT totals.id_rally, crew_roster.type, totals.id_crew,
+crew_roster.id_team, crew_roster.team_name, totals.total_time,
+crew_roster.first_name_1, crew_roster.last_name_1,
+crew_roster.first_name_2, crew_roster.last_name_2, totals.disqualification,
+RANK() OVER (
+    PARTITION BY totals.id_rally, crew_roster.type
+    ORDER BY totals.disqualification ASC, totals.total_time ASC
+) AS rank
+FROM (
+    SELECT id_rally, id_crew, SUM(time) AS total_time,
+    BOOL_OR(disqualification) AS disqualification
+    FROM result
+    GROUP BY id_rally, id_crew
+) AS totals
+JOIN crew_roster ON crew_roster.id_crew = totals.id_crew;
+
+CREATE UNIQUE INDEX rally_leaderboard_IND
+     ON rally_leaderboard (id_rally, type, id_crew);
+
+ANALYZE crew_roster;
+ANALYZE rally_leaderboard;
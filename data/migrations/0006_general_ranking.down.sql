@@ -0,0 +1,8 @@
+DROP TRIGGER result_general_truncate ON result;
+DROP TRIGGER result_general_delete ON result;
+DROP TRIGGER result_general_update ON result;
+DROP TRIGGER result_general_insert ON result;
+DROP FUNCTION clear_general_ranking();
+DROP FUNCTION rank_modified_general();
+DROP FUNCTION rank_general(integer[]);
+DROP TABLE general_ranking;
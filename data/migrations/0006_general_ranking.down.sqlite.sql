@@ -0,0 +1 @@
+DROP VIEW general_ranking;
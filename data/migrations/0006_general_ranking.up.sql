@@ -0,0 +1,148 @@
+-- General classification of each crew after each stage: cumulative time
+-- and rank, overall and in the category of the crew, kept up to date by
+-- triggers on result. Disqualified crews have no rank. Stage pages read
+-- the classification after the stage with an index lookup.
+create table general_ranking (
+     id_rally integer not null,
+     id_stage integer not null,
+     number integer not null,
+     id_crew integer not null,
+     type text not null,
+     total_time real not null,
+     disqualification boolean not null,
+     general_rank integer,
+     category_rank integer,
+     constraint ID_GENERAL_RANKING primary key (id_stage, id_crew));
+
+create index general_ranking_category_IND
+     on general_ranking (id_stage, type, category_rank);
+
+-- Last classification of a crew before a stage, where the totals of the
+-- next stages start from.
+create index general_ranking_crew_IND
+     on general_ranking (id_rally, id_crew, number);
+
+-- Ranks again the stages of the rallies of some stages, from the first of
+-- them in each rally. Cumulative times start from the previous stage, so
+-- only the results of the ranked stages are read. The results of a crew on
+-- a stage are summed, as in rally_leaderboard.
+CREATE FUNCTION rank_general(stages integer[]) RETURNS void AS $$
+    -- Concurrent writes to the same rally rank its stages one after the
+    -- other, as for rank_stages.
+    SELECT stage.id FROM stage
+    JOIN (
+        SELECT id_rally, MIN(number) AS number FROM stage
+        WHERE id = ANY(stages) GROUP BY id_rally
+    ) AS start
+    ON start.id_rally = stage.id_rally AND stage.number >= start.number
+    ORDER BY stage.id
+    FOR NO KEY UPDATE OF stage;
+
+    DELETE FROM general_ranking
+    USING (
+        SELECT id_rally, MIN(number) AS number FROM stage
+        WHERE id = ANY(stages) GROUP BY id_rally
+    ) AS start
+    WHERE general_ranking.id_rally = start.id_rally
+    AND general_ranking.number >= start.number;
+
+    INSERT INTO general_ranking
+    SELECT totals.id_rally, totals.id_stage, totals.number, totals.id_crew,
+    team.type, totals.total_time, totals.disqualification,
+    CASE WHEN NOT totals.disqualification THEN RANK() OVER (
+        PARTITION BY totals.id_stage, totals.disqualification
+        ORDER BY totals.total_time
+    ) END,
+    CASE WHEN NOT totals.disqualification THEN RANK() OVER (
+        PARTITION BY totals.id_stage, team.type, totals.disqualification
+        ORDER BY totals.total_time
+    ) END
+    FROM (
+        SELECT result.id_rally, result.id_stage, stage.number,
+        result.id_crew,
+        COALESCE(previous.total_time, 0)
+        + SUM(SUM(result.time)) OVER crew_stages AS total_time,
+        COALESCE(previous.disqualification, false)
+        OR BOOL_OR(BOOL_OR(result.disqualification)) OVER crew_stages
+        AS disqualification
+        FROM (
+            SELECT id_rally, MIN(number) AS number FROM stage
+            WHERE id = ANY(stages) GROUP BY id_rally
+        ) AS start
+        JOIN stage ON stage.id_rally = start.id_rally
+        AND stage.number >= start.number
+        JOIN result ON result.id_rally = stage.id_rally
+        AND result.id_stage = stage.id
+        LEFT JOIN LATERAL (
+            SELECT total_time, disqualification FROM general_ranking
+            WHERE general_ranking.id_rally = start.id_rally
+            AND general_ranking.id_crew = result.id_crew
+            AND general_ranking.number < start.number
+            ORDER BY general_ranking.number DESC
+            LIMIT 1
+        ) AS previous ON true
+        GROUP BY result.id_rally, result.id_stage, stage.number,
+        result.id_crew, previous.total_time, previous.disqualification
+        WINDOW crew_stages AS (
+            PARTITION BY result.id_rally, result.id_crew
+            ORDER BY stage.number
+        )
+    ) AS totals
+    JOIN crew ON crew.id = totals.id_crew
+    JOIN team ON team.id = crew.id_team;
+$$ LANGUAGE sql;
+
+-- Each statement ranks once the rallies it modified, from the first
+-- modified stage, read from its transition tables.
+CREATE FUNCTION rank_modified_general() RETURNS trigger AS $$
+DECLARE
+    stages integer[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT id_stage) INTO stages FROM new_results;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT id_stage) INTO stages FROM old_results;
+    ELSE
+        SELECT array_agg(id_stage) INTO stages FROM (
+            SELECT id_stage FROM new_results
+            UNION SELECT id_stage FROM old_results
+        ) AS modified;
+    END IF;
+
+    IF stages IS NOT NULL THEN
+        PERFORM rank_general(stages);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables only has one event.
+CREATE TRIGGER result_general_insert
+AFTER INSERT ON result
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_general();
+
+CREATE TRIGGER result_general_update
+AFTER UPDATE ON result
+REFERENCING OLD TABLE AS old_results NEW TABLE AS new_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_general();
+
+CREATE TRIGGER result_general_delete
+AFTER DELETE ON result
+REFERENCING OLD TABLE AS old_results
+FOR EACH STATEMENT EXECUTE FUNCTION rank_modified_general();
+
+CREATE FUNCTION clear_general_ranking() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE general_ranking;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER result_general_truncate
+AFTER TRUNCATE ON result
+FOR EACH STATEMENT EXECUTE FUNCTION clear_general_ranking();
+
+SELECT rank_general(array_agg(id)) FROM stage;
+
+ANALYZE general_ranking;
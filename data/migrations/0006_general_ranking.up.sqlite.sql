@@ -0,0 +1,28 @@
+-- The local copy sums the times of each crew on read, with the same
+-- columns as the table maintained by PostgreSQL.
+CREATE VIEW general_ranking AS
+WITH totals AS (
+    SELECT result.id_rally, result.id_stage, stage.number, result.id_crew,
+    SUM(SUM(result.time)) OVER crew_stages AS total_time,
+    MAX(MAX(result.disqualification)) OVER crew_stages AS disqualification
+    FROM result
+    JOIN stage ON stage.id = result.id_stage
+    GROUP BY result.id_rally, result.id_stage, stage.number, result.id_crew
+    WINDOW crew_stages AS (
+        PARTITION BY result.id_rally, result.id_crew
+        ORDER BY stage.number
+    )
+)
+SELECT totals.id_rally, totals.id_stage, totals.number, totals.id_crew,
+team.type, totals.total_time, totals.disqualification,
+CASE WHEN NOT totals.disqualification THEN RANK() OVER (
+    PARTITION BY totals.id_stage, totals.disqualification
+    ORDER BY totals.total_time
+) END AS general_rank,
+CASE WHEN NOT totals.disqualification THEN RANK() OVER (
+    PARTITION BY totals.id_stage, team.type, totals.disqualification
+    ORDER BY totals.total_time
+) END AS category_rank
+FROM totals
+JOIN crew ON crew.id = totals.id_crew
+JOIN team ON team.id = crew.id_team;
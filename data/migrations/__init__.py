@@ -0,0 +1 @@
+"""Versioned SQL migrations of the schema of the rally database."""
@@ -0,0 +1,259 @@
+"""Container for `Migrator` class to apply versioned schema migrations."""
+
+import logging
+import re
+from pathlib import Path
+from typing import Literal, NamedTuple
+
+import sqlparse
+
+from data.db_communication import SQLInterface
+
+LOGGER = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent
+MIGRATION_FILE = re.compile(
+    r"^(\d+)_(\w+)\.(up|down)(?:\.(postgresql|sqlite))?\.sql$"
+)
+VERSION_TABLE = "schema_migration"
+
+Dialect = Literal["postgresql", "sqlite"]
+
+
+class Migration(NamedTuple):
+    """SQL scripts of a version of the schema."""
+
+    version: int
+    name: str
+    up: Path
+    down: Path | None
+
+    def statements(self, direction: Literal["up", "down"]) -> list[str]:
+        """
+        Give the statements of a script of the migration.
+
+        Parameters
+        ----------
+        direction : Literal["up", "down"]
+            "up" to apply the migration, "down" to revert it.
+
+        Returns
+        -------
+        list[str]
+            SQL statements, in order.
+
+        Raises
+        ------
+        ValueError
+            If the migration cannot be reverted.
+        """
+        path = self.up if direction == "up" else self.down
+        if path is None:
+            msg = f"Migration {self.version} has no down script."
+            raise ValueError(msg)
+
+        # sqlparse does not split the bodies of functions between $$.
+        return [
+            statement
+            for statement in sqlparse.split(path.read_text(encoding="utf-8"))
+            if sqlparse.format(statement, strip_comments=True).strip()
+        ]
+
+
+class Migrator:
+    """
+    Runner of the versioned SQL migrations of the schema.
+
+    Migrations are the files `<version>_<name>.up.sql` of `directory`, and
+    their optional `<version>_<name>.down.sql` counterparts. A script
+    `<version>_<name>.up.sqlite.sql` replaces `<version>_<name>.up.sql` on
+    SQLite, for features PostgreSQL only has. Migrations are applied in
+    order of version, each in its own transaction, and the applied versions
+    are recorded in the table `schema_migration`.
+
+    Parameters
+    ----------
+    database : SQLInterface
+        Database at version 0: created from `database_creation.ddl`, or
+        from its earlier revision without `rally_leaderboard`, which the
+        first migration creates if it is missing.
+    directory : Path, optional
+        Directory of the migrations, by default `data/migrations`.
+    dialect : Dialect, optional
+        SQL dialect of the database, by default "postgresql".
+
+    Attributes
+    ----------
+    database : SQLInterface
+        Migrated database.
+    directory : Path
+        Directory of the migrations.
+    dialect : Dialect
+        SQL dialect of the database.
+    """
+
+    def __init__(
+        self,
+        database: SQLInterface,
+        directory: Path = MIGRATIONS_DIR,
+        dialect: Dialect = "postgresql",
+    ) -> None:
+        self.database = database
+        self.directory = directory
+        self.dialect = dialect
+
+    def migrations(self) -> list[Migration]:
+        """
+        Find the migrations of the directory.
+
+        Returns
+        -------
+        list[Migration]
+            Migrations, by increasing version.
+
+        Raises
+        ------
+        ValueError
+            If two migrations have the same version, or a down script has no
+            up script.
+        """
+        scripts: dict[int, dict[str, Path]] = {}
+        names: dict[int, str] = {}
+        # Scripts of the dialect come last, to replace the generic ones.
+        for path in sorted(
+            self.directory.glob("*.sql"), key=lambda path: len(path.suffixes)
+        ):
+            match = MIGRATION_FILE.match(path.name)
+            if match is None or match.group(4) not in {None, self.dialect}:
+                continue
+            version, name, direction, _ = match.groups()
+            if names.setdefault(int(version), name) != name:
+                msg = f"Several migrations have the version {version}."
+                raise ValueError(msg)
+            scripts.setdefault(int(version), {})[direction] = path
+
+        migrations = []
+        for version in sorted(scripts):
+            if "up" not in scripts[version]:
+                msg = f"Migration {version} has no up script."
+                raise ValueError(msg)
+            migrations.append(
+                Migration(
+                    version,
+                    names[version],
+                    scripts[version]["up"],
+                    scripts[version].get("down"),
+                )
+            )
+        return migrations
+
+    def applied(self) -> list[int]:
+        """
+        Give the versions applied to the database.
+
+        Returns
+        -------
+        list[int]
+            Applied versions, in increasing order.
+        """
+        self.database.execute(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version integer not null primary key, "
+            "name text not null, "
+            "applied_at timestamp not null default CURRENT_TIMESTAMP);"
+        )
+        versions: list[tuple[int]] = self.database.execute(
+            f"SELECT version FROM {VERSION_TABLE} ORDER BY version;"
+        )
+        return [version for (version,) in versions]
+
+    def version(self) -> int:
+        """
+        Give the current version of the schema.
+
+        Returns
+        -------
+        int
+            Highest applied version, 0 if no migration is applied.
+        """
+        return max(self.applied(), default=0)
+
+    def pending(self) -> list[Migration]:
+        """
+        Give the migrations not applied yet.
+
+        Returns
+        -------
+        list[Migration]
+            Migrations to apply, by increasing version.
+        """
+        applied = set(self.applied())
+        return [
+            migration
+            for migration in self.migrations()
+            if migration.version not in applied
+        ]
+
+    def upgrade(self, target: int | None = None) -> list[Migration]:
+        """
+        Apply the pending migrations, up to a version.
+
+        Parameters
+        ----------
+        target : int, optional
+            Last version to apply, by default all the pending migrations.
+
+        Returns
+        -------
+        list[Migration]
+            Applied migrations, in order.
+        """
+        migrations = [
+            migration
+            for migration in self.pending()
+            if target is None or migration.version <= target
+        ]
+        for migration in migrations:
+            LOGGER.info("Applying migration %s", migration.version)
+            with self.database.transaction():
+                for statement in migration.statements("up"):
+                    self.database.execute(statement)
+                self.database.write(
+                    VERSION_TABLE,
+                    {"version": migration.version, "name": migration.name},
+                )
+        return migrations
+
+    def downgrade(self, target: int | None = None) -> list[Migration]:
+        """
+        Revert the applied migrations, down to a version.
+
+        Parameters
+        ----------
+        target : int, optional
+            Version of the schema once reverted, by default the version
+            before the current one. 0 reverts all the migrations.
+
+        Returns
+        -------
+        list[Migration]
+            Reverted migrations, in order.
+        """
+        applied = self.applied()
+        if target is None:
+            target = applied[-2] if len(applied) > 1 else 0
+
+        migrations = [
+            migration
+            for migration in reversed(self.migrations())
+            if migration.version in applied and migration.version > target
+        ]
+        for migration in migrations:
+            LOGGER.info("Reverting migration %s", migration.version)
+            with self.database.transaction():
+                for statement in migration.statements("down"):
+                    self.database.execute(statement)
+                self.database.delete_rows(
+                    VERSION_TABLE, {"version": migration.version}
+                )
+        return migrations
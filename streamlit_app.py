@@ -2,7 +2,7 @@
 
 import streamlit as st
 
-from app.utils import APP_SRC
+from app.utils import APP_SRC, MONITOR, show_plans, start_warmup
 
 
 def create_app() -> None:
@@ -30,6 +30,7 @@ def create_app() -> None:
     )
 
     st.set_page_config(layout="wide")
+    start_warmup()
 
     pg = st.navigation(
         {
@@ -48,7 +49,13 @@ def create_app() -> None:
     if "id_stage" not in st.session_state:
         st.session_state["id_stage"] = 326
 
-    pg.run()
+    # Debug flag showing why a page is slow.
+    if st.sidebar.toggle("Afficher les plans des requêtes", key="plans"):
+        with MONITOR.capture() as records:
+            pg.run()
+        show_plans(records)
+    else:
+        pg.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Tests of the data layer of the rally database."""
@@ -0,0 +1,20 @@
+"""Fixtures shared by the tests."""
+
+import pytest
+
+from data.local_db import SQLite
+
+
+@pytest.fixture
+def database() -> SQLite:
+    """
+    Give a local copy of the rally database, with all the migrations.
+
+    Returns
+    -------
+    SQLite
+        In-memory database filled with the data of `dump.sql`.
+    """
+    database = SQLite()
+    database.warmup()
+    return database
@@ -0,0 +1,130 @@
+"""Tests of `QueryCache`."""
+
+import time
+
+import pytest
+
+from data.cache import QueryCache, written_tables
+
+RALLY_QUERY = "SELECT * FROM rally WHERE id = %s;"
+STAGE_QUERY = "SELECT * FROM stage JOIN public.rally ON rally.id = id_rally;"
+CITY_QUERY = "SELECT name FROM city;"
+
+
+def test_get_stored_result() -> None:
+    """Check that a stored result is given back, for the same parameters."""
+    cache = QueryCache()
+    cache.store(RALLY_QUERY, [1], ["id", "name"], [(1, "Paris Dakar")])
+
+    assert cache.get(RALLY_QUERY, [1]) == (
+        ["id", "name"],
+        [(1, "Paris Dakar")],
+    )
+    assert cache.get(RALLY_QUERY, [2]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_gives_a_copy() -> None:
+    """Check that modifying a result does not modify the cached one."""
+    cache = QueryCache()
+    cache.store(CITY_QUERY, None, ["name"], [("Paris",)])
+
+    result = cache.get(CITY_QUERY)
+    assert result is not None
+    result[1].append(("Dakar",))
+
+    assert cache.get(CITY_QUERY) == (["name"], [("Paris",)])
+
+
+def test_least_recently_used_evicted() -> None:
+    """Check that the least recently read result is dropped first."""
+    cache = QueryCache(max_entries=2)
+    cache.store(RALLY_QUERY, [1], ["id"], [(1,)])
+    cache.store(RALLY_QUERY, [2], ["id"], [(2,)])
+    # Reading the first result makes the second one the oldest.
+    cache.get(RALLY_QUERY, [1])
+    cache.store(RALLY_QUERY, [3], ["id"], [(3,)])
+
+    assert cache.get(RALLY_QUERY, [1]) is not None
+    assert cache.get(RALLY_QUERY, [2]) is None
+    assert cache.get(RALLY_QUERY, [3]) is not None
+
+
+def test_results_too_large_not_stored() -> None:
+    """Check that results larger than the memory budget are not kept."""
+    cache = QueryCache(max_bytes=1024)
+    cache.store(CITY_QUERY, None, ["name"], [("x" * 2048,)])
+
+    assert cache.get(CITY_QUERY) is None
+
+
+def test_expired_result(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that results are dropped once their time to live is over."""
+    cache = QueryCache(ttl=60.0)
+    cache.store(CITY_QUERY, None, ["name"], [("Paris",)])
+    now = time.monotonic()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "monotonic", lambda: now + 30.0)
+        assert cache.get(CITY_QUERY) is not None
+        patch.setattr(time, "monotonic", lambda: now + 61.0)
+        assert cache.get(CITY_QUERY) is None
+
+
+def test_invalidate_written_tables() -> None:
+    """Check that a write only drops the results read from its table."""
+    cache = QueryCache()
+    cache.store(RALLY_QUERY, [1], ["id"], [(1,)])
+    cache.store(STAGE_QUERY, None, ["id"], [(1,)])
+    cache.store(CITY_QUERY, None, ["name"], [("Paris",)])
+
+    assert cache.invalidate_query("UPDATE rally SET year = %s WHERE id = 1;")
+
+    assert cache.get(RALLY_QUERY, [1]) is None
+    # Read through a join and a schema.
+    assert cache.get(STAGE_QUERY) is None
+    assert cache.get(CITY_QUERY) is not None
+
+
+def test_invalidate_views() -> None:
+    """Check that a write drops the results read from views of its table."""
+    cache = QueryCache()
+    cache.store("SELECT * FROM rally_leaderboard;", None, ["rank"], [(1,)])
+    cache.store("SELECT * FROM team_info;", None, ["name"], [("Rousseau",)])
+
+    cache.store("INSERT INTO result (time) VALUES (%s);", [1.0], [], [])
+
+    assert cache.get("SELECT * FROM rally_leaderboard;") is None
+    assert cache.get("SELECT * FROM team_info;") is not None
+
+
+def test_invalidate_unknown_statement() -> None:
+    """Check that statements modifying unknown tables clear the cache."""
+    cache = QueryCache()
+    cache.store(CITY_QUERY, None, ["name"], [("Paris",)])
+
+    assert not cache.invalidate_query(RALLY_QUERY)
+    assert cache.get(CITY_QUERY) is not None
+    assert cache.invalidate_query("VACUUM;")
+    assert cache.get(CITY_QUERY) is None
+
+
+@pytest.mark.parametrize(
+    ("query", "tables"),
+    [
+        ("INSERT INTO public.Rally (name) VALUES (%s);", {"rally"}),
+        (
+            "DELETE FROM stage USING rally WHERE rally.id = id_rally;",
+            {"stage"},
+        ),
+        ("TRUNCATE TABLE result;", {"result"}),
+        (
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY crew_roster;",
+            {"crew_roster"},
+        ),
+        (CITY_QUERY, set()),
+    ],
+)
+def test_written_tables(query: str, tables: set[str]) -> None:
+    """Check the tables found as modified by a query."""
+    assert written_tables(query) == tables
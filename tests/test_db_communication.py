@@ -0,0 +1,115 @@
+"""Tests of the conditions and pages of `SQLInterface`, run on SQLite."""
+
+from typing import Any
+
+import pytest
+
+from data.local_db import SQLite
+
+# Rallies of the dump: Paris Dakar, every year from 1995 to 2014 but 2008.
+YEARS = [year for year in range(1995, 2015) if year != 2008]
+
+
+@pytest.mark.parametrize(
+    ("condition_data", "years"),
+    [
+        (None, YEARS),
+        ({"year": 2000}, [2000]),
+        ({"year >=": 2010}, [2010, 2011, 2012, 2013, 2014]),
+        ({"year  <": 1997}, [1995, 1996]),
+        ({"year !=": 2000}, [year for year in YEARS if year != 2000]),
+        ({"year BETWEEN": (2007, 2009)}, [2007, 2009]),
+        ({"year": [1995, 2008, 2014]}, [1995, 2014]),
+        ({"year": (1995,)}, [1995]),
+        ({"year <>": [1995, 1996]}, YEARS[2:]),
+        ({"name LIKE": "Paris%", "year": 2001}, [2001]),
+        ({"name ILIKE": "paris dakar", "year <=": 1995}, [1995]),
+        ({"name": "Dakar"}, []),
+    ],
+)
+def test_read_conditions(
+    database: SQLite,
+    condition_data: dict[str, Any] | None,
+    years: list[int],
+) -> None:
+    """Check that conditions select the expected rows."""
+    rows = database.read("rally", "year", condition_data, return_type="list")
+
+    assert sorted(rows) == years
+
+
+@pytest.mark.parametrize(
+    ("condition_data", "message"),
+    [
+        ({"year BETWEEN": 2000}, "needs two bounds"),
+        ({"year BETWEEN": (2000, 2001, 2002)}, "needs two bounds"),
+        ({"year <": [2000, 2001]}, "does not accept a list"),
+        ({"year ~": 2000}, "Unsupported operator"),
+    ],
+)
+def test_read_invalid_conditions(
+    database: SQLite, condition_data: dict[str, Any], message: str
+) -> None:
+    """Check that unsupported conditions raise a ValueError."""
+    with pytest.raises(ValueError, match=message):
+        database.read("rally", condition_data=condition_data)
+
+
+@pytest.mark.parametrize(
+    ("limit", "pages_read"),
+    [
+        # Three full pages, then the last one with the 19th rally.
+        (6, 4),
+        # The only page is full, so an empty one is read after it.
+        (19, 2),
+        (20, 1),
+    ],
+)
+def test_read_page_round_trip(
+    database: SQLite, limit: int, pages_read: int
+) -> None:
+    """Check that pages read with their tokens give all rows once."""
+    ids: list[int] = []
+    token = None
+    pages = 0
+    while True:
+        page, token = database.read_page(
+            "rally", after=token, limit=limit, columns="id", return_type="list"
+        )
+        ids += page
+        pages += 1
+        if token is None:
+            break
+
+    assert ids == sorted(database.read("rally", "id", return_type="list"))
+    assert pages == pages_read
+
+
+def test_read_page_descending(database: SQLite) -> None:
+    """Check pages ordered by several columns in descending order."""
+    rows: list[dict[str, Any]] = []
+    token = None
+    while True:
+        page, token = database.read_page(
+            "rally",
+            order_by=["year DESC", "id DESC"],
+            after=token,
+            limit=4,
+            columns=["year"],
+            condition_data={"year >=": 2000},
+        )
+        rows += page
+        if token is None:
+            break
+
+    assert rows == [{"year": year} for year in reversed(YEARS) if year >= 2000]
+
+
+def test_read_page_foreign_token(database: SQLite) -> None:
+    """Check that a token is refused by another ordering."""
+    _, token = database.read_page("rally", limit=2)
+
+    with pytest.raises(ValueError, match="another ordering"):
+        database.read_page("rally", order_by="year", after=token)
+    with pytest.raises(ValueError, match="Invalid page token"):
+        database.read_page("rally", after="not a token")
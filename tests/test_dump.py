@@ -0,0 +1,83 @@
+"""Tests of the order in which tables are restored."""
+
+from typing import cast
+from unittest.mock import create_autospec
+
+import pytest
+
+from data.db_communication import PostgreSQL
+from data.dump import dependency_levels
+
+# Foreign keys of the schema, as (referencing table, referenced table).
+FOREIGN_KEYS = [
+    ("stage", "rally"),
+    ("stage", "city"),
+    ("participation", "rally"),
+    ("participation", "team"),
+    ("crew", "team"),
+    ("contestant", "crew"),
+    ("vehicle", "crew"),
+    ("result", "stage"),
+    ("result", "crew"),
+    # Partitions reference the same tables as their parent.
+    ("result_576", "stage"),
+]
+
+
+def database_with_keys(foreign_keys: list[tuple[str, str]]) -> PostgreSQL:
+    """
+    Give a database whose only foreign keys are the given ones.
+
+    Parameters
+    ----------
+    foreign_keys : list[tuple[str, str]]
+        Referencing and referenced table of each foreign key.
+
+    Returns
+    -------
+    PostgreSQL
+        Database answering any query with the foreign keys.
+    """
+    database = create_autospec(PostgreSQL, instance=True)
+    database.execute.return_value = foreign_keys
+    return cast("PostgreSQL", database)
+
+
+def test_dependency_levels() -> None:
+    """Check that each table comes after the tables it references."""
+    database = database_with_keys(FOREIGN_KEYS)
+    tables = [
+        "result",
+        "vehicle",
+        "contestant",
+        "crew",
+        "participation",
+        "team",
+        "stage",
+        "city",
+        "rally",
+    ]
+
+    assert dependency_levels(database, tables) == [
+        ["city", "rally", "team"],
+        ["crew", "participation", "stage"],
+        ["contestant", "result", "vehicle"],
+    ]
+
+
+def test_dependency_levels_of_some_tables() -> None:
+    """Check that keys to other tables and to the table itself are ignored."""
+    database = database_with_keys([*FOREIGN_KEYS, ("crew", "crew")])
+
+    assert dependency_levels(database, ["result", "crew"]) == [
+        ["crew"],
+        ["result"],
+    ]
+
+
+def test_dependency_cycle() -> None:
+    """Check that a cycle of foreign keys is refused."""
+    database = database_with_keys([*FOREIGN_KEYS, ("rally", "result")])
+
+    with pytest.raises(ValueError, match="cycle"):
+        dependency_levels(database, ["rally", "stage", "result"])
@@ -0,0 +1,46 @@
+"""Tests of the shapes of queries measured by `QueryMonitor`."""
+
+import pytest
+
+from data.instrumentation import normalize_query
+
+
+@pytest.mark.parametrize(
+    ("query", "shape"),
+    [
+        (
+            "SELECT * FROM rally WHERE id = 42;",
+            "SELECT * FROM rally WHERE id = ?;",
+        ),
+        (
+            "SELECT id FROM team WHERE name = 'O''Neil' AND type = %s;",
+            "SELECT id FROM team WHERE name = ? AND type = ?;",
+        ),
+        (
+            "SELECT * FROM result WHERE id IN (?, ?, ?);",
+            "SELECT * FROM result WHERE id IN (...);",
+        ),
+        (
+            "INSERT INTO city (name, lat) VALUES (%s, %s), (%s, %s);",
+            "INSERT INTO city (name, lat) VALUES (...);",
+        ),
+        (
+            "SELECT  *\n  FROM stage2\n  WHERE time > 1.5",
+            "SELECT * FROM stage2 WHERE time > ?",
+        ),
+    ],
+)
+def test_normalize_query(query: str, shape: str) -> None:
+    """Check that values are removed from queries, but not identifiers."""
+    assert normalize_query(query) == shape
+
+
+def test_same_shape_for_different_values() -> None:
+    """Check that a query run with different values has one shape."""
+    queries = [
+        "SELECT * FROM stage WHERE id_rally = 576 AND number IN (1, 2);",
+        "SELECT * FROM stage WHERE id_rally = 594 AND number IN (3, 4, 5);",
+        "SELECT * FROM stage WHERE id_rally = %s AND number IN (%s, %s);",
+    ]
+
+    assert len({normalize_query(query) for query in queries}) == 1
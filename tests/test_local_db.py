@@ -0,0 +1,84 @@
+"""Tests of the translation of PostgreSQL queries by `SQLite`."""
+
+from typing import Any
+
+import pytest
+
+from data.local_db import SQLite, word_similarity
+
+
+@pytest.mark.parametrize(
+    ("query", "params", "rows"),
+    [
+        ("SELECT year FROM rally WHERE id = %s;", [576], [(1995,)]),
+        (
+            (
+                "SELECT count(*) FROM rally WHERE name LIKE 'Paris%%' "
+                "AND year < %s;"
+            ),
+            [2000],
+            [(5,)],
+        ),
+        (
+            "SELECT year FROM rally WHERE year = ANY(%s) ORDER BY year;",
+            [[1995, 2000, 2008]],
+            [(1995,), (2000,)],
+        ),
+        (
+            (
+                "SELECT year FROM rally WHERE NOT year = ANY (%s) "
+                "AND year < 1998 ORDER BY year;"
+            ),
+            [(1995,)],
+            [(1996,), (1997,)],
+        ),
+        (
+            "SELECT count(*) FROM rally WHERE name ILIKE %s;",
+            ["PARIS dakar"],
+            [(19,)],
+        ),
+    ],
+)
+def test_translated_query(
+    database: SQLite,
+    query: str,
+    params: list[Any],
+    rows: list[Any],
+) -> None:
+    """Check that queries written for PostgreSQL run on SQLite."""
+    assert database.execute(query, params) == rows
+
+
+def test_word_similarity_operator(database: SQLite) -> None:
+    """Check that `<%` finds the labels close to a misspelt term."""
+    labels = database.execute(
+        "SELECT label FROM search_label WHERE %s <%% label ORDER BY label;",
+        ["Rouseau"],
+    )
+
+    assert labels == [
+        ("Rousseau (camion)",),
+        ("Rousseau (voiture)",),
+        ("Rousseau Guibert SARL (camion)",),
+        ("Rousseau Guibert SARL (moto)",),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("term", "text", "similarity"),
+    [
+        ("dakar", "Paris Dakar 1995", 1.0),
+        ("xyz", "Paris Dakar 1995", 0.0),
+        (None, "Paris Dakar 1995", 0.0),
+    ],
+)
+def test_word_similarity(
+    term: str | None, text: str, similarity: float
+) -> None:
+    """Check the similarity of a term to the closest words of a text."""
+    assert word_similarity(term, text) == pytest.approx(similarity)
+
+
+def test_word_similarity_misspelt() -> None:
+    """Check that a misspelt word stays similar to the right one."""
+    assert 0.0 < word_similarity("dakr", "Paris Dakar 1995") < 1.0
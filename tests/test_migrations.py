@@ -0,0 +1,104 @@
+"""Tests of `Migrator`, run on SQLite."""
+
+from pathlib import Path
+
+import pytest
+
+from data.local_db import SQLite
+from data.migrations.migrator import Migrator
+
+LEADERBOARD_QUERY = (
+    "SELECT id_rally, type, id_crew, total_time, rank FROM rally_leaderboard "
+    "ORDER BY id_rally, type, id_crew;"
+)
+
+
+def tables(database: SQLite) -> set[str]:
+    """
+    Give the tables and views of a SQLite database.
+
+    Parameters
+    ----------
+    database : SQLite
+        Database.
+
+    Returns
+    -------
+    set[str]
+        Names of the tables and views.
+    """
+    rows = database.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view');"
+    )
+    return {name for (name,) in rows}
+
+
+def test_sqlite_scripts(database: SQLite) -> None:
+    """Check that the scripts of SQLite replace the generic ones."""
+    migrations = Migrator(database, dialect="sqlite").migrations()
+
+    assert [migration.version for migration in migrations] == list(range(1, 7))
+    assert all(migration.down is not None for migration in migrations)
+    assert migrations[1].up.name == "0002_partition_result.up.sqlite.sql"
+
+
+def test_downgrade_then_upgrade(database: SQLite) -> None:
+    """Check that all migrations can be reverted, then applied again."""
+    migrator = Migrator(database, dialect="sqlite")
+    leaderboard = database.execute(LEADERBOARD_QUERY)
+    assert migrator.version() == 6
+
+    reverted = migrator.downgrade(0)
+
+    assert [migration.version for migration in reverted] == list(
+        range(6, 0, -1)
+    )
+    assert migrator.applied() == []
+    assert not {"stage_ranking", "general_ranking", "search_label"} & (
+        tables(database)
+    )
+    assert database.execute(LEADERBOARD_QUERY) == leaderboard
+
+    applied = migrator.upgrade()
+
+    assert [migration.version for migration in applied] == list(range(1, 7))
+    assert migrator.version() == 6
+    assert {"stage_ranking", "general_ranking", "search_label"} <= (
+        tables(database)
+    )
+    assert database.execute(LEADERBOARD_QUERY) == leaderboard
+
+
+def test_upgrade_to_target(database: SQLite) -> None:
+    """Check that migrations are applied and reverted one at a time."""
+    migrator = Migrator(database, dialect="sqlite")
+
+    migrator.downgrade()
+    assert migrator.applied() == [1, 2, 3, 4, 5]
+    migrator.downgrade(2)
+    assert migrator.pending()[0].version == 3
+    migrator.upgrade(4)
+    assert migrator.version() == 4
+
+
+def test_duplicate_version(tmp_path: Path) -> None:
+    """Check that two migrations with the same version are refused."""
+    (tmp_path / "0001_first.up.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_second.up.sql").write_text("SELECT 2;")
+
+    with pytest.raises(ValueError, match="Several migrations"):
+        Migrator(SQLite(ddl_path=None, dump_path=None), tmp_path).migrations()
+
+
+def test_missing_down_script(tmp_path: Path) -> None:
+    """Check that a migration without down script cannot be reverted."""
+    (tmp_path / "0001_table.up.sql").write_text("CREATE TABLE t (id int);")
+    database = SQLite(ddl_path=None, dump_path=None)
+    migrator = Migrator(database, tmp_path, dialect="sqlite")
+
+    migrator.upgrade()
+
+    assert "t" in tables(database)
+    with pytest.raises(ValueError, match="no down script"):
+        migrator.downgrade()
+    assert migrator.version() == 1